@@ -0,0 +1,22 @@
+import importlib
+
+# Human action recognition on videos with an LRCN model: dataset building, training, inference,
+# and the Flask API. The submodules are imported on first access (action_recognition.inference,
+# ...), so that importing the package does not load TensorFlow, OpenCV or Flask; a worker that
+# only runs inference pays for what it uses.
+
+SUBMODULES = (
+    'api', 'batch_predict', 'batching', 'benchmark', 'cli', 'clip_store', 'dataset_builder', 'export_tflite', 'inference',
+    'inference_workers', 'jobs', 'metrics', 'model', 'model_registry', 'pipeline', 'result_cache', 'stream', 'timeline',
+    'train_input', 'upload_stream', 'video_sampling',
+)
+
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(list(globals()) + list(SUBMODULES))
@@ -0,0 +1,724 @@
+from flask import Flask, Response, request, jsonify, send_file, abort, g
+import os
+import json
+import time
+import queue
+import logging
+import shutil
+import tempfile
+import threading
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from .inference import load_inference_model, TFLiteInferenceModel, SlidingWindowClassifier, SMOOTHING_MODES
+from .batching import BatchingInferenceModel, BATCH_SIZE_BUCKETS, QUEUE_WAIT_BUCKETS
+from .inference_workers import InferenceWorkerPool
+from .model_registry import ModelRegistry, parse_model_file_name
+from .pipeline import run_video_pipeline
+from .jobs import Job, JobStore
+from .timeline import predict_timeline, iterate_timeline, merge_segments
+from .model import IMAGE_HEIGHT, IMAGE_WIDTH, CLASSES_LIST
+from .metrics import MetricsRegistry, StageTimer
+from .stream import StreamRecognizer, StreamManager, parse_stream_sources
+from .upload_stream import FifoUpload, sniff_container, spool_upload, can_stream_uploads
+from .result_cache import ResultCache, file_sha256, file_identity, result_cache_key
+
+app = Flask(__name__)
+
+# Your pretrained model
+MODEL_PATH = os.environ.get('MODEL_PATH', 'LRCN_model__Date_Time_2024_07_07__16_03_46__Loss_0.39749324321746826__Accuracy_0.8640000224113464.h5')
+
+# Number of frames fed to the model together in one forward pass, and the
+# number of frames between consecutive sliding windows; the label of a window
+# is carried forward over the frames until the next one. The stride used to be
+# 1 (a window per frame): INFERENCE_STRIDE=1 gives the labels of older versions.
+INFERENCE_BATCH_SIZE = 32
+INFERENCE_STRIDE = int(os.environ.get('INFERENCE_STRIDE', 5))
+
+# Default mean absolute frame difference (0-255) below which frames count as static
+# and skip the model (0 disables motion gating), and default smoothing of the window
+# predictions ('none', 'ema' or 'majority'); both can be set per request.
+MOTION_THRESHOLD = float(os.environ.get('MOTION_THRESHOLD', 0))
+SMOOTHING = os.environ.get('SMOOTHING', 'none')
+
+# Number of threads resizing and normalizing decoded frames, and the maximum
+# number of frames waiting between two stages of the video pipeline.
+PREPROCESS_WORKERS = os.cpu_count()
+PIPELINE_QUEUE_SIZE = 32
+
+# Whether to compile the inference functions with XLA (INFERENCE_JIT_COMPILE=1).
+INFERENCE_JIT_COMPILE = os.environ.get('INFERENCE_JIT_COMPILE', '0') not in ('0', 'false')
+
+# Run the model with TensorFlow, or with the TFLite models written by export_tflite.py
+# (INFERENCE_BACKEND=tflite) from TFLITE_MODEL_DIR.
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'tensorflow')
+TFLITE_MODEL_DIR = os.environ.get('TFLITE_MODEL_DIR', os.path.splitext(MODEL_PATH)[0] + '.dynamic.tflite')
+
+# The model calls of all the requests are coalesced into shared forward passes of up to
+# INFERENCE_MAX_BATCH_SIZE frames (or windows), for which the oldest call waits at most
+# INFERENCE_MAX_WAIT_MS; DYNAMIC_BATCHING=0 lets every request call the model on its own.
+DYNAMIC_BATCHING = os.environ.get('DYNAMIC_BATCHING', '1') not in ('0', 'false')
+INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 128))
+INFERENCE_MAX_WAIT_MS = float(os.environ.get('INFERENCE_MAX_WAIT_MS', 2))
+
+# Number of versions of each model kept loaded by the model registry (see MODELS_DIR below).
+MODEL_VERSIONS_LOADED = int(os.environ.get('MODEL_VERSIONS_LOADED', 2))
+
+# With INFERENCE_WORKERS > 0, the model runs in that many worker processes instead of this one,
+# each limited to INFERENCE_WORKER_THREADS threads. Every loaded version has its own workers, so
+# by default the CPUs are shared among the INFERENCE_WORKERS * MODEL_VERSIONS_LOADED workers,
+# which never oversubscribes the cores, even while a pinned older version is busy too. The
+# frames are passed to the workers through a shared memory ring of INFERENCE_RING_FRAMES frames.
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))
+INFERENCE_WORKER_THREADS = (int(os.environ.get('INFERENCE_WORKER_THREADS', 0))
+                            or max(os.cpu_count() // max(INFERENCE_WORKERS * MODEL_VERSIONS_LOADED, 1), 1))
+INFERENCE_RING_FRAMES = int(os.environ.get('INFERENCE_RING_FRAMES', 1024))
+
+# Number of /predict/stream result lines buffered for a slow client before processing pauses.
+STREAMED_RESULTS_QUEUE_SIZE = 64
+
+# Maximum number of videos processed at the same time by this process (by default, enough to keep
+# every inference worker busy); further requests wait for a free worker.
+MAX_CONCURRENT_VIDEOS = int(os.environ.get('MAX_CONCURRENT_VIDEOS', max(INFERENCE_WORKERS, 2)))
+video_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_VIDEOS, thread_name_prefix='video-worker')
+
+# Background jobs run on their own pool, sized independently of /predict, and
+# their results are kept for JOB_RESULT_TTL seconds after they finish.
+MAX_CONCURRENT_JOBS = int(os.environ.get('MAX_CONCURRENT_JOBS', 2))
+JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL', 3600))
+job_store = JobStore(ThreadPoolExecutor(max_workers=MAX_CONCURRENT_JOBS, thread_name_prefix='job-worker'), JOB_RESULT_TTL)
+
+# The models are served by a registry of the .h5 files in MODELS_DIR (by default, the directory
+# of MODEL_PATH), described by their JSON sidecars (classes, SEQUENCE_LENGTH, image size); models
+# without one get CLASSES_LIST. The newest MODEL_VERSIONS_LOADED versions of every model are loaded
+# (from their exported SavedModel when available) and warmed up in the background, at boot and
+# whenever the directory changes (checked every MODEL_POLL_INTERVAL seconds, or on POST
+# /models/reload), and swapped in without interrupting the requests in progress. Requests choose
+# a model and version with the model and version parameters; by default they get the newest
+# version of DEFAULT_MODEL, the model of MODEL_PATH. /ready only reports ready once it is loaded.
+# Each model is split into its per-frame CNN and temporal head so that overlapping windows reuse
+# the features of the frames they share, and frames stay uint8 until the CNN normalizes them.
+MODELS_DIR = os.environ.get('MODELS_DIR', os.path.dirname(MODEL_PATH) or '.')
+DEFAULT_MODEL = os.environ.get('DEFAULT_MODEL', parse_model_file_name(MODEL_PATH)[0])
+MODEL_POLL_INTERVAL = float(os.environ.get('MODEL_POLL_INTERVAL', 10))
+
+def load_model_version(model_path, metadata):
+    # The TFLite models of a model file are its export by export_tflite.py (TFLITE_MODEL_DIR for MODEL_PATH).
+    if INFERENCE_BACKEND == 'tflite':
+        same_model = os.path.abspath(model_path) == os.path.abspath(MODEL_PATH)
+        model_path = TFLITE_MODEL_DIR if same_model else os.path.splitext(model_path)[0] + '.dynamic.tflite'
+        files_identity = [file_identity(os.path.join(model_path, name)) for name in ('feature_extractor.tflite', 'temporal_head.tflite')]
+    else:
+        files_identity = [file_identity(model_path)]
+
+    if INFERENCE_WORKERS > 0:
+        image_size = (metadata.get('image_height', IMAGE_HEIGHT), metadata.get('image_width', IMAGE_WIDTH))
+        inference_model = InferenceWorkerPool(INFERENCE_WORKERS, INFERENCE_BACKEND, model_path, INFERENCE_JIT_COMPILE,
+                                              INFERENCE_WORKER_THREADS, 1, image_size, INFERENCE_RING_FRAMES, INFERENCE_BATCH_SIZE)
+    elif INFERENCE_BACKEND == 'tflite':
+        inference_model = TFLiteInferenceModel(model_path)
+    else:
+        inference_model = load_inference_model(model_path, INFERENCE_JIT_COMPILE)
+    # A version that fails to load stops the worker processes it started.
+    try:
+        inference_model.warm_up(INFERENCE_BATCH_SIZE)
+        if DYNAMIC_BATCHING:
+            inference_model = BatchingInferenceModel(inference_model, INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT_MS / 1000,
+                                                     record_inference_batch, max(INFERENCE_WORKERS, 1))
+    except Exception:
+        if hasattr(inference_model, 'close'):
+            inference_model.close()
+        raise
+    return inference_model, files_identity
+
+model_registry = ModelRegistry(MODELS_DIR, load_model_version, DEFAULT_MODEL, {'classes': CLASSES_LIST}, MODEL_VERSIONS_LOADED,
+                               MODEL_POLL_INTERVAL)
+
+def acquire_model(name=None, version=None):
+    # Wait for the model to be loaded at boot, then hold the chosen version (the newest by default)
+    # until it is released.
+    model_registry.wait_until_loaded(name)
+    return model_registry.acquire(name, version)
+
+def get_default_model():
+    # The newest version of the default model, for code running outside of a request (such as the
+    # benchmark); requests hold the version they use with acquire_model().
+    served_model = acquire_model()
+    served_model.release()
+    return served_model
+
+def get_inference_model():
+    return get_default_model().inference_model
+
+# Results are cached on disk, keyed by the sha256 of the uploaded video, the model files and the
+# inference parameters, so that resubmitted videos are answered without processing them again.
+# The least recently used results are evicted beyond RESULT_CACHE_MAX_BYTES (0 disables the
+# cache); RESULT_CACHE_VIDEOS=0 caches the JSON results only, not the annotated videos.
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR', 'result_cache')
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 1 << 30))
+RESULT_CACHE_VIDEOS = os.environ.get('RESULT_CACHE_VIDEOS', '1') not in ('0', 'false')
+result_cache = ResultCache(RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES) if RESULT_CACHE_MAX_BYTES > 0 else None
+
+# Live sources recognized by the /streams endpoints, configured as STREAM_SOURCES="name=source,..."
+# where a source is a camera device index, a video file or a stream URL, and the number of
+# windows classified per second on each of them.
+STREAM_SOURCES = parse_stream_sources(os.environ.get('STREAM_SOURCES', ''))
+STREAM_INFERENCE_RATE = float(os.environ.get('STREAM_INFERENCE_RATE', 5))
+STREAM_HEARTBEAT_INTERVAL = 15
+
+def create_stream_recognizer(video_source):
+    # A stream keeps the version of the default model it started with until it stops.
+    served_model = acquire_model()
+    recognizer = StreamRecognizer(video_source, served_model.inference_model, served_model.classes_list, served_model.preprocess_frame,
+                                  served_model.sequence_length, STREAM_INFERENCE_RATE)
+
+    def release_model(event):
+        if event is None:
+            served_model.release()
+
+    recognizer.add_listener(release_model)
+    return recognizer
+
+stream_manager = StreamManager(STREAM_SOURCES, create_stream_recognizer)
+
+# Metrics exposed on /metrics in the Prometheus text format. With LOG_REQUEST_METRICS=1 the
+# stage timings of every video are also logged.
+LOG_REQUEST_METRICS = os.environ.get('LOG_REQUEST_METRICS', '0') not in ('0', 'false')
+if LOG_REQUEST_METRICS:
+    app.logger.setLevel(logging.INFO)
+
+metrics = MetricsRegistry()
+requests_total = metrics.counter('action_recognition_requests_total', 'Requests handled, by endpoint and status code.', ('endpoint', 'status'))
+request_seconds = metrics.histogram('action_recognition_request_seconds', 'Time to handle a request, without sending the response body.', ('endpoint',))
+videos_total = metrics.counter('action_recognition_videos_total', 'Videos processed, by source.', ('source',))
+frames_total = metrics.counter('action_recognition_frames_total', 'Frames processed, by source.', ('source',))
+video_fps = metrics.histogram('action_recognition_video_fps', 'Frames processed per second of each video.', ('source',),
+                              buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500))
+stage_seconds = metrics.counter('action_recognition_stage_seconds_total', 'Cumulative time spent in each stage; stages run concurrently.', ('stage',))
+stage_calls = metrics.counter('action_recognition_stage_calls_total', 'Calls of each stage (frames for the per-frame stages, batches for inference).', ('stage',))
+queue_depth = metrics.histogram('action_recognition_pipeline_queue_depth', 'Largest number of frames waiting on each pipeline queue, per video.', ('queue',),
+                                buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128))
+video_events_total = metrics.counter('action_recognition_video_events_total', 'Events counted while processing videos, such as windows classified or gated by motion.', ('event',))
+videos_waiting = metrics.gauge('action_recognition_videos_waiting', 'Videos waiting for a free video worker.')
+videos_in_progress = metrics.gauge('action_recognition_videos_in_progress', 'Videos being processed by the video workers.')
+videos_waiting.set(0)
+videos_in_progress.set(0)
+metrics.gauge('action_recognition_jobs', 'Background jobs kept in memory, by status.', ('status',),
+              lambda: {(status,): count for status, count in job_store.count_by_status().items()})
+result_cache_lookups = metrics.counter('action_recognition_result_cache_lookups_total', 'Result cache lookups, by endpoint and result (hit or miss).', ('endpoint', 'result'))
+if result_cache is not None:
+    metrics.gauge('action_recognition_result_cache_bytes', 'Size of the cached results.', function=lambda: result_cache.stats()['bytes'])
+    metrics.gauge('action_recognition_result_cache_entries', 'Videos with cached results.', function=lambda: result_cache.stats()['entries'])
+    metrics.gauge('action_recognition_result_cache_evictions', 'Cache entries evicted since the server started.', function=lambda: result_cache.stats()['evictions'])
+metrics.gauge('action_recognition_model_ready', 'Whether a version of the default model is loaded and warmed up.',
+              function=lambda: int(model_registry.model_status()[0] == 'ready'))
+metrics.gauge('action_recognition_model_requests_in_progress', 'Requests using each loaded model version.', ('model', 'version'),
+              lambda: {(model['name'], model['version']): model['requests_in_progress']
+                       for model in model_registry.status()['models'] if 'requests_in_progress' in model})
+inference_batch_size = metrics.histogram('action_recognition_inference_batch_size', 'Items (frames, windows or clips) per forward pass of the dynamic batcher, by function.',
+                                         ('function',), buckets=BATCH_SIZE_BUCKETS)
+inference_queue_wait = metrics.histogram('action_recognition_inference_queue_wait_seconds', 'Time model calls wait in the dynamic batcher before their forward pass, by function.',
+                                         ('function',), buckets=QUEUE_WAIT_BUCKETS)
+
+def record_inference_batch(function, batch_size, queue_waits):
+    inference_batch_size.observe(batch_size, function=function)
+    for queue_wait in queue_waits:
+        inference_queue_wait.observe(queue_wait, function=function)
+
+# The model loader reports to the metrics above, so it is started once they are defined.
+model_registry.start()
+
+def record_video_metrics(source, stage_timer):
+    video_metrics = stage_timer.to_dict()
+    videos_total.inc(source=source)
+    frames_total.inc(stage_timer.frames, source=source)
+    if video_metrics['elapsed_seconds'] > 0:
+        video_fps.observe(stage_timer.frames / video_metrics['elapsed_seconds'], source=source)
+    for stage, stage_metrics in video_metrics['stages'].items():
+        stage_seconds.inc(stage_metrics['seconds'], stage=stage)
+        stage_calls.inc(stage_metrics['calls'], stage=stage)
+    for event, count in video_metrics['counts'].items():
+        video_events_total.inc(count, event=event)
+    for queue_name, depth in video_metrics['max_queue_depths'].items():
+        queue_depth.observe(depth, queue=queue_name)
+    if LOG_REQUEST_METRICS:
+        app.logger.info('%s %s', source, json.dumps(video_metrics))
+
+def submit_to_video_worker(function, *args, **kwargs):
+    videos_waiting.inc()
+    def run():
+        videos_waiting.dec()
+        videos_in_progress.inc()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            videos_in_progress.dec()
+    return video_executor.submit(run)
+
+def run_on_video_worker(function, *args, **kwargs):
+    return submit_to_video_worker(function, *args, **kwargs).result()
+
+@app.before_request
+def start_request_timer():
+    g.request_started_at = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    requests_total.inc(endpoint=endpoint, status=response.status_code)
+    request_seconds.observe(time.perf_counter() - g.request_started_at, endpoint=endpoint)
+    if 'stage_timer' in g:
+        record_video_metrics(endpoint, g.stage_timer)
+    return response
+
+def annotate_frame(frame, predicted_class_name):
+    cv2.putText(frame, predicted_class_name, (10, 115), cv2.FONT_HERSHEY_SIMPLEX, 5, (0, 0, 0), 5)
+
+def predict_on_video(video_file_path, output_file_path, SEQUENCE_LENGTH, batch_size=INFERENCE_BATCH_SIZE, stride=INFERENCE_STRIDE,
+                     progress_callback=None, stage_timer=None, motion_threshold=MOTION_THRESHOLD, smoothing=SMOOTHING, served_model=None):
+    served_model = served_model or get_default_model()
+    video_reader = cv2.VideoCapture(video_file_path)
+    video_frames_count = int(video_reader.get(cv2.CAP_PROP_FRAME_COUNT))
+    Original_video_width = int(video_reader.get(cv2.CAP_PROP_FRAME_WIDTH))
+    Original_video_height = int(video_reader.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    video_writer = cv2.VideoWriter(output_file_path, cv2.VideoWriter_fourcc('M', 'P', '4', 'V'),
+                                   video_reader.get(cv2.CAP_PROP_FPS), (Original_video_width, Original_video_height))
+    
+    classifier = SlidingWindowClassifier(served_model.inference_model, SEQUENCE_LENGTH, stride, motion_threshold, smoothing)
+
+    frames_progress_callback = None
+    if progress_callback is not None:
+        frames_progress_callback = lambda frames_processed: progress_callback(frames_processed, video_frames_count)
+
+    try:
+        run_video_pipeline(video_reader, video_writer, classifier, served_model.classes_list, served_model.preprocess_frame, annotate_frame,
+                           batch_size, PREPROCESS_WORKERS, PIPELINE_QUEUE_SIZE, frames_progress_callback, stage_timer)
+    finally:
+        video_reader.release()
+        video_writer.release()
+        if stage_timer is not None:
+            stage_timer.count('windows_classified', classifier.windows_classified)
+            stage_timer.count('windows_gated', classifier.windows_gated)
+
+def save_upload(video_file, directory):
+    input_video_path = os.path.join(directory, 'input_video' + (os.path.splitext(video_file.filename or '')[1] or '.mp4'))
+    video_file.save(input_video_path)
+    return input_video_path
+
+def read_positive_int(name, default):
+    try:
+        value = int(request.values.get(name, default))
+    except ValueError:
+        value = 0
+    if value < 1:
+        abort(400, f'{name} must be a positive integer')
+    return value
+
+def read_classifier_options():
+    try:
+        motion_threshold = float(request.values.get('motion_threshold', MOTION_THRESHOLD))
+    except ValueError:
+        motion_threshold = -1
+    if motion_threshold < 0:
+        abort(400, 'motion_threshold must be a non-negative number')
+    smoothing = request.values.get('smoothing', SMOOTHING)
+    if smoothing not in SMOOTHING_MODES:
+        abort(400, f'smoothing must be one of {", ".join(SMOOTHING_MODES)}')
+    return {'motion_threshold': motion_threshold, 'smoothing': smoothing}
+
+def predict_timeline_on_video(video_file_path, stride, with_segments=True, progress_callback=None, stage_timer=None,
+                              motion_threshold=MOTION_THRESHOLD, smoothing=SMOOTHING, served_model=None):
+    served_model = served_model or get_default_model()
+    video_reader = cv2.VideoCapture(video_file_path)
+    video_frames_count = int(video_reader.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    frames_progress_callback = None
+    if progress_callback is not None:
+        frames_progress_callback = lambda frames_processed: progress_callback(frames_processed, video_frames_count)
+
+    try:
+        windows = predict_timeline(video_reader, served_model.inference_model, served_model.sequence_length, served_model.classes_list,
+                                   served_model.preprocess_frame, stride, INFERENCE_BATCH_SIZE, frames_progress_callback, stage_timer, motion_threshold, smoothing)
+        fps = video_reader.get(cv2.CAP_PROP_FPS)
+    finally:
+        video_reader.release()
+
+    timeline = {'model': served_model.name, 'model_version': served_model.version, 'fps': fps, 'frames_count': video_frames_count,
+                'sequence_length': served_model.sequence_length, 'stride': stride, 'motion_threshold': motion_threshold, 'smoothing': smoothing, 'windows': windows}
+    if with_segments:
+        timeline['segments'] = merge_segments(windows)
+    return timeline
+
+def stream_timeline_on_video(video_file_path, send_line, streaming, stride, with_segments=True, stage_timer=None,
+                             motion_threshold=MOTION_THRESHOLD, smoothing=SMOOTHING, served_model=None):
+    stage_timer = stage_timer or StageTimer()
+    served_model = served_model or get_default_model()
+    video_reader = cv2.VideoCapture(video_file_path)
+    try:
+        if not video_reader.isOpened():
+            send_line({'type': 'error', 'error': 'Could not decode the video'})
+            return
+        if not send_line({'type': 'start', 'streaming': streaming, 'model': served_model.name, 'model_version': served_model.version,
+                          'fps': video_reader.get(cv2.CAP_PROP_FPS), 'sequence_length': served_model.sequence_length, 'stride': stride, 'motion_threshold': motion_threshold, 'smoothing': smoothing}):
+            return
+
+        windows = []
+        timeline = iterate_timeline(video_reader, served_model.inference_model, served_model.sequence_length, served_model.classes_list,
+                                    served_model.preprocess_frame, stride, INFERENCE_BATCH_SIZE, None, stage_timer, motion_threshold, smoothing)
+        try:
+            for window in timeline:
+                windows.append(window)
+                if not send_line(dict(window, type='window')):
+                    return
+        finally:
+            timeline.close()
+    finally:
+        video_reader.release()
+
+    end = {'type': 'end', 'frames_count': stage_timer.frames}
+    if with_segments:
+        end['segments'] = merge_segments(windows)
+    send_line(end)
+
+def send_open_file(sent_file, mimetype, chunk_size=1 << 20):
+    # send_file() passes the file straight to the server and never runs close callbacks,
+    # so stream the file ourselves and close it once it is sent.
+    def read_chunks():
+        while True:
+            chunk = sent_file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    response = Response(read_chunks(), mimetype=mimetype)
+    response.content_length = os.fstat(sent_file.fileno()).st_size
+    response.call_on_close(sent_file.close)
+    return response
+
+def send_file_and_cleanup(file_path, cleanup_dir, mimetype):
+    response = send_open_file(open(file_path, 'rb'), mimetype)
+    response.call_on_close(lambda: shutil.rmtree(cleanup_dir, ignore_errors=True))
+    return response
+
+def read_result_cache_key(video_file_path, parameters, stage_timer, served_model):
+    with stage_timer.time('hash'):
+        content_hash = file_sha256(video_file_path)
+    parameters = dict(parameters, sequence_length=served_model.sequence_length, image_size=[served_model.image_height, served_model.image_width],
+                      classes=served_model.classes_list)
+    model_identity = {'backend': INFERENCE_BACKEND, 'name': served_model.name, 'version': served_model.version, 'files': served_model.files_identity}
+    return result_cache_key(content_hash, model_identity, parameters)
+
+def acquire_requested_model():
+    # The model version chosen by the model and version parameters of the request, held until released.
+    try:
+        return acquire_model(request.values.get('model') or None, request.values.get('version') or None)
+    except LookupError as error:
+        abort(404, str(error))
+    except RuntimeError as error:
+        abort(503, str(error))
+
+def set_model_headers(response, served_model):
+    response.headers['X-Model'] = served_model.name
+    response.headers['X-Model-Version'] = served_model.version
+    return response
+
+def count_result_cache_lookup(endpoint, hit):
+    result_cache_lookups.inc(endpoint=endpoint, result='hit' if hit else 'miss')
+
+def store_in_result_cache(store, *args):
+    try:
+        store(*args)
+    except OSError:
+        app.logger.warning('Could not store a result in the cache', exc_info=True)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    status, error = model_registry.model_status()
+    if status == 'loading':
+        return jsonify({'ready': False, 'status': 'loading'}), 503
+    if status == 'failed':
+        return jsonify({'ready': False, 'status': 'failed', 'error': error}), 503
+    return jsonify({'ready': True, 'status': 'ready'})
+
+@app.route('/models', methods=['GET'])
+def list_models():
+    return jsonify(model_registry.status())
+
+@app.route('/models/reload', methods=['POST'])
+def reload_models():
+    # Look for new model files now rather than at the next poll; they are loaded in the background.
+    model_registry.scan()
+    return jsonify(model_registry.status()), 202
+
+@app.route('/streams', methods=['GET'])
+def list_streams():
+    return jsonify(stream_manager.status())
+
+@app.route('/streams/<name>/events', methods=['GET'])
+def stream_events(name):
+    if name not in STREAM_SOURCES:
+        return jsonify({'error': 'Unknown stream'}), 404
+    changes_only = request.values.get('changes_only', '0') not in ('0', 'false')
+    try:
+        event_queue = stream_manager.subscribe(name)
+    except IOError as error:
+        return jsonify({'error': str(error)}), 503
+
+    def send_events():
+        while True:
+            try:
+                event = event_queue.get(timeout=STREAM_HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                yield ': heartbeat\n\n'
+                continue
+            if event is None:
+                yield 'event: end\ndata: {}\n\n'
+                break
+            if event['changed'] or not changes_only:
+                yield f'event: label\ndata: {json.dumps(event)}\n\n'
+
+    response = Response(send_events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(lambda: stream_manager.unsubscribe(name, event_queue))
+    return response
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    if 'video' not in request.files:
+        return "Please provide a video file", 400
+    
+    video_file = request.files['video']
+    stride = read_positive_int('stride', INFERENCE_STRIDE)
+    classifier_options = read_classifier_options()
+    served_model = acquire_requested_model()
+
+    request_dir = tempfile.mkdtemp(prefix='action-recognition-')
+    stage_timer = StageTimer()
+    try:
+        with stage_timer.time('upload'):
+            input_video_path = save_upload(video_file, request_dir)
+        output_video_path = os.path.join(request_dir, 'output_video.mp4')
+
+        cache_key = None
+        if result_cache is not None and RESULT_CACHE_VIDEOS:
+            cache_key = read_result_cache_key(input_video_path, dict(endpoint='predict', stride=stride, **classifier_options), stage_timer,
+                                              served_model)
+            cached_video = result_cache.open(cache_key, 'output_video.mp4')
+            count_result_cache_lookup('/predict', cached_video is not None)
+            if cached_video is not None:
+                shutil.rmtree(request_dir, ignore_errors=True)
+                return set_model_headers(send_open_file(cached_video, 'video/mp4'), served_model)
+
+        g.stage_timer = stage_timer
+        run_on_video_worker(predict_on_video, input_video_path, output_video_path, served_model.sequence_length, stride=stride,
+                            stage_timer=stage_timer, served_model=served_model, **classifier_options)
+        if cache_key is not None:
+            store_in_result_cache(result_cache.put, cache_key, 'output_video.mp4', output_video_path)
+
+    except Exception:
+        shutil.rmtree(request_dir, ignore_errors=True)
+        raise
+    finally:
+        served_model.release()
+
+    return set_model_headers(send_file_and_cleanup(output_video_path, request_dir, 'video/mp4'), served_model)
+
+@app.route('/predict/timeline', methods=['POST'])
+def predict_timeline_endpoint():
+    if 'video' not in request.files:
+        return "Please provide a video file", 400
+
+    # By default the windows of the JSON endpoints do not overlap: the stride is the sequence length of the model.
+    served_model = acquire_requested_model()
+    request_dir = tempfile.mkdtemp(prefix='action-recognition-')
+    stage_timer = StageTimer()
+    try:
+        stride = read_positive_int('stride', served_model.sequence_length)
+        with_segments = request.values.get('segments', '1') not in ('0', 'false')
+        classifier_options = read_classifier_options()
+
+        with stage_timer.time('upload'):
+            input_video_path = save_upload(request.files['video'], request_dir)
+
+        timeline = None
+        if result_cache is not None:
+            cache_key = read_result_cache_key(input_video_path, dict(endpoint='timeline', stride=stride, **classifier_options), stage_timer,
+                                              served_model)
+            timeline = result_cache.get_json(cache_key, 'timeline.json')
+            count_result_cache_lookup('/predict/timeline', timeline is not None)
+
+        if timeline is None:
+            g.stage_timer = stage_timer
+            timeline = run_on_video_worker(predict_timeline_on_video, input_video_path, stride, stage_timer=stage_timer,
+                                           served_model=served_model, **classifier_options)
+            if result_cache is not None:
+                store_in_result_cache(result_cache.put_json, cache_key, 'timeline.json', timeline)
+    finally:
+        shutil.rmtree(request_dir, ignore_errors=True)
+        served_model.release()
+
+    if not with_segments:
+        del timeline['segments']
+
+    return set_model_headers(jsonify(timeline), served_model)
+
+@app.route('/predict/stream', methods=['POST'])
+def predict_stream():
+    # Classifies the video while it is uploaded, from the raw request body, and sends every window
+    # as a JSON line as soon as it is classified. Containers that can be decoded sequentially
+    # (Matroska/WebM, MPEG-TS, MP4 with the index first) are fed to the decoder through a pipe as
+    # they arrive; other containers, and multipart uploads, are spooled to disk first.
+    if request.mimetype == 'multipart/form-data' and 'video' not in request.files:
+        return "Please provide a video file", 400
+
+    served_model = acquire_requested_model()
+    upload = None
+    request_dir = tempfile.mkdtemp(prefix='action-recognition-')
+    stage_timer = StageTimer()
+    try:
+        stride = read_positive_int('stride', served_model.sequence_length)
+        with_segments = request.values.get('segments', '1') not in ('0', 'false')
+        classifier_options = read_classifier_options()
+
+        if request.mimetype == 'multipart/form-data':
+            with stage_timer.time('upload'):
+                input_video_path = save_upload(request.files['video'], request_dir)
+        else:
+            header, streamable = sniff_container(request.stream)
+            if not header:
+                shutil.rmtree(request_dir, ignore_errors=True)
+                served_model.release()
+                return "Please provide a video file", 400
+            input_video_path = os.path.join(request_dir, 'input_video')
+            if streamable and can_stream_uploads():
+                upload = FifoUpload(request.stream, header, input_video_path).start()
+            else:
+                with stage_timer.time('upload'):
+                    spool_upload(request.stream, header, input_video_path)
+    except Exception:
+        shutil.rmtree(request_dir, ignore_errors=True)
+        served_model.release()
+        raise
+
+    results = queue.Queue(maxsize=STREAMED_RESULTS_QUEUE_SIZE)
+    client_gone = threading.Event()
+
+    def send_line(line):
+        while not client_gone.is_set():
+            try:
+                results.put(line, timeout=1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce_results():
+        try:
+            stream_timeline_on_video(input_video_path, send_line, upload is not None, stride, with_segments, stage_timer,
+                                     served_model=served_model, **classifier_options)
+            if upload is not None:
+                upload.close()
+                if upload.error is not None:
+                    send_line({'type': 'error', 'error': f'The upload failed: {upload.error}'})
+        except Exception as error:
+            app.logger.exception('Streamed prediction failed')
+            send_line({'type': 'error', 'error': str(error)})
+        finally:
+            if upload is not None:
+                upload.close()
+            shutil.rmtree(request_dir, ignore_errors=True)
+            served_model.release()
+            record_video_metrics('/predict/stream', stage_timer)
+            send_line(None)
+
+    submit_to_video_worker(produce_results)
+
+    def send_results():
+        while True:
+            line = results.get()
+            if line is None:
+                break
+            yield json.dumps(line) + '\n'
+
+    response = Response(send_results(), mimetype='application/x-ndjson', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(client_gone.set)
+    return set_model_headers(response, served_model)
+
+# A job runs on the model version chosen when it was submitted, held until it finishes.
+def run_video_job(job, input_video_path, output_video_path, stride, classifier_options, served_model):
+    stage_timer = StageTimer()
+    try:
+        predict_on_video(input_video_path, output_video_path, served_model.sequence_length, stride=stride, progress_callback=job.update_progress,
+                         stage_timer=stage_timer, served_model=served_model, **classifier_options)
+    finally:
+        served_model.release()
+    record_video_metrics('job', stage_timer)
+
+def run_timeline_job(job, input_video_path, result_path, stride, classifier_options, served_model):
+    stage_timer = StageTimer()
+    try:
+        timeline = predict_timeline_on_video(input_video_path, stride, progress_callback=job.update_progress, stage_timer=stage_timer,
+                                             served_model=served_model, **classifier_options)
+    finally:
+        served_model.release()
+    with open(result_path, 'w') as result_file:
+        json.dump(timeline, result_file)
+    record_video_metrics('job', stage_timer)
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    if 'video' not in request.files:
+        return "Please provide a video file", 400
+
+    video_file = request.files['video']
+    result_format = request.values.get('format', 'video')
+    if result_format not in ('video', 'json'):
+        return "format must be 'video' or 'json'", 400
+    served_model = acquire_requested_model()
+    try:
+        stride = read_positive_int('stride', served_model.sequence_length if result_format == 'json' else INFERENCE_STRIDE)
+        classifier_options = read_classifier_options()
+    except Exception:
+        served_model.release()
+        raise
+
+    job = Job(tempfile.mkdtemp(prefix='action-recognition-job-'))
+    try:
+        input_video_path = save_upload(video_file, job.job_dir)
+    except Exception:
+        shutil.rmtree(job.job_dir, ignore_errors=True)
+        served_model.release()
+        raise
+
+    if result_format == 'json':
+        job.result_path = os.path.join(job.job_dir, 'timeline.json')
+        job.result_mimetype = 'application/json'
+        job_store.submit(job, run_timeline_job, input_video_path, job.result_path, stride, classifier_options, served_model)
+    else:
+        job.result_path = os.path.join(job.job_dir, 'output_video.mp4')
+        job.result_mimetype = 'video/mp4'
+        job_store.submit(job, run_video_job, input_video_path, job.result_path, stride, classifier_options, served_model)
+    return jsonify(job.to_dict()), 202, {'Location': f'/jobs/{job.job_id}'}
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    if job.status == 'failed':
+        return jsonify(job.to_dict()), 500
+    if job.status != 'done':
+        return jsonify(job.to_dict()), 409
+    return send_file(job.result_path, mimetype=job.result_mimetype)
+
+# http://127.0.0.1:5000/predict
\ No newline at end of file
@@ -0,0 +1,222 @@
+import os
+import csv
+import json
+import time
+import multiprocessing
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from .dataset_builder import extract_clip
+
+# Files listed when a directory is classified.
+VIDEO_EXTENSIONS = ('.avi', '.mp4', '.mkv', '.mov', '.webm', '.mpg', '.mpeg', '.m4v', '.wmv', '.flv')
+
+# Default number of clips classified by the model in one call.
+BATCH_SIZE = 64
+
+# Number of videos queued per decoding process, so that the processes never wait for work
+# while the model classifies a batch.
+VIDEOS_QUEUED_PER_WORKER = 4
+
+
+def list_videos(input_path):
+    # This function will list the videos to classify: the video files under a directory, in a
+    # stable order, or the videos of a manifest. A manifest is a text file with one path per
+    # line, a .jsonl file with a "path" field per line, or a .csv file with a "path" column;
+    # relative paths are relative to the manifest.
+    # Returns:
+    #   video_paths: A list of paths.
+
+    if os.path.isdir(input_path):
+        video_paths = []
+        for directory, directory_names, file_names in os.walk(input_path):
+            directory_names.sort()
+            video_paths.extend(os.path.join(directory, file_name) for file_name in sorted(file_names)
+                               if file_name.lower().endswith(VIDEO_EXTENSIONS))
+        return video_paths
+
+    with open(input_path, newline='') as manifest_file:
+        if input_path.endswith('.csv'):
+            paths = [row['path'] for row in csv.DictReader(manifest_file)]
+        elif input_path.endswith('.jsonl'):
+            paths = [json.loads(line)['path'] for line in manifest_file if line.strip()]
+        else:
+            paths = [line.strip() for line in manifest_file if line.strip() and not line.startswith('#')]
+    manifest_dir = os.path.dirname(input_path)
+    return [os.path.join(manifest_dir, path) for path in paths]
+
+
+def decode_video_clip(video_path, sequence_length, image_height, image_width):
+    # This function will sample and resize the clip of one video, in a decoding process.
+    # Returns:
+    #   video_path: The path of the video.
+    #   clip: The uint8 clip, or None if the video could not be read.
+    #   error: Why the video could not be read, or None.
+    #   decode_seconds: The time spent decoding and resizing.
+
+    start_time = time.perf_counter()
+    try:
+        clip = extract_clip(video_path, sequence_length, image_height, image_width)
+        error = None if clip is not None else f'fewer than {sequence_length} readable frames'
+    except Exception as exception:
+        clip, error = None, str(exception)
+    return video_path, clip, error, time.perf_counter() - start_time
+
+
+def _init_worker():
+    # Every process decodes its own videos, so keep OpenCV from starting a thread pool in each of them.
+    cv2.setNumThreads(1)
+
+
+def _decoding_pool(max_workers):
+    # The parent process runs TensorFlow, which must not be forked, so the decoding processes are
+    # started from a fresh forkserver (or spawned) process instead.
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(start_method),
+                               initializer=_init_worker)
+
+
+def truncate_partial_line(output_path):
+    # A run killed while writing can leave half a line at the end of the output; drop it.
+    with open(output_path, 'rb+') as output_file:
+        content = output_file.read()
+        if content and not content.endswith(b'\n'):
+            output_file.truncate(content.rfind(b'\n') + 1)
+
+
+def read_completed_paths(output_path, output_format, fieldnames):
+    # This function will read the videos already classified by an earlier run into the same output.
+    # Returns:
+    #   completed_paths: The set of their paths.
+
+    if not os.path.exists(output_path):
+        return set()
+    truncate_partial_line(output_path)
+    with open(output_path, newline='') as output_file:
+        if output_format == 'csv':
+            reader = csv.DictReader(output_file)
+            if reader.fieldnames is not None and reader.fieldnames != fieldnames:
+                raise ValueError(f'{output_path} has other columns than {fieldnames}; was it written for other classes?')
+            return {row['path'] for row in reader}
+        return {json.loads(line)['path'] for line in output_file if line.strip()}
+
+
+class ResultsWriter:
+    # Appends results to a JSONL or CSV file. The lines are flushed to the disk after every
+    # batch, which is the checkpoint an interrupted run resumes from.
+
+    def __init__(self, output_file, output_format, classes_list):
+        self.output_file = output_file
+        self.output_format = output_format
+        self.classes_list = classes_list
+        if output_format == 'csv':
+            self.csv_writer = csv.DictWriter(output_file, results_fieldnames(classes_list))
+            if output_file.tell() == 0:
+                self.csv_writer.writeheader()
+
+    def write(self, result):
+        if self.output_format == 'csv':
+            row = {key: value for key, value in result.items() if key != 'probabilities'}
+            for class_name in self.classes_list:
+                row[f'probability_{class_name}'] = (result['probabilities'] or {}).get(class_name)
+            self.csv_writer.writerow(row)
+        else:
+            self.output_file.write(json.dumps(result) + '\n')
+
+    def checkpoint(self):
+        self.output_file.flush()
+        os.fsync(self.output_file.fileno())
+
+
+def results_fieldnames(classes_list):
+    return ['path', 'label', 'confidence', 'error', 'decode_seconds', 'inference_seconds'] + [
+        f'probability_{class_name}' for class_name in classes_list]
+
+
+def classify_videos(video_paths, inference_model, classes_list, output_path, batch_size=BATCH_SIZE, max_workers=None):
+    # This function will classify many videos like predict_single_action() in model.py: a pool
+    # of processes decodes and samples the clips of the videos, while this process classifies
+    # them in large batches, so the run is bounded by the decoding throughput of all the cores.
+    # Every result is written to the output, a .csv file or else JSONL, and the videos it already
+    # contains are skipped, so an interrupted run carries on where it stopped.
+    # Args:
+    #   video_paths: The paths of the videos, e.g. from list_videos().
+    #   inference_model: The InferenceModel (or TFLiteInferenceModel) of the LRCN model.
+    #   classes_list: The class names indexed by the model's predicted labels.
+    #   output_path: The JSONL or CSV file the results are appended to.
+    #   batch_size: The number of clips classified in one call of the model.
+    #   max_workers: The number of decoding processes (defaults to the number of CPUs).
+    # Returns:
+    #   summary: The numbers of videos classified, failed and skipped, and the throughput.
+
+    output_format = 'csv' if output_path.endswith('.csv') else 'jsonl'
+    completed_paths = read_completed_paths(output_path, output_format, results_fieldnames(classes_list))
+    pending_paths = iter([video_path for video_path in video_paths if video_path not in completed_paths])
+    max_workers = max_workers or os.cpu_count()
+
+    summary = {'videos': len(video_paths), 'skipped': len(set(video_paths) & completed_paths), 'classified': 0, 'failed': 0,
+               'decode_seconds': 0.0, 'inference_seconds': 0.0}
+    print(f'Classifying {summary["videos"] - summary["skipped"]} videos, {summary["skipped"]} were classified by an earlier run')
+    start_time = time.perf_counter()
+
+    def classify_batch(decoded_videos):
+        inference_start_time = time.perf_counter()
+        predicted_labels_probabilities = inference_model.classify_clips(np.asarray([clip for _, clip, _ in decoded_videos]))
+        inference_seconds = time.perf_counter() - inference_start_time
+        summary['inference_seconds'] += inference_seconds
+
+        for (video_path, _, decode_seconds), probabilities in zip(decoded_videos, predicted_labels_probabilities):
+            predicted_label = int(np.argmax(probabilities))
+            results_writer.write({
+                'path': video_path,
+                'label': classes_list[predicted_label],
+                'confidence': float(probabilities[predicted_label]),
+                'error': None,
+                'decode_seconds': decode_seconds,
+                'inference_seconds': inference_seconds / len(decoded_videos),
+                'probabilities': dict(zip(classes_list, probabilities.tolist())),
+            })
+        summary['classified'] += len(decoded_videos)
+        results_writer.checkpoint()
+
+    executor = _decoding_pool(max_workers)
+    try:
+        with open(output_path, 'a', newline='') as output_file:
+            results_writer = ResultsWriter(output_file, output_format, classes_list)
+            decoding = set()
+            decoded_videos = []
+            while True:
+                # Keep every decoding process busy while the model classifies.
+                while len(decoding) < max_workers * VIDEOS_QUEUED_PER_WORKER:
+                    video_path = next(pending_paths, None)
+                    if video_path is None:
+                        break
+                    decoding.add(executor.submit(decode_video_clip, video_path, inference_model.sequence_length,
+                                                 inference_model.image_height, inference_model.image_width))
+                if not decoding:
+                    break
+
+                decoded, decoding = wait(decoding, return_when=FIRST_COMPLETED)
+                for future in decoded:
+                    video_path, clip, error, decode_seconds = future.result()
+                    summary['decode_seconds'] += decode_seconds
+                    if clip is None:
+                        results_writer.write({'path': video_path, 'label': None, 'confidence': None, 'error': error,
+                                              'decode_seconds': decode_seconds, 'inference_seconds': None, 'probabilities': None})
+                        summary['failed'] += 1
+                    else:
+                        decoded_videos.append((video_path, clip, decode_seconds))
+
+                while len(decoded_videos) >= batch_size:
+                    classify_batch(decoded_videos[:batch_size])
+                    del decoded_videos[:batch_size]
+
+            if decoded_videos:
+                classify_batch(decoded_videos)
+            results_writer.checkpoint()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+    summary['seconds'] = time.perf_counter() - start_time
+    summary['videos_per_second'] = (summary['classified'] + summary['failed']) / summary['seconds'] if summary['seconds'] else None
+    return summary
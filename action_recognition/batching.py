@@ -0,0 +1,138 @@
+import time
+import queue
+import threading
+import numpy as np
+from concurrent.futures import Future
+
+# Histogram buckets of the number of items per batch, and of the time calls wait to be batched, in seconds.
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class DynamicBatcher:
+    # Coalesces the calls of a batched function (N items in, N results out) made by many threads
+    # into fewer, larger calls. The calls are queued and a scheduler thread runs the function on
+    # their concatenated inputs: it takes the oldest call, adds the following ones until the
+    # batch would exceed max_batch_size items or the oldest call has waited max_wait_seconds,
+    # then splits the results back to the callers. Calls arriving while a batch runs are queued
+    # meanwhile, so under load the batches fill up without waiting at all. With several threads,
+    # as many batches run at the same time, for a function that runs them in parallel.
+
+    def __init__(self, function, max_batch_size, max_wait_seconds, name='dynamic-batcher', on_batch=None, threads=1):
+        # Args:
+        #   function: A function mapping an array of N items to an array of N results.
+        #   max_batch_size: The largest number of items in one call, unless a single call has more.
+        #   max_wait_seconds: How long the oldest call waits for others to join its batch.
+        #   on_batch: Called after every batch with the number of items and the queue waits of its calls.
+        #   threads: The number of batches run at the same time.
+        self.function = function
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.on_batch = on_batch
+        self.pending = queue.Queue()
+        self.threads = [threading.Thread(target=self.run, name=f'{name}-{thread_index}', daemon=True) for thread_index in range(threads)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, inputs):
+        # This function will queue a call of the function.
+        # Returns:
+        #   future: A Future of the results for these inputs.
+        future = Future()
+        self.pending.put((np.asarray(inputs), future, time.perf_counter()))
+        return future
+
+    def __call__(self, inputs):
+        if len(inputs) == 0:
+            return self.function(inputs)
+        return self.submit(inputs).result()
+
+    def close(self):
+        # The calls queued before closing are still run.
+        for thread in self.threads:
+            self.pending.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def run(self):
+        next_call = None
+        closing = False
+        while not closing:
+            call = next_call or self.pending.get()
+            next_call = None
+            if call is None:
+                break
+
+            batch = [call]
+            batch_size = len(call[0])
+            deadline = call[2] + self.max_wait_seconds
+            while batch_size < self.max_batch_size:
+                try:
+                    call = self.pending.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if call is None:
+                    closing = True
+                    break
+                if batch_size + len(call[0]) > self.max_batch_size:
+                    next_call = call
+                    break
+                batch.append(call)
+                batch_size += len(call[0])
+            self.run_batch(batch, batch_size)
+
+    def run_batch(self, batch, batch_size):
+        started_at = time.perf_counter()
+        try:
+            inputs = batch[0][0] if len(batch) == 1 else np.concatenate([inputs for inputs, _, _ in batch])
+            outputs = self.function(inputs)
+        except Exception as error:
+            for _, future, _ in batch:
+                future.set_exception(error)
+        else:
+            start = 0
+            for inputs, future, _ in batch:
+                future.set_result(outputs[start:start + len(inputs)])
+                start += len(inputs)
+        if self.on_batch is not None:
+            self.on_batch(batch_size, [started_at - queued_at for _, _, queued_at in batch])
+
+
+class BatchingInferenceModel:
+    # The interface of InferenceModel, where the calls of all the threads sharing the model go
+    # through one DynamicBatcher per function, so that concurrent requests share forward passes.
+    # max_batch_size counts frames: the CNN gets up to that many frames, the temporal head as many
+    # windows, and classify_clips enough clips to make as many frames.
+
+    def __init__(self, inference_model, max_batch_size, max_wait_seconds, on_batch=None, threads=1):
+        # Args:
+        #   inference_model: The InferenceModel (or TFLiteInferenceModel) running the batches.
+        #   on_batch: Called after every batch with the function name, the number of items and the
+        #             queue waits of its calls.
+        #   threads: The number of batches of each function run at the same time, e.g. one per inference worker.
+        self.inference_model = inference_model
+        self.image_height = inference_model.image_height
+        self.image_width = inference_model.image_width
+        self.sequence_length = inference_model.sequence_length
+        self.features_size = inference_model.features_size
+
+        def create_batcher(function_name, function_max_batch_size):
+            batch_callback = None
+            if on_batch is not None:
+                batch_callback = lambda batch_size, queue_waits: on_batch(function_name, batch_size, queue_waits)
+            return DynamicBatcher(getattr(inference_model, function_name), function_max_batch_size, max_wait_seconds,
+                                  f'batcher-{function_name}', batch_callback, threads)
+
+        self.extract_features = create_batcher('extract_features', max_batch_size)
+        self.classify_features = create_batcher('classify_features', max_batch_size)
+        self.classify_clips = create_batcher('classify_clips', max(max_batch_size // self.sequence_length, 1))
+
+    def warm_up(self, batch_size=1):
+        self.inference_model.warm_up(batch_size)
+
+    def close(self):
+        # The batchers finish the calls queued before the model they run on is closed.
+        for batcher in (self.extract_features, self.classify_features, self.classify_clips):
+            batcher.close()
+        if hasattr(self.inference_model, 'close'):
+            self.inference_model.close()
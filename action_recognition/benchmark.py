@@ -0,0 +1,278 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import cv2
+import numpy as np
+
+# Codecs the synthetic videos are encoded with, and the container each one is written to.
+VIDEO_CODECS = {'mp4v': '.mp4', 'MJPG': '.avi', 'XVID': '.avi', 'avc1': '.mp4'}
+
+
+def generate_video(video_path, width, height, frames_count, codec, fps=25):
+    # This function will write a synthetic video: moving shapes over a noisy gradient, so that
+    # encoders have motion and texture to compress, like a real recording.
+    # Returns:
+    #   written: Whether OpenCV could encode the video with the given codec.
+
+    video_writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*codec), fps, (width, height))
+    if not video_writer.isOpened():
+        return False
+
+    rng = np.random.default_rng(0)
+    background = np.tile(np.linspace(0, 255, width, dtype=np.uint8)[None, :, None], (height, 1, 3))
+    radius = max(min(width, height) // 8, 4)
+    for frame_index in range(frames_count):
+        frame = cv2.add(background, rng.integers(0, 16, background.shape, dtype=np.uint8))
+        center_x = radius + (frame_index * 7) % max(width - 2 * radius, 1)
+        center_y = height // 2 + int(height / 4 * np.sin(frame_index / 10))
+        cv2.circle(frame, (center_x, center_y), radius, (0, 200, 255), -1)
+        cv2.rectangle(frame, (width - center_x - radius, radius), (width - center_x, 2 * radius), (255, 80, 0), -1)
+        video_writer.write(frame)
+    video_writer.release()
+    return os.path.exists(video_path) and os.path.getsize(video_path) > 0
+
+
+def latency_summary(samples):
+    # This function will summarize latency samples, in milliseconds.
+    samples = np.asarray(samples, dtype=np.float64) * 1000
+    if len(samples) == 0:
+        return {'count': 0}
+    return {
+        'count': len(samples),
+        'mean_ms': float(np.mean(samples)),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'max_ms': float(np.max(samples)),
+    }
+
+
+def benchmark_decode(video_path):
+    # This function will measure how fast OpenCV decodes every frame of a video.
+    video_reader = cv2.VideoCapture(video_path)
+    frames_count = 0
+    start_time = time.perf_counter()
+    while True:
+        ok, _ = video_reader.read()
+        if not ok:
+            break
+        frames_count += 1
+    seconds = time.perf_counter() - start_time
+    video_reader.release()
+    return {'frames': frames_count, 'seconds': seconds, 'fps': frames_count / seconds if seconds else None}
+
+
+def benchmark_preprocess(video_path, preprocess_frame, max_frames=100):
+    # This function will measure the time spent preprocessing one decoded frame.
+    video_reader = cv2.VideoCapture(video_path)
+    samples = []
+    while len(samples) < max_frames:
+        ok, frame = video_reader.read()
+        if not ok:
+            break
+        start_time = time.perf_counter()
+        preprocess_frame(frame)
+        samples.append(time.perf_counter() - start_time)
+    video_reader.release()
+    return latency_summary(samples)
+
+
+def benchmark_calls(function, repeats):
+    # This function will call a function repeatedly and summarize its latency.
+    samples = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start_time)
+    return latency_summary(samples)
+
+
+def benchmark_inference(api, repeats):
+    # This function will measure the latency of the model on one window (a single clip, as
+    # predicted for a whole video) and on the windows of the streaming classifier, where the
+    # CNN runs once per frame and each frame of a batch closes one window.
+    # Returns:
+    #   results: The latency summaries.
+
+    served_model = api.get_default_model()
+    inference_model = served_model.inference_model
+    frame_shape = (served_model.image_height, served_model.image_width, 3)
+    rng = np.random.default_rng(0)
+    clip = rng.integers(0, 256, (1, served_model.sequence_length) + frame_shape, dtype=np.uint8)
+    inference_model.classify_clips(clip)
+
+    results = {'single_window': benchmark_calls(lambda: inference_model.classify_clips(clip), repeats)}
+
+    frames_batch = rng.integers(0, 256, (api.INFERENCE_BATCH_SIZE,) + frame_shape, dtype=np.uint8)
+    classifier = api.SlidingWindowClassifier(inference_model, served_model.sequence_length, api.INFERENCE_STRIDE)
+    classifier.process(frames_batch)
+    samples = []
+    windows_count = 0
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        predictions = classifier.process(frames_batch)
+        samples.append(time.perf_counter() - start_time)
+        windows_count += sum(prediction is not None for prediction in predictions)
+    results['sliding_window_batch'] = latency_summary(samples)
+    results['sliding_window_batch']['batch_size'] = api.INFERENCE_BATCH_SIZE
+    results['sliding_window_per_window_ms'] = sum(samples) * 1000 / max(windows_count, 1)
+    return results
+
+
+def benchmark_endpoint(api, video_path, clients, requests_per_client):
+    # This function will post a video to /predict from several concurrent clients.
+    # Returns:
+    #   results: The latency summary of the requests, with the throughput of all the clients.
+
+    with open(video_path, 'rb') as video_file:
+        video_data = video_file.read()
+
+    samples = []
+    failures = []
+    samples_lock = threading.Lock()
+
+    def run_client():
+        test_client = api.app.test_client()
+        for _ in range(requests_per_client):
+            start_time = time.perf_counter()
+            response = test_client.post('/predict', data={'video': (io.BytesIO(video_data), os.path.basename(video_path))},
+                                        content_type='multipart/form-data')
+            response.get_data()
+            response.close()
+            with samples_lock:
+                if response.status_code == 200:
+                    samples.append(time.perf_counter() - start_time)
+                else:
+                    failures.append(response.status_code)
+
+    threads = [threading.Thread(target=run_client) for _ in range(clients)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start_time
+
+    results = latency_summary(samples)
+    results.update({'clients': clients, 'failures': len(failures), 'seconds': seconds,
+                    'requests_per_second': len(samples) / seconds if seconds else None})
+    return results
+
+
+def run_benchmarks(work_dir, resolutions, frames_count, codecs, clients_counts, requests_per_client, repeats):
+    # This function will generate the synthetic videos and run every benchmark on them.
+    # Returns:
+    #   report: A JSON-serializable dict with the environment and the results.
+
+    # Importing the API starts loading the model in the background. The result cache is disabled,
+    # or every request after the first would measure a cache hit.
+    os.environ['RESULT_CACHE_MAX_BYTES'] = '0'
+    from . import api
+    from .model import frames_extraction, predict_single_action
+    import tensorflow as tf
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'tensorflow': tf.__version__,
+            'inference_backend': api.INFERENCE_BACKEND,
+            'jit_compile': api.INFERENCE_JIT_COMPILE,
+            'max_concurrent_videos': api.MAX_CONCURRENT_VIDEOS,
+            'inference_workers': api.INFERENCE_WORKERS,
+            'inference_worker_threads': api.INFERENCE_WORKER_THREADS,
+            'dynamic_batching': api.DYNAMIC_BATCHING,
+            'inference_max_batch_size': api.INFERENCE_MAX_BATCH_SIZE,
+            'inference_max_wait_ms': api.INFERENCE_MAX_WAIT_MS,
+        },
+        'settings': {'frames_count': frames_count, 'repeats': repeats, 'requests_per_client': requests_per_client},
+        'videos': [],
+    }
+
+    start_time = time.perf_counter()
+    served_model = api.get_default_model()
+    report['model_ready_seconds'] = time.perf_counter() - start_time
+    report['environment']['model'] = served_model.name
+    report['environment']['model_version'] = served_model.version
+    report['inference'] = benchmark_inference(api, repeats)
+
+    for width, height in resolutions:
+        for codec in codecs:
+            video_path = os.path.join(work_dir, f'synthetic_{width}x{height}_{codec}{VIDEO_CODECS.get(codec, ".avi")}')
+            if not generate_video(video_path, width, height, frames_count, codec):
+                print(f'Skipping {codec}: OpenCV cannot encode it here')
+                continue
+            print(f'Benchmarking {os.path.basename(video_path)}')
+
+            results = {
+                'width': width,
+                'height': height,
+                'codec': codec,
+                'frames_count': frames_count,
+                'file_bytes': os.path.getsize(video_path),
+                'decode': benchmark_decode(video_path),
+                'preprocess_frame': benchmark_preprocess(video_path, served_model.preprocess_frame),
+                'frames_extraction': benchmark_calls(lambda: frames_extraction(video_path, served_model.sequence_length, served_model.image_height,
+                                                                               served_model.image_width), repeats),
+                'predict_single_action': benchmark_calls(lambda: predict_single_action(video_path, served_model.inference_model,
+                                                                                       served_model.classes_list), repeats),
+            }
+
+            output_video_path = os.path.join(work_dir, 'output_video.mp4')
+            predict_on_video = benchmark_calls(
+                lambda: api.predict_on_video(video_path, output_video_path, served_model.sequence_length, served_model=served_model),
+                max(repeats // 10, 1))
+            predict_on_video['fps'] = frames_count * 1000 / predict_on_video['mean_ms']
+            results['predict_on_video'] = predict_on_video
+
+            results['endpoint'] = [benchmark_endpoint(api, video_path, clients, requests_per_client) for clients in clients_counts]
+            report['videos'].append(results)
+
+    return report
+
+
+def parse_resolution(value):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the preprocessing and inference paths on synthetic videos.')
+    parser.add_argument('--resolutions', type=parse_resolution, nargs='+', default=[(320, 240), (640, 480), (1280, 720)],
+                        help='WIDTHxHEIGHT of the synthetic videos')
+    parser.add_argument('--frames', type=int, default=150, help='number of frames of the synthetic videos')
+    parser.add_argument('--codecs', nargs='+', default=['mp4v', 'MJPG'], help=f'fourcc codes, e.g. {" ".join(VIDEO_CODECS)}')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4], help='numbers of concurrent /predict clients')
+    parser.add_argument('--requests', type=int, default=2, help='requests sent by every client')
+    parser.add_argument('--repeats', type=int, default=20, help='repetitions of the latency measurements')
+    parser.add_argument('--output', default='benchmark.json', help='file the JSON report is written to')
+    parser.add_argument('--work-dir', help='directory for the synthetic videos (default: a temporary directory)')
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='action-recognition-benchmark-')
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        report = run_benchmarks(work_dir, args.resolutions, args.frames, args.codecs, args.clients, args.requests, args.repeats)
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f'Wrote {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import argparse
+
+# The command line of the package: python -m action_recognition <command>. Every command
+# imports the modules it needs when it runs, so that --help does not load TensorFlow.
+
+
+def add_dataset_arguments(parser):
+    from .model import DATASET_DIR, DATASET_CACHE_DIR, CLIP_STORE_DIR, CLIPS_SOURCES, CLASSES_LIST
+    parser.add_argument('--dataset-dir', default=DATASET_DIR, help='directory with one sub-directory of videos per class')
+    parser.add_argument('--classes', nargs='+', default=CLASSES_LIST)
+    parser.add_argument('--cache-dir', default=DATASET_CACHE_DIR, help='directory of the extracted dataset')
+    parser.add_argument('--clips-source', choices=CLIPS_SOURCES, default='cache',
+                        help="read the clips from the dataset cache, straight from the videos, or from a clip store")
+    parser.add_argument('--clip-store-dir', default=CLIP_STORE_DIR)
+    parser.add_argument('--batch-size', type=int, default=4)
+
+
+def build_dataset_command(args):
+    from .model import create_dataset, plot_dataset_samples
+    if args.plot_samples:
+        plot_dataset_samples(args.dataset_dir)
+    features, labels, _ = create_dataset(args.dataset_dir, args.classes, args.cache_dir)
+    print(f'{len(labels)} clips of shape {features.shape[1:]} in {args.cache_dir}')
+    return 0
+
+
+def train_command(args):
+    from .model import (set_seeds, load_training_clips, create_training_datasets, train_LRCN_model, save_LRCN_model,
+                        plot_metric)
+    set_seeds()
+    load_clip, labels, _ = load_training_clips(args.clips_source, args.dataset_dir, args.classes, args.cache_dir, args.clip_store_dir)
+    train_dataset, validation_dataset, test_dataset = create_training_datasets(load_clip, labels, len(args.classes), args.augment,
+                                                                               args.batch_size)
+
+    LRCN_model, LRCN_model_training_history = train_LRCN_model(train_dataset, validation_dataset, len(args.classes),
+                                                               args.epochs, args.patience)
+    model_evaluation_loss, model_evaluation_accuracy = LRCN_model.evaluate(test_dataset)
+    model_file_path = save_LRCN_model(LRCN_model, model_evaluation_loss, model_evaluation_accuracy, args.output_dir,
+                                      args.classes)
+    print(f'Saved {model_file_path}')
+
+    if args.plot:
+        # Visualize the training and validation loss and accuracy metrics.
+        plot_metric(LRCN_model_training_history, 'loss', 'val_loss', "Total Loss vs Total Validation Loss")
+        plot_metric(LRCN_model_training_history, 'accuracy', 'val_accuracy', "Total Accuracy vs Total Validation Accuarcy")
+    return 0
+
+
+def add_clip_store_arguments(parser):
+    from .clip_store import add_clip_store_commands
+    add_clip_store_commands(parser)
+
+
+def clip_store_command(args):
+    from .clip_store import run_clip_store_command
+    return run_clip_store_command(args)
+
+
+def evaluate_command(args):
+    import tensorflow as tf
+    from .model import load_training_clips, create_training_datasets
+    load_clip, labels, _ = load_training_clips(args.clips_source, args.dataset_dir, args.classes, args.cache_dir, args.clip_store_dir)
+    _, _, test_dataset = create_training_datasets(load_clip, labels, len(args.classes), batch_size=args.batch_size)
+    model = tf.keras.models.load_model(args.model_path)
+    # Models trained before create_LRCN_model() started with a Rescaling layer expect frames in [0, 1].
+    if not isinstance(model.layers[0], tf.keras.layers.Rescaling):
+        test_dataset = test_dataset.map(lambda clips, labels: (tf.cast(clips, tf.float32) / 255., labels))
+    model_evaluation_loss, model_evaluation_accuracy = model.evaluate(test_dataset)
+    print(json.dumps({'model_path': args.model_path, 'loss': model_evaluation_loss, 'accuracy': model_evaluation_accuracy}))
+    return 0
+
+
+def open_inference_model(model_path):
+    # A directory is a TFLite export written by export_tflite.py, a file a model saved by training.
+    from .inference import load_inference_model, TFLiteInferenceModel
+    if os.path.isdir(model_path):
+        return TFLiteInferenceModel(model_path)
+    return load_inference_model(model_path)
+
+
+def read_model_classes(args):
+    # Without --classes, the classes are those of the sidecar of the model, if it has one.
+    from .model import CLASSES_LIST
+    from .model_registry import read_model_metadata
+    if args.classes is not None:
+        return args.classes
+    return read_model_metadata(args.model_path, {'classes': CLASSES_LIST})['classes']
+
+
+def predict_command(args):
+    from .model import predict_single_action
+    classes_list = read_model_classes(args)
+    inference_model = open_inference_model(args.model_path)
+
+    # A video that cannot be classified is reported and skipped; the command fails once all are done.
+    failed_videos = 0
+    for video_file_path in args.videos:
+        try:
+            predicted_class_name, confidence = predict_single_action(video_file_path, inference_model, classes_list)
+        except Exception as error:
+            failed_videos += 1
+            print(json.dumps({'video': video_file_path, 'error': str(error)}), flush=True)
+            continue
+        print(json.dumps({'video': video_file_path, 'label': predicted_class_name, 'confidence': confidence}), flush=True)
+        if args.preview:
+            from moviepy.editor import VideoFileClip
+            VideoFileClip(video_file_path, audio=False, target_resolution=(300, None)).preview()
+    return 1 if failed_videos else 0
+
+
+def batch_command(args):
+    from .batch_predict import list_videos, classify_videos
+    video_paths = list_videos(args.input)
+    inference_model = open_inference_model(args.model_path)
+    inference_model.warm_up()
+    summary = classify_videos(video_paths, inference_model, read_model_classes(args), args.output, args.batch_size, args.workers)
+    print(json.dumps(summary))
+    return 0
+
+
+def serve_command(args):
+    # The API reads its configuration from the environment when it is imported.
+    if args.model_path is not None:
+        os.environ['MODEL_PATH'] = args.model_path
+    if args.backend is not None:
+        os.environ['INFERENCE_BACKEND'] = args.backend
+    if args.workers is not None:
+        os.environ['INFERENCE_WORKERS'] = str(args.workers)
+    from .api import app
+    app.run(host=args.host, port=args.port, debug=args.debug, threaded=True)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='action_recognition', description='Recognize human actions in videos with an LRCN model.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparser = subparsers.add_parser('build-dataset', help='extract the clips of the dataset into the dataset cache')
+    add_dataset_arguments(subparser)
+    subparser.add_argument('--plot-samples', action='store_true', help='first show a frame of a random video of random classes')
+    subparser.set_defaults(function=build_dataset_command)
+
+    subparser = subparsers.add_parser('clip-store', help='build, append to, compact or verify a store of preprocessed clips')
+    add_clip_store_arguments(subparser)
+    subparser.set_defaults(function=clip_store_command)
+
+    subparser = subparsers.add_parser('train', help='train an LRCN model and save it with its test loss and accuracy')
+    add_dataset_arguments(subparser)
+    subparser.add_argument('--epochs', type=int, default=70)
+    subparser.add_argument('--patience', type=int, default=15, help='epochs without a better validation loss before stopping')
+    subparser.add_argument('--augment', action='store_true', help='randomly flip the training clips horizontally')
+    subparser.add_argument('--output-dir', default='.')
+    subparser.add_argument('--plot', action='store_true', help='plot the loss and accuracy curves')
+    subparser.set_defaults(function=train_command)
+
+    subparser = subparsers.add_parser('evaluate', help='measure the loss and accuracy of a saved model on the test split')
+    subparser.add_argument('model_path', help='.h5 file saved by the train command')
+    add_dataset_arguments(subparser)
+    subparser.set_defaults(function=evaluate_command)
+
+    subparser = subparsers.add_parser('predict', help='predict the action performed in videos')
+    subparser.add_argument('model_path', help='.h5 file saved by the train command, or a TFLite export directory')
+    subparser.add_argument('videos', nargs='+')
+    subparser.add_argument('--classes', nargs='+', help='default: the classes of the sidecar of the model, or CLASSES_LIST')
+    subparser.add_argument('--preview', action='store_true', help='play every video after its prediction')
+    subparser.set_defaults(function=predict_command)
+
+    subparser = subparsers.add_parser('batch', help='classify a directory or a manifest of videos into a JSONL or CSV file')
+    subparser.add_argument('model_path', help='.h5 file saved by the train command, or a TFLite export directory')
+    subparser.add_argument('input', help='directory of videos, or manifest: a text file of paths, or a .jsonl/.csv file with a "path" field')
+    subparser.add_argument('--output', default='predictions.jsonl', help='.csv for CSV, JSONL otherwise; an existing output is resumed')
+    subparser.add_argument('--classes', nargs='+', help='default: the classes of the sidecar of the model, or CLASSES_LIST')
+    subparser.add_argument('--batch-size', type=int, default=64, help='clips classified in one call of the model')
+    subparser.add_argument('--workers', type=int, default=None, help='decoding processes (default: the number of CPUs)')
+    subparser.set_defaults(function=batch_command)
+
+    subparser = subparsers.add_parser('serve', help='run the Flask API')
+    subparser.add_argument('--host', default='127.0.0.1')
+    subparser.add_argument('--port', type=int, default=5000)
+    subparser.add_argument('--model-path', help='model served by the API (default: MODEL_PATH)')
+    subparser.add_argument('--backend', choices=('tensorflow', 'tflite'), help='default: INFERENCE_BACKEND')
+    subparser.add_argument('--workers', type=int, help='inference worker processes, 0 to run the model in the server (default: INFERENCE_WORKERS)')
+    subparser.add_argument('--debug', action='store_true')
+    subparser.set_defaults(function=serve_command)
+
+    args = parser.parse_args(argv)
+    return args.function(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
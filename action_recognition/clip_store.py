@@ -0,0 +1,335 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import numpy as np
+from .dataset_builder import extract_clips, list_dataset_videos
+
+INDEX_FILE_NAME = 'index.json'
+
+# Default number of clips per shard (about 240 MB of 20x64x64x3 clips).
+SHARD_SIZE = 1024
+
+
+class ClipStore:
+    # A directory of preprocessed clips: fixed-shape uint8 shards (shard_00000.npy, ...) and an
+    # index.json giving the video path, class and (shard, offset) position of every clip. The
+    # shards are opened memory-mapped, so clips are sliced without copying and every process
+    # reading the store shares the same page cache. Shards are never rewritten in place: the
+    # clips of changed or removed videos stay in them, unindexed, until the store is compacted.
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.index = read_index(store_dir)
+        self.clip_shape = tuple(self.index['clip_shape'])
+        self.clips = self.index['clips']
+        self.shards = [None] * len(self.index['shards'])
+
+    def shard(self, shard_number):
+        if self.shards[shard_number] is None:
+            shard = self.index['shards'][shard_number]
+            self.shards[shard_number] = np.load(os.path.join(self.store_dir, shard['file']), mmap_mode='r')[:shard['clips']]
+        return self.shards[shard_number]
+
+    def __len__(self):
+        return len(self.clips)
+
+    def __getitem__(self, clip_index):
+        clip = self.clips[clip_index]
+        return self.shard(clip['shard'])[clip['offset']]
+
+    def select(self, classes_list):
+        # This function will select the clips of the given classes.
+        # Returns:
+        #   clip_indexes: The indexes of the selected clips in the store.
+        #   labels: An array containing the indexes of the classes associated with the clips.
+        #   video_files_paths: A list containing the paths of the clips' videos in the disk.
+
+        clip_indexes = []
+        labels = []
+        video_files_paths = []
+        for clip_index, clip in enumerate(self.clips):
+            if clip['class_name'] in classes_list:
+                clip_indexes.append(clip_index)
+                labels.append(classes_list.index(clip['class_name']))
+                video_files_paths.append(clip['path'])
+        return np.array(clip_indexes), np.array(labels), video_files_paths
+
+
+def read_index(store_dir):
+    # A store has an index once its build is complete; a directory without one is not a store.
+    index_path = os.path.join(store_dir, INDEX_FILE_NAME)
+    if not os.path.exists(index_path):
+        raise FileNotFoundError(f'{store_dir} is not a clip store: it has no {INDEX_FILE_NAME}')
+    with open(index_path) as index_file:
+        return json.load(index_file)
+
+
+def write_index(store_dir, index):
+    index_path = os.path.join(store_dir, INDEX_FILE_NAME)
+    with open(index_path + '.tmp', 'w') as index_file:
+        json.dump(index, index_file)
+    os.replace(index_path + '.tmp', index_path)
+
+
+def next_shard_file(index):
+    # Shards are numbered in the order they were written, but compaction renumbers the shards of
+    # the index, so skip the numbers of the files still in use.
+    shard_files = {shard['file'] for shard in index['shards']}
+    shard_number = len(index['shards'])
+    while f'shard_{shard_number:05d}.npy' in shard_files:
+        shard_number += 1
+    return f'shard_{shard_number:05d}.npy'
+
+
+def count_stale_clips(index):
+    # The clips written to the shards that the index no longer points to.
+    return sum(shard['clips'] for shard in index['shards']) - len(index['clips'])
+
+
+def add_videos(store_dir, index, videos, shard_size, max_workers=None):
+    # This function will extract the given videos into new shards of the store and add them to the index.
+    # Videos that are already in the index are replaced by their new clip.
+    # Args:
+    #   videos: A list of (video_file_path, class_name) tuples.
+    # Returns:
+    #   skipped_videos: The number of videos having frames less than the sequence length.
+
+    sequence_length, image_height, image_width, _ = index['clip_shape']
+    clips_by_path = {clip['path']: clip_index for clip_index, clip in enumerate(index['clips'])}
+    extracted_clips = extract_clips([video_file_path for video_file_path, _ in videos], sequence_length, image_height,
+                                    image_width, max_workers)
+
+    skipped_videos = 0
+    for shard_start in range(0, len(videos), shard_size):
+        shard_videos = videos[shard_start:shard_start + shard_size]
+        shard_number = len(index['shards'])
+        shard_file = next_shard_file(index)
+        shard = np.lib.format.open_memmap(os.path.join(store_dir, shard_file), mode='w+', dtype=np.uint8,
+                                          shape=(len(shard_videos),) + tuple(index['clip_shape']))
+
+        shard_clips = []
+        for video_file_path, class_name in shard_videos:
+            clip = next(extracted_clips)
+            if clip is None:
+                skipped_videos += 1
+                continue
+            shard[len(shard_clips)] = clip
+            video_stat = os.stat(video_file_path)
+            shard_clips.append({'path': video_file_path, 'class_name': class_name, 'mtime': video_stat.st_mtime,
+                                'size': video_stat.st_size, 'shard': shard_number, 'offset': len(shard_clips)})
+        shard.flush()
+        del shard
+        if not shard_clips:
+            os.remove(os.path.join(store_dir, shard_file))
+            continue
+
+        index['shards'].append({'file': shard_file, 'clips': len(shard_clips)})
+        for clip in shard_clips:
+            if clip['path'] in clips_by_path:
+                index['clips'][clips_by_path[clip['path']]] = clip
+            else:
+                clips_by_path[clip['path']] = len(index['clips'])
+                index['clips'].append(clip)
+
+        # Commit every shard as soon as it is written, so an interrupted run keeps its progress.
+        write_index(store_dir, index)
+        print(f'Wrote {shard_file} with {len(shard_clips)} clips')
+
+    extracted_clips.close()
+    return skipped_videos
+
+
+def build_store(dataset_dir, store_dir, classes_list, sequence_length, image_height, image_width, shard_size=SHARD_SIZE, max_workers=None):
+    # This function will create a new clip store from the videos of the given classes. The store
+    # is built in a temporary directory next to store_dir and renamed into place once complete,
+    # so an interrupted build never leaves a store that looks valid.
+    if os.path.exists(os.path.join(store_dir, INDEX_FILE_NAME)):
+        raise FileExistsError(f'{store_dir} already contains a clip store, use append to add videos to it')
+    if os.path.isdir(store_dir) and os.listdir(store_dir):
+        raise FileExistsError(f'{store_dir} is not empty')
+
+    # Start over from the leftovers of an interrupted build, if any.
+    temporary_store_dir = store_dir.rstrip(os.sep) + '.partial'
+    if os.path.exists(temporary_store_dir):
+        shutil.rmtree(temporary_store_dir)
+    os.makedirs(temporary_store_dir)
+    index = {'clip_shape': [sequence_length, image_height, image_width, 3], 'shards': [], 'clips': []}
+    write_index(temporary_store_dir, index)
+    skipped_videos = add_videos(temporary_store_dir, index, list_dataset_videos(dataset_dir, classes_list), shard_size, max_workers)
+    os.replace(temporary_store_dir, store_dir)
+    return skipped_videos
+
+
+def append_store(dataset_dir, store_dir, classes_list, shard_size=SHARD_SIZE, max_workers=None):
+    # This function will add the videos of the given classes that are new, or have changed since
+    # they were stored, to an existing clip store. The clips of the changed videos, and of the
+    # videos that no longer exist, are first dropped from the index, so that a changed video now
+    # too short for a clip is not served its old clip; their rows stay in the shards until
+    # compact_store() is run.
+    index = read_index(store_dir)
+    stored_clips = {clip['path']: clip for clip in index['clips']}
+
+    new_videos = []
+    for video_file_path, class_name in list_dataset_videos(dataset_dir, classes_list):
+        clip = stored_clips.get(video_file_path)
+        video_stat = os.stat(video_file_path)
+        if clip is None or clip['mtime'] != video_stat.st_mtime or clip['size'] != video_stat.st_size:
+            new_videos.append((video_file_path, class_name))
+
+    outdated_paths = {video_file_path for video_file_path, _ in new_videos}
+    kept_clips = [clip for clip in index['clips'] if clip['path'] not in outdated_paths and os.path.exists(clip['path'])]
+    if len(kept_clips) != len(index['clips']):
+        print(f'Dropping {len(index["clips"]) - len(kept_clips)} changed or removed videos')
+        index['clips'] = kept_clips
+        write_index(store_dir, index)
+
+    print(f'Appending {len(new_videos)} new or changed videos')
+    return add_videos(store_dir, index, new_videos, shard_size, max_workers)
+
+
+def compact_store(store_dir, shard_size=SHARD_SIZE):
+    # This function will rewrite the clips of the index into new shards, in the order of the
+    # index, and delete the old shards, reclaiming the space of the clips no longer indexed.
+    # The new index is written before the old shards are deleted, so an interrupted compaction
+    # leaves a valid store.
+    # Returns:
+    #   stale_clips: The number of clips dropped from the shards.
+
+    clip_store = ClipStore(store_dir)
+    index = clip_store.index
+    stale_clips = count_stale_clips(index)
+    compacted_index = {'clip_shape': index['clip_shape'], 'shards': [], 'clips': []}
+    used_files = {shard['file'] for shard in index['shards']}
+
+    for shard_start in range(0, len(clip_store), shard_size):
+        shard_clips = clip_store.clips[shard_start:shard_start + shard_size]
+        shard_file = next_shard_file({'shards': compacted_index['shards'] + index['shards']})
+        shard = np.lib.format.open_memmap(os.path.join(store_dir, shard_file), mode='w+', dtype=np.uint8,
+                                          shape=(len(shard_clips),) + clip_store.clip_shape)
+        for offset, clip_index in enumerate(range(shard_start, shard_start + len(shard_clips))):
+            shard[offset] = clip_store[clip_index]
+        shard.flush()
+        del shard
+
+        shard_number = len(compacted_index['shards'])
+        compacted_index['shards'].append({'file': shard_file, 'clips': len(shard_clips)})
+        compacted_index['clips'].extend(dict(clip, shard=shard_number, offset=offset) for offset, clip in enumerate(shard_clips))
+
+    del clip_store
+    write_index(store_dir, compacted_index)
+    for shard_file in used_files - {shard['file'] for shard in compacted_index['shards']}:
+        os.remove(os.path.join(store_dir, shard_file))
+    return stale_clips
+
+
+def verify_store(store_dir, check_sources=False):
+    # This function will check that the shards of a clip store match its index.
+    # Args:
+    #   check_sources: Whether to also report the videos that changed or disappeared since they were stored.
+    # Returns:
+    #   problems: A list of descriptions of the problems found.
+
+    problems = []
+    clip_store = ClipStore(store_dir)
+
+    for shard in clip_store.index['shards']:
+        shard_path = os.path.join(store_dir, shard['file'])
+        if not os.path.exists(shard_path):
+            problems.append(f'{shard["file"]} is missing')
+            continue
+        shard_array = np.load(shard_path, mmap_mode='r')
+        if shard_array.dtype != np.uint8 or shard_array.shape[1:] != clip_store.clip_shape:
+            problems.append(f'{shard["file"]} has {shard_array.dtype} clips of shape {shard_array.shape[1:]}')
+        if len(shard_array) < shard['clips']:
+            problems.append(f'{shard["file"]} holds {len(shard_array)} clips but the index expects {shard["clips"]}')
+
+    for clip in clip_store.clips:
+        shard = clip_store.index['shards'][clip['shard']] if clip['shard'] < len(clip_store.index['shards']) else None
+        if shard is None or clip['offset'] >= shard['clips']:
+            problems.append(f'{clip["path"]} points outside of the shards')
+        elif check_sources:
+            if not os.path.exists(clip['path']):
+                problems.append(f'{clip["path"]} no longer exists')
+            else:
+                video_stat = os.stat(clip['path'])
+                if clip['mtime'] != video_stat.st_mtime or clip['size'] != video_stat.st_size:
+                    problems.append(f'{clip["path"]} changed since it was stored')
+
+    return problems
+
+
+def add_clip_store_commands(parser):
+    # This function will add the build, append, compact and verify commands to an argument parser.
+    subparsers = parser.add_subparsers(dest='store_command', required=True)
+
+    subparser = subparsers.add_parser('compact', help='rewrite the shards without the clips of changed or removed videos')
+    subparser.add_argument('store_dir')
+    subparser.add_argument('--shard-size', type=int, default=SHARD_SIZE)
+
+    for command in ('build', 'append'):
+        subparser = subparsers.add_parser(command)
+        subparser.add_argument('dataset_dir', help='directory with one sub-directory of videos per class')
+        subparser.add_argument('store_dir')
+        subparser.add_argument('--classes', nargs='+', help='classes to include (default: every class of the dataset)')
+        subparser.add_argument('--shard-size', type=int, default=SHARD_SIZE)
+        subparser.add_argument('--workers', type=int, default=None)
+        if command == 'build':
+            subparser.add_argument('--sequence-length', type=int, default=20)
+            subparser.add_argument('--image-size', type=int, nargs=2, default=(64, 64), metavar=('HEIGHT', 'WIDTH'))
+
+    subparser = subparsers.add_parser('verify')
+    subparser.add_argument('store_dir')
+    subparser.add_argument('--check-sources', action='store_true', help='also check that the source videos are unchanged')
+
+
+def run_clip_store_command(args):
+    # This function will run the command parsed by a parser set up with add_clip_store_commands().
+    # Returns:
+    #   The exit status of the command.
+
+    if args.store_command != 'build' and not os.path.exists(os.path.join(args.store_dir, INDEX_FILE_NAME)):
+        print(f'{args.store_dir} is not a clip store: it has no {INDEX_FILE_NAME}')
+        return 1
+
+    if args.store_command == 'verify':
+        problems = verify_store(args.store_dir, args.check_sources)
+        for problem in problems:
+            print(problem)
+        print(f'{len(problems)} problems found')
+        return 1 if problems else 0
+
+    if args.store_command == 'compact':
+        stale_clips = compact_store(args.store_dir, args.shard_size)
+        print(f'Dropped {stale_clips} stale clips from the shards')
+        return 0
+
+    classes_list = args.classes or sorted(class_name for class_name in os.listdir(args.dataset_dir)
+                                          if os.path.isdir(os.path.join(args.dataset_dir, class_name)))
+    if args.store_command == 'build':
+        if os.path.exists(os.path.join(args.store_dir, INDEX_FILE_NAME)):
+            print(f'{args.store_dir} already contains a clip store, use append to add videos to it')
+            return 1
+        if os.path.isdir(args.store_dir) and os.listdir(args.store_dir):
+            print(f'{args.store_dir} is not empty')
+            return 1
+        skipped_videos = build_store(args.dataset_dir, args.store_dir, classes_list, args.sequence_length, *args.image_size,
+                                     args.shard_size, args.workers)
+    else:
+        skipped_videos = append_store(args.dataset_dir, args.store_dir, classes_list, args.shard_size, args.workers)
+    print(f'Skipped {skipped_videos} videos having frames less than the sequence length')
+    stale_clips = count_stale_clips(read_index(args.store_dir))
+    if stale_clips:
+        print(f'{stale_clips} clips of changed or removed videos are still in the shards; run compact to reclaim their space')
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build, append to, compact and verify a store of preprocessed clips.')
+    add_clip_store_commands(parser)
+    return run_clip_store_command(parser.parse_args())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+import os
+import json
+import multiprocessing
+import cv2
+import numpy as np
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from .video_sampling import sample_frame_indexes, read_frames_at
+
+MANIFEST_FILE_NAME = 'manifest.json'
+FEATURES_FILE_NAME = 'features.npy'
+
+
+def extract_clip(video_path, sequence_length, image_height, image_width):
+    # This function will extract the frames of one clip of the dataset, resized but kept as uint8.
+    # Args:
+    #   video_path: The path of the video in the disk.
+    #   sequence_length, image_height, image_width: The shape of the clip.
+    # Returns:
+    #   clip: An array (sequence_length, image_height, image_width, 3) of uint8, or None if the
+    #         video has fewer than sequence_length readable frames.
+
+    video_reader = cv2.VideoCapture(video_path)
+    video_frames_count = int(video_reader.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = read_frames_at(video_reader, sample_frame_indexes(video_frames_count, sequence_length))
+    video_reader.release()
+
+    if len(frames) != sequence_length:
+        return None
+    return np.asarray([cv2.resize(frame, (image_width, image_height)) for frame in frames], dtype=np.uint8)
+
+
+def _init_worker():
+    # Every worker decodes its own videos, so keep OpenCV from starting a thread pool in each of them.
+    cv2.setNumThreads(1)
+
+
+def _process_pool(max_workers):
+    # The parent process may already run TensorFlow (training builds the dataset first), which
+    # must not be forked, so the workers are started from a fresh forkserver (or spawned) process.
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(start_method),
+                               initializer=_init_worker)
+
+
+def extract_clips(video_paths, sequence_length, image_height, image_width, max_workers=None):
+    # This function will extract the clips of the given videos on a pool of processes.
+    # Args:
+    #   video_paths: The paths of the videos in the disk.
+    #   sequence_length, image_height, image_width: The shape of one clip.
+    #   max_workers: The number of extraction processes (defaults to the number of CPUs).
+    # Returns:
+    #   A generator of the clips returned by extract_clip(), in the order of video_paths.
+
+    with _process_pool(max_workers) as executor:
+        yield from executor.map(extract_clip, video_paths, repeat(sequence_length), repeat(image_height),
+                                repeat(image_width), chunksize=4)
+
+
+def list_dataset_videos(dataset_dir, classes_list):
+    # This function will list the videos of the selected classes, in a stable order.
+    # Returns:
+    #   videos: A list of (video_file_path, class_name) tuples.
+
+    videos = []
+    for class_name in classes_list:
+        for file_name in sorted(os.listdir(os.path.join(dataset_dir, class_name))):
+            videos.append((os.path.join(dataset_dir, class_name, file_name), class_name))
+    return videos
+
+
+def load_manifest(cache_dir):
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as manifest_file:
+        return json.load(manifest_file)
+
+
+def build_dataset(dataset_dir, classes_list, cache_dir, sequence_length, image_height, image_width, max_workers=None):
+    # This function will build the dataset of the selected classes into cache_dir: the clips are
+    # extracted by a pool of processes and written into a preallocated uint8 memory-mapped array,
+    # and a manifest records the path, modification time, size and class of every video, so the
+    # next build only extracts the videos that are new or have changed. When any video was added,
+    # changed or removed, the array is rewritten in the order of the videos, with the clips of the
+    # other videos copied from the previous array; when none was, the cache is used as it is.
+    # Args:
+    #   dataset_dir: The directory containing one sub-directory of videos per class.
+    #   classes_list: The names of the classes to include; labels are indexes in this list.
+    #   cache_dir: The directory where the features array and the manifest are stored.
+    #   sequence_length, image_height, image_width: The shape of one clip.
+    #   max_workers: The number of extraction processes (defaults to the number of CPUs).
+    # Returns:
+    #   features: A read-only memory-mapped uint8 array (clips, sequence_length, image_height, image_width, 3).
+    #   labels: An array containing the indexes of the classes associated with the clips.
+    #   video_files_paths: A list containing the paths of the clips' videos in the disk.
+
+    os.makedirs(cache_dir, exist_ok=True)
+    features_path = os.path.join(cache_dir, FEATURES_FILE_NAME)
+    clip_shape = (sequence_length, image_height, image_width, 3)
+
+    # Index the videos of the previous build, if it used the same clip shape.
+    previous_entries = {}
+    previous_features = None
+    manifest = load_manifest(cache_dir)
+    if manifest is not None and tuple(manifest['clip_shape']) == clip_shape and os.path.exists(features_path):
+        previous_entries = {entry['path']: entry for entry in manifest['videos']}
+        previous_features = np.load(features_path, mmap_mode='r')
+
+    entries = []
+    videos_to_extract = []
+    for video_file_path, class_name in list_dataset_videos(dataset_dir, classes_list):
+        video_stat = os.stat(video_file_path)
+        entry = {'path': video_file_path, 'class_name': class_name, 'mtime': video_stat.st_mtime, 'size': video_stat.st_size, 'row': None}
+        previous_entry = previous_entries.get(video_file_path)
+        if previous_entry is not None and previous_entry['mtime'] == entry['mtime'] and previous_entry['size'] == entry['size']:
+            entry['previous_row'] = previous_entry['row']
+        else:
+            videos_to_extract.append(entry)
+        entries.append(entry)
+
+    if previous_features is not None and not videos_to_extract and {entry['path'] for entry in entries} == set(previous_entries):
+        del previous_features
+        print(f'Reusing the {len(entries)} videos of the dataset cache')
+        return load_dataset(cache_dir, classes_list)
+
+    print(f'Extracting {len(videos_to_extract)} new or changed videos, reusing {len(entries) - len(videos_to_extract)}')
+
+    # Preallocate one row per video; videos that turn out to be too short leave their row unused
+    # and the array is sliced to the rows written.
+    temporary_features_path = features_path + '.tmp'
+    features = np.lib.format.open_memmap(temporary_features_path, mode='w+', dtype=np.uint8, shape=(len(entries),) + clip_shape)
+
+    # The clips come back in the order of the entries, and are written as soon as they arrive.
+    extracted_clips = extract_clips([entry['path'] for entry in videos_to_extract], sequence_length, image_height, image_width, max_workers)
+    rows_count = 0
+    for entry in entries:
+        if 'previous_row' in entry:
+            previous_row = entry.pop('previous_row')
+            if previous_row is None:
+                continue
+            features[rows_count] = previous_features[previous_row]
+        else:
+            clip = next(extracted_clips)
+            if clip is None:
+                continue
+            features[rows_count] = clip
+        entry['row'] = rows_count
+        rows_count += 1
+    extracted_clips.close()
+
+    features.flush()
+    del features, previous_features
+
+    # Drop the old manifest before replacing the array it describes, so that an interrupted
+    # build is redone from scratch rather than reusing rows that no longer match.
+    manifest_path = os.path.join(cache_dir, MANIFEST_FILE_NAME)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    os.replace(temporary_features_path, features_path)
+
+    with open(manifest_path + '.tmp', 'w') as manifest_file:
+        json.dump({'clip_shape': clip_shape, 'rows_count': rows_count, 'videos': entries}, manifest_file)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    return load_dataset(cache_dir, classes_list)
+
+
+def load_dataset(cache_dir, classes_list):
+    # This function will open a dataset built by build_dataset() without copying it into memory.
+    # Returns:
+    #   features, labels, video_files_paths: As returned by build_dataset().
+
+    manifest = load_manifest(cache_dir)
+    features = np.load(os.path.join(cache_dir, FEATURES_FILE_NAME), mmap_mode='r')[:manifest['rows_count']]
+
+    labels = []
+    video_files_paths = []
+    for entry in manifest['videos']:
+        if entry['row'] is not None:
+            labels.append(classes_list.index(entry['class_name']))
+            video_files_paths.append(entry['path'])
+
+    return features, np.array(labels), video_files_paths
@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import tensorflow as tf
+from .inference import split_LRCN_model, InferenceModel, TFLiteInferenceModel, create_inference_functions
+from .dataset_builder import build_dataset, load_dataset, load_manifest
+from .train_input import split_dataset_indexes
+from .model import CLASSES_LIST, TEST_SIZE, VALIDATION_SPLIT, seed_constant
+
+QUANTIZATION_MODES = ('none', 'dynamic', 'int8')
+
+# Default number of training clips whose frames calibrate the int8 activation ranges.
+CALIBRATION_CLIPS = 100
+
+# Fixed batch size of the exported temporal head (see TFLiteInferenceModel).
+WINDOWS_BATCH_SIZE = 32
+
+
+def convert_LRCN_model(model, quantization, calibration_frames=None, windows_batch_size=WINDOWS_BATCH_SIZE):
+    # This function will convert an LRCN model into two TFLite models, its per-frame CNN and its
+    # temporal head, the same split used by SlidingWindowClassifier.
+    # Args:
+    #   model: The LRCN model constructed by create_LRCN_model() in model.py.
+    #   quantization: 'none', 'dynamic' (int8 weights, float activations) or 'int8' (int8 weights
+    #                 and activations for the CNN). The LSTM of the temporal head is converted to a
+    #                 loop that TFLite cannot run with int8 activations, so it gets dynamic-range
+    #                 quantization in both modes; it is a small part of the computation.
+    #   calibration_frames: An array of uint8 frames the int8 activation ranges are calibrated on.
+    #   windows_batch_size: The fixed batch size of the temporal head; TFLite cannot convert the
+    #                       LSTM loop with a variable batch size.
+    # Returns:
+    #   feature_extractor_model, temporal_head_model: The serialized TFLite models.
+
+    if quantization not in QUANTIZATION_MODES:
+        raise ValueError(f'quantization must be one of {QUANTIZATION_MODES}')
+    if quantization == 'int8' and calibration_frames is None:
+        raise ValueError('int8 quantization needs calibration frames')
+
+    feature_extractor, temporal_head = split_LRCN_model(model)
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(feature_extractor)
+    if quantization != 'none':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'int8':
+        converter.representative_dataset = lambda: ([frame[None].astype(np.float32)] for frame in calibration_frames)
+    feature_extractor_model = converter.convert()
+
+    features_input = tf.keras.Input(shape=temporal_head.input_shape[1:], batch_size=windows_batch_size)
+    converter = tf.lite.TFLiteConverter.from_keras_model(tf.keras.Model(features_input, temporal_head(features_input)))
+    if quantization != 'none':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    temporal_head_model = converter.convert()
+
+    return feature_extractor_model, temporal_head_model
+
+
+def evaluate_inference_model(inference_model, load_clip, labels, indexes, batch_size=16):
+    # This function will measure the accuracy of an inference model on the given clips.
+    # Returns:
+    #   accuracy: The fraction of the clips classified correctly.
+    #   predicted_labels: The predicted class index of every clip.
+    #   seconds: The time spent in the model.
+
+    predicted_labels = []
+    seconds = 0.0
+    for start in range(0, len(indexes), batch_size):
+        clips = np.asarray([load_clip(index) for index in indexes[start:start + batch_size]])
+        start_time = time.perf_counter()
+        predicted_labels_probabilities = inference_model.classify_clips(clips)
+        seconds += time.perf_counter() - start_time
+        predicted_labels.extend(np.argmax(predicted_labels_probabilities, axis=1).tolist())
+
+    predicted_labels = np.array(predicted_labels)
+    accuracy = float(np.mean(predicted_labels == np.asarray(labels)[indexes])) if len(indexes) else None
+    return accuracy, predicted_labels, seconds
+
+
+def export_tflite(model_path, output_dir, quantization, cache_dir, classes_list, calibration_clips=CALIBRATION_CLIPS):
+    # This function will export an LRCN model to TFLite and compare it with the float model on the
+    # test split of the dataset cached by create_dataset() in model.py, the clips the model never
+    # saw. The int8 calibration frames are drawn from the training split.
+    # Args:
+    #   model_path: The path of the .h5 file saved by model.py.
+    #   output_dir: The directory the TFLite models and report.json are written to.
+    #   quantization: One of QUANTIZATION_MODES.
+    #   cache_dir: The dataset cache directory, or None to skip the calibration and the evaluation.
+    #   classes_list: The classes the model was trained on, in the order of its outputs.
+    #   calibration_clips: The number of training clips used for calibration.
+    # Returns:
+    #   report: A dict with the sizes of the models and the accuracy of both backends.
+
+    model = tf.keras.models.load_model(model_path)
+
+    features = None
+    if cache_dir is not None and load_manifest(cache_dir) is not None:
+        features, labels, _ = load_dataset(cache_dir, classes_list)
+        train_indexes, _, test_indexes = split_dataset_indexes(len(labels), TEST_SIZE, VALIDATION_SPLIT, seed_constant)
+    elif quantization == 'int8':
+        raise ValueError('int8 quantization needs the dataset cache built by create_dataset() for calibration')
+
+    calibration_frames = None
+    if quantization == 'int8':
+        calibration_frames = np.asarray(features[train_indexes[:calibration_clips]]).reshape((-1,) + features.shape[2:])
+
+    feature_extractor_model, temporal_head_model = convert_LRCN_model(model, quantization, calibration_frames)
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'feature_extractor.tflite'), 'wb') as model_file:
+        model_file.write(feature_extractor_model)
+    with open(os.path.join(output_dir, 'temporal_head.tflite'), 'wb') as model_file:
+        model_file.write(temporal_head_model)
+
+    report = {
+        'model_path': model_path,
+        'quantization': quantization,
+        'feature_extractor_bytes': len(feature_extractor_model),
+        'temporal_head_bytes': len(temporal_head_model),
+        'model_file_bytes': os.path.getsize(model_path),
+    }
+
+    if features is not None:
+        load_clip = lambda index: features[index]
+        float_model = InferenceModel(create_inference_functions(model))
+        tflite_model = TFLiteInferenceModel(output_dir)
+        float_model.warm_up()
+        tflite_model.warm_up()
+        float_accuracy, float_labels, float_seconds = evaluate_inference_model(float_model, load_clip, labels, test_indexes)
+        tflite_accuracy, tflite_labels, tflite_seconds = evaluate_inference_model(tflite_model, load_clip, labels, test_indexes)
+        report.update({
+            'test_clips': len(test_indexes),
+            'float_accuracy': float_accuracy,
+            'tflite_accuracy': tflite_accuracy,
+            'accuracy_delta': tflite_accuracy - float_accuracy if len(test_indexes) else None,
+            'agreement': float(np.mean(float_labels == tflite_labels)) if len(test_indexes) else None,
+            'float_seconds_per_clip': float_seconds / max(len(test_indexes), 1),
+            'tflite_seconds_per_clip': tflite_seconds / max(len(test_indexes), 1),
+        })
+
+    with open(os.path.join(output_dir, 'report.json'), 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a trained LRCN model to TFLite and compare its accuracy with the float model.')
+    parser.add_argument('model_path', help='.h5 file saved by model.py')
+    parser.add_argument('--quantization', choices=QUANTIZATION_MODES, default='dynamic')
+    parser.add_argument('--output-dir', help='default: the model path with a .<quantization>.tflite extension')
+    parser.add_argument('--dataset-cache', default='dataset_cache', help='dataset cache created by model.py')
+    parser.add_argument('--dataset-dir', help='build (or update) the dataset cache from this directory first')
+    parser.add_argument('--classes', nargs='+', default=CLASSES_LIST)
+    parser.add_argument('--calibration-clips', type=int, default=CALIBRATION_CLIPS)
+    args = parser.parse_args()
+
+    if args.dataset_dir is not None:
+        sequence_length, image_height, image_width, _ = tf.keras.models.load_model(args.model_path).input_shape[1:]
+        build_dataset(args.dataset_dir, args.classes, args.dataset_cache, sequence_length, image_height, image_width)
+    elif load_manifest(args.dataset_cache) is None:
+        print(f'No dataset cache in {args.dataset_cache}: the accuracy of the exported model will not be measured')
+
+    output_dir = args.output_dir or os.path.splitext(args.model_path)[0] + f'.{args.quantization}.tflite'
+    try:
+        report = export_tflite(args.model_path, output_dir, args.quantization, args.dataset_cache, args.classes,
+                               args.calibration_clips)
+    except ValueError as error:
+        print(error)
+        return 1
+
+    print(f'Wrote {output_dir}')
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,361 @@
+import os
+import threading
+import numpy as np
+from collections import deque
+
+# TensorFlow is imported by the functions that build or load models, so that the classifiers
+# below can be imported, and TFLite models run, without paying for it up front.
+
+
+def split_LRCN_model(model):
+    # This function will split a trained LRCN model into a per-frame feature extractor
+    # (the TimeDistributed CNN stack) and a temporal head (the LSTM and Dense layers).
+    # Both parts reuse the layers of the given model, so no weights are copied.
+    # The feature extractor always takes uint8-range frames: models trained before
+    # create_LRCN_model() started with a Rescaling layer expect frames in [0, 1], so
+    # the same normalization is added in front of their CNN.
+    # Args:
+    #   model: The LRCN model constructed by create_LRCN_model() in model.py.
+    # Returns:
+    #   feature_extractor: A model mapping uint8 frames (N, IMAGE_HEIGHT, IMAGE_WIDTH, 3) to feature vectors.
+    #   temporal_head: A model mapping feature sequences (N, SEQUENCE_LENGTH, features) to class probabilities.
+
+    import tensorflow as tf
+
+    frame_layers = []
+    temporal_layers = []
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.layers.TimeDistributed) and not temporal_layers:
+            frame_layers.append(layer.layer)
+        elif isinstance(layer, tf.keras.layers.Rescaling) and not frame_layers:
+            frame_layers.append(layer)
+        else:
+            temporal_layers.append(layer)
+
+    if not temporal_layers or not any(isinstance(layer, tf.keras.layers.TimeDistributed) for layer in model.layers[:len(frame_layers)]):
+        raise ValueError('The model is not an LRCN model: expected TimeDistributed layers followed by a temporal head')
+
+    if not isinstance(frame_layers[0], tf.keras.layers.Rescaling):
+        frame_layers.insert(0, tf.keras.layers.Rescaling(1./255))
+
+    sequence_length, image_height, image_width, channels = model.input_shape[1:]
+
+    frame_input = tf.keras.Input(shape=(image_height, image_width, channels))
+    frame_features = frame_input
+    for layer in frame_layers:
+        frame_features = layer(frame_features)
+    feature_extractor = tf.keras.Model(frame_input, frame_features)
+
+    features_input = tf.keras.Input(shape=(sequence_length, frame_features.shape[-1]))
+    class_probabilities = features_input
+    for layer in temporal_layers:
+        class_probabilities = layer(class_probabilities)
+    temporal_head = tf.keras.Model(features_input, class_probabilities)
+
+    return feature_extractor, temporal_head
+
+
+# Functions exported by create_inference_functions(); an export missing one of them was made
+# by an older version and is exported again.
+INFERENCE_FUNCTIONS = ('extract_features', 'classify_features', 'classify_clips')
+
+
+def create_inference_functions(model, jit_compile=False):
+    # This function will trace the inference functions of an LRCN model with fixed input
+    # signatures (any batch size), so they can be saved and are never traced again. Calling
+    # them skips everything predict() sets up on every call (data adapter, callbacks,
+    # progress bar), which costs more than the forward pass of a few windows.
+    # Args:
+    #   model: The LRCN model constructed by create_LRCN_model() in model.py.
+    #   jit_compile: Whether to compile the functions with XLA.
+    # Returns:
+    #   module: A tf.Module with an extract_features function taking uint8 frames
+    #           (None, IMAGE_HEIGHT, IMAGE_WIDTH, 3), a classify_features function taking
+    #           feature sequences (None, SEQUENCE_LENGTH, features) and a classify_clips
+    #           function taking uint8 clips (None, SEQUENCE_LENGTH, IMAGE_HEIGHT, IMAGE_WIDTH, 3).
+
+    import tensorflow as tf
+    feature_extractor, temporal_head = split_LRCN_model(model)
+    sequence_length, image_height, image_width, channels = model.input_shape[1:]
+    features_size = feature_extractor.output_shape[-1]
+
+    def extract_features(frames):
+        return feature_extractor(tf.cast(frames, tf.float32), training=False)
+
+    def classify_features(features_windows):
+        return temporal_head(features_windows, training=False)
+
+    def classify_clips(clips):
+        frames = tf.reshape(clips, (-1, image_height, image_width, channels))
+        features_windows = tf.reshape(extract_features(frames), (-1, sequence_length, features_size))
+        return classify_features(features_windows)
+
+    module = tf.Module()
+    module.feature_extractor = feature_extractor
+    module.temporal_head = temporal_head
+    module.extract_features = tf.function(
+        extract_features, jit_compile=jit_compile,
+        input_signature=[tf.TensorSpec((None, image_height, image_width, channels), tf.uint8)])
+    module.classify_features = tf.function(
+        classify_features, jit_compile=jit_compile,
+        input_signature=[tf.TensorSpec((None, sequence_length, features_size), tf.float32)])
+    module.classify_clips = tf.function(
+        classify_clips, jit_compile=jit_compile,
+        input_signature=[tf.TensorSpec((None, sequence_length, image_height, image_width, channels), tf.uint8)])
+    return module
+
+
+def load_inference_model(model_path, jit_compile=False):
+    # This function will load the inference functions of a saved LRCN model. They are exported
+    # next to the model file as a SavedModel the first time, and loaded from there afterwards,
+    # which skips rebuilding the Keras model and tracing its functions on every start.
+    # Args:
+    #   model_path: The path of the .h5 file saved by model.py.
+    #   jit_compile: Whether to compile the functions with XLA; XLA functions are exported
+    #                separately from the others.
+    # Returns:
+    #   inference_model: An InferenceModel.
+
+    import tensorflow as tf
+    export_dir = os.path.splitext(model_path)[0] + ('.xla.savedmodel' if jit_compile else '.savedmodel')
+    if os.path.isdir(export_dir) and os.path.getmtime(export_dir) >= os.path.getmtime(model_path):
+        module = tf.saved_model.load(export_dir)
+        if all(hasattr(module, function_name) for function_name in INFERENCE_FUNCTIONS):
+            return InferenceModel(module)
+
+    module = create_inference_functions(tf.keras.models.load_model(model_path), jit_compile)
+    try:
+        tf.saved_model.save(module, export_dir)
+    except OSError as error:
+        print(f'Could not export the inference functions to {export_dir}: {error}')
+    return InferenceModel(module)
+
+
+class InferenceModel:
+    # The fixed-signature inference functions of an LRCN model, taking and returning NumPy arrays.
+    # Calling them is safe from several threads sharing the same model.
+
+    def __init__(self, module):
+        self.module = module
+        _, self.image_height, self.image_width, _ = module.extract_features.input_signature[0].shape
+        _, self.sequence_length, self.features_size = module.classify_features.input_signature[0].shape
+
+    def extract_features(self, frames_batch):
+        # Map uint8 frames (N, IMAGE_HEIGHT, IMAGE_WIDTH, 3) to their feature vectors.
+        return self.module.extract_features(np.asarray(frames_batch, dtype=np.uint8)).numpy()
+
+    def classify_features(self, features_windows):
+        # Map feature sequences (N, SEQUENCE_LENGTH, features) to class probabilities.
+        return self.module.classify_features(np.asarray(features_windows, dtype=np.float32)).numpy()
+
+    def classify_clips(self, clips):
+        # Map uint8 clips (N, SEQUENCE_LENGTH, IMAGE_HEIGHT, IMAGE_WIDTH, 3) to class probabilities.
+        return self.module.classify_clips(np.asarray(clips, dtype=np.uint8)).numpy()
+
+    def warm_up(self, batch_size=1):
+        # Run the functions once, so the first request does not pay for initializing them.
+        self.extract_features(np.zeros((batch_size, self.image_height, self.image_width, 3), dtype=np.uint8))
+        self.classify_features(np.zeros((batch_size, self.sequence_length, self.features_size), dtype=np.float32))
+        self.classify_clips(np.zeros((1, self.sequence_length, self.image_height, self.image_width, 3), dtype=np.uint8))
+
+
+SMOOTHING_MODES = ('none', 'ema', 'majority')
+
+
+class SlidingWindowClassifier:
+    # Classifies the sliding windows of a frame stream incrementally. The CNN runs once per
+    # frame and its feature vector is kept in a ring buffer of the last SEQUENCE_LENGTH frames,
+    # so every window only costs one pass of the small temporal head.
+    # Optionally, frames that barely differ from the last frame the CNN saw reuse its features,
+    # windows without any such new frame reuse the previous prediction, and the predictions are
+    # smoothed over the recent windows, so that static scenes cost little and labels stay steady.
+
+    def __init__(self, inference_model, sequence_length, stride=1, motion_threshold=0, smoothing='none',
+                 smoothing_factor=0.5, smoothing_windows=5):
+        # Args:
+        #   stride: The number of frames between the ends of two classified windows.
+        #   motion_threshold: The mean absolute difference (0-255) from the last frame seen by the
+        #                     CNN below which a frame counts as static; 0 disables motion gating.
+        #   smoothing: 'none', 'ema' (exponential moving average of the probabilities, weighting the
+        #              newest window by smoothing_factor) or 'majority' (the share of the last
+        #              smoothing_windows windows voting for each class).
+        if smoothing not in SMOOTHING_MODES:
+            raise ValueError(f'smoothing must be one of {SMOOTHING_MODES}')
+
+        self.inference_model = inference_model
+        self.sequence_length = sequence_length
+        self.stride = stride
+        self.motion_threshold = motion_threshold
+        self.smoothing = smoothing
+        self.smoothing_factor = smoothing_factor
+        self.features_queue = deque(maxlen=sequence_length)
+        self.frame_counter = 0
+
+        self.reference_frame = None
+        self.reference_features = None
+        self.moved_since_last_window = True
+        self.last_prediction = None
+        self.smoothed_probabilities = None
+        self.recent_labels = deque(maxlen=smoothing_windows)
+
+        self.frames_extracted = 0
+        self.windows_classified = 0
+        self.windows_gated = 0
+
+    def select_moving_frames(self, frames_batch):
+        # Compare every frame with the last frame that went through the CNN (the previous moving frame).
+        moving = np.ones(len(frames_batch), dtype=bool)
+        if self.motion_threshold <= 0:
+            return moving
+        reference_frame = self.reference_frame
+        for frame_index, frame in enumerate(frames_batch):
+            if reference_frame is not None and np.mean(np.abs(frame.astype(np.int16) - reference_frame)) < self.motion_threshold:
+                moving[frame_index] = False
+            else:
+                reference_frame = frame.astype(np.int16)
+        self.reference_frame = reference_frame
+        return moving
+
+    def smooth(self, probabilities):
+        if self.smoothing == 'ema':
+            if self.smoothed_probabilities is None:
+                self.smoothed_probabilities = probabilities
+            else:
+                self.smoothed_probabilities = self.smoothing_factor * probabilities + (1 - self.smoothing_factor) * self.smoothed_probabilities
+            return self.smoothed_probabilities
+        if self.smoothing == 'majority':
+            self.recent_labels.append(int(np.argmax(probabilities)))
+            votes = np.bincount(self.recent_labels, minlength=len(probabilities))
+            return (votes / len(self.recent_labels)).astype(np.float32)
+        return probabilities
+
+    def process(self, frames_batch):
+        # This function will feed the next frames of the stream to the classifier.
+        # Args:
+        #   frames_batch: An array of preprocessed frames (N, IMAGE_HEIGHT, IMAGE_WIDTH, 3).
+        # Returns:
+        #   A list with one entry per frame: the (smoothed) class probabilities of the window
+        #   closed by that frame, or None if the frame does not close a window.
+
+        if len(frames_batch) == 0:
+            return []
+
+        moving = self.select_moving_frames(frames_batch)
+        frames_features = [None] * len(frames_batch)
+        if moving.any():
+            moving_features = self.inference_model.extract_features(np.asarray(frames_batch)[moving])
+            self.frames_extracted += len(moving_features)
+            for frame_index, frame_features in zip(np.flatnonzero(moving), moving_features):
+                frames_features[frame_index] = frame_features
+
+        windows_batch = []
+        window_frames = []
+        for frame_index, frame_features in enumerate(frames_features):
+            if frame_features is None:
+                frame_features = self.reference_features
+            else:
+                self.reference_features = frame_features
+                self.moved_since_last_window = True
+            self.features_queue.append(frame_features)
+            self.frame_counter += 1
+            if len(self.features_queue) == self.sequence_length and (self.frame_counter - self.sequence_length) % self.stride == 0:
+                # A window whose frames are all static (or already classified) keeps the previous prediction.
+                if self.moved_since_last_window or (self.last_prediction is None and not windows_batch):
+                    windows_batch.append(np.asarray(self.features_queue))
+                else:
+                    windows_batch.append(None)
+                window_frames.append(frame_index)
+                self.moved_since_last_window = False
+
+        predictions = [None] * len(frames_batch)
+        classified_windows = [window for window in windows_batch if window is not None]
+        if classified_windows:
+            predicted_labels_probabilities = iter(self.inference_model.classify_features(classified_windows))
+            self.windows_classified += len(classified_windows)
+        self.windows_gated += len(windows_batch) - len(classified_windows)
+
+        for frame_index, window in zip(window_frames, windows_batch):
+            if window is not None:
+                self.last_prediction = self.smooth(next(predicted_labels_probabilities))
+            predictions[frame_index] = self.last_prediction
+
+        return predictions
+
+
+def load_tflite_interpreter_class():
+    # This function will return the TFLite Interpreter class of the standalone TFLite runtime when
+    # it is installed (ai-edge-litert, or the older tflite-runtime), which loads in a fraction of
+    # the time of TensorFlow, and the one of TensorFlow otherwise.
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteInferenceModel:
+    # The same interface as InferenceModel, running the TFLite models written by export_tflite.py.
+    # A TFLite interpreter must not be invoked from two threads at once, so each model is
+    # guarded by its own lock; the CNN of one request can still overlap the head of another.
+
+    def __init__(self, model_dir, num_threads=None):
+        Interpreter = load_tflite_interpreter_class()
+        self.feature_extractor = Interpreter(model_path=os.path.join(model_dir, 'feature_extractor.tflite'), num_threads=num_threads)
+        self.temporal_head = Interpreter(model_path=os.path.join(model_dir, 'temporal_head.tflite'), num_threads=num_threads)
+        self.feature_extractor_lock = threading.Lock()
+        self.temporal_head_lock = threading.Lock()
+
+        # The CNN takes any number of frames and is resized to each batch size; the LSTM only
+        # converts with a fixed batch size, so windows are classified in padded batches of it.
+        _, self.image_height, self.image_width, _ = self.feature_extractor.get_input_details()[0]['shape_signature']
+        self.frames_batch_size = None
+        self.windows_batch_size, self.sequence_length, self.features_size = self.temporal_head.get_input_details()[0]['shape']
+        self.temporal_head.allocate_tensors()
+
+    def extract_features(self, frames_batch):
+        # Map uint8 frames (N, IMAGE_HEIGHT, IMAGE_WIDTH, 3) to their feature vectors.
+        frames_batch = np.asarray(frames_batch, dtype=np.float32)
+        input_index = self.feature_extractor.get_input_details()[0]['index']
+        with self.feature_extractor_lock:
+            if len(frames_batch) != self.frames_batch_size:
+                self.feature_extractor.resize_tensor_input(input_index, frames_batch.shape)
+                self.feature_extractor.allocate_tensors()
+                self.frames_batch_size = len(frames_batch)
+            self.feature_extractor.set_tensor(input_index, frames_batch)
+            self.feature_extractor.invoke()
+            return self.feature_extractor.get_tensor(self.feature_extractor.get_output_details()[0]['index'])
+
+    def classify_features(self, features_windows):
+        # Map feature sequences (N, SEQUENCE_LENGTH, features) to class probabilities.
+        features_windows = np.asarray(features_windows, dtype=np.float32)
+        input_index = self.temporal_head.get_input_details()[0]['index']
+        output_details = self.temporal_head.get_output_details()[0]
+        windows_batch = np.zeros((self.windows_batch_size, self.sequence_length, self.features_size), dtype=np.float32)
+
+        predicted_labels_probabilities = []
+        with self.temporal_head_lock:
+            for start in range(0, len(features_windows), self.windows_batch_size):
+                windows = features_windows[start:start + self.windows_batch_size]
+                windows_batch[:len(windows)] = windows
+                self.temporal_head.set_tensor(input_index, windows_batch)
+                self.temporal_head.invoke()
+                predicted_labels_probabilities.append(self.temporal_head.get_tensor(output_details['index'])[:len(windows)])
+
+        if not predicted_labels_probabilities:
+            return np.zeros((0, output_details['shape'][-1]), dtype=np.float32)
+        return np.concatenate(predicted_labels_probabilities)
+
+    def classify_clips(self, clips):
+        # Map uint8 clips (N, SEQUENCE_LENGTH, IMAGE_HEIGHT, IMAGE_WIDTH, 3) to class probabilities.
+        clips = np.asarray(clips, dtype=np.uint8)
+        frames_features = self.extract_features(clips.reshape((-1, self.image_height, self.image_width, 3)))
+        return self.classify_features(frames_features.reshape((len(clips), self.sequence_length, -1)))
+
+    def warm_up(self, batch_size=1):
+        # Run the models once, so the first request does not pay for allocating their tensors.
+        self.extract_features(np.zeros((batch_size, self.image_height, self.image_width, 3), dtype=np.uint8))
+        self.classify_features(np.zeros((1, self.sequence_length, self.features_size), dtype=np.float32))
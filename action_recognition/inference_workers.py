@@ -0,0 +1,307 @@
+import os
+import atexit
+import queue
+import itertools
+import threading
+import multiprocessing
+import numpy as np
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+# Default number of frames in the shared memory ring, and the largest share of it one call may
+# take; larger calls are split.
+RING_FRAMES = 1024
+MAX_CALL_SHARE = 4
+
+# Seconds between two checks that the workers (or, in a worker, the serving process) are still alive.
+WORKER_CHECK_INTERVAL = 1
+
+
+class SharedFrameRing:
+    # A ring buffer of uint8 frames in shared memory. The serving process writes the frames of
+    # every model call into a contiguous span of the ring and the worker processes map the same
+    # memory, so they read the frames where they were written. Spans are allocated in order and
+    # may be released in any order; allocating blocks until there is room.
+
+    def __init__(self, frames_count, frame_shape):
+        self.frames_count = frames_count
+        self.shared_memory = shared_memory.SharedMemory(create=True, size=frames_count * int(np.prod(frame_shape)))
+        self.frames = np.ndarray((frames_count,) + tuple(frame_shape), dtype=np.uint8, buffer=self.shared_memory.buf)
+        self.spans = deque()
+        self.released = set()
+        self.head = 0
+        self.condition = threading.Condition()
+
+    def find_space(self, count):
+        if not self.spans:
+            self.head = 0
+            return 0
+        tail = self.spans[0][0]
+        if self.head > tail:
+            # The used frames are [tail, head): use the end of the ring, or wrap around.
+            if self.head + count <= self.frames_count:
+                return self.head
+            return 0 if count < tail else None
+        # The used frames are [tail, end) and [0, head); the head never catches up with the tail.
+        return self.head if self.head + count < tail else None
+
+    def allocate(self, count):
+        # This function will reserve count contiguous frames.
+        # Returns:
+        #   start: The index of the first frame of the span.
+        if count > self.frames_count // 2:
+            raise ValueError(f'{count} frames do not fit in a ring of {self.frames_count} frames')
+        with self.condition:
+            start = self.find_space(count)
+            while start is None:
+                self.condition.wait()
+                start = self.find_space(count)
+            self.spans.append((start, start + count))
+            self.head = start + count
+            return start
+
+    def release(self, start):
+        with self.condition:
+            self.released.add(start)
+            while self.spans and self.spans[0][0] in self.released:
+                self.released.discard(self.spans.popleft()[0])
+            self.condition.notify_all()
+
+    def close(self):
+        del self.frames
+        self.shared_memory.close()
+        self.shared_memory.unlink()
+
+
+def run_inference_worker(worker_index, backend, model_path, jit_compile, intra_op_threads, inter_op_threads,
+                         ring_name, ring_shape, warm_up_batch_size, tasks, results):
+    # This function will run in a worker process: load the model with a fixed number of threads,
+    # then run the model calls of the tasks queue until it gets None, or the serving process is
+    # gone. Frames are read in place from the shared memory ring; feature windows come with the task.
+
+    # Pin the thread pools before the runtime creates them, so that the workers together use
+    # each core once instead of every worker starting a thread per core.
+    os.environ['OMP_NUM_THREADS'] = str(intra_op_threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(intra_op_threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = str(inter_op_threads)
+    try:
+        if backend == 'tflite':
+            from .inference import TFLiteInferenceModel
+            inference_model = TFLiteInferenceModel(model_path, num_threads=intra_op_threads)
+        else:
+            import tensorflow as tf
+            from .inference import load_inference_model
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+            inference_model = load_inference_model(model_path, jit_compile)
+        inference_model.warm_up(warm_up_batch_size)
+    except Exception as error:
+        results.put((None, worker_index, f'{type(error).__name__}: {error}'))
+        return
+
+    ring = shared_memory.SharedMemory(name=ring_name)
+    frames = np.ndarray(ring_shape, dtype=np.uint8, buffer=ring.buf)
+    classes_count = inference_model.classify_features(np.zeros((1, inference_model.sequence_length, inference_model.features_size),
+                                                               dtype=np.float32)).shape[-1]
+    results.put((None, worker_index, {'image_height': inference_model.image_height, 'image_width': inference_model.image_width,
+                                      'sequence_length': inference_model.sequence_length,
+                                      'features_size': inference_model.features_size, 'classes_count': classes_count}))
+
+    while True:
+        try:
+            task = tasks.get(timeout=WORKER_CHECK_INTERVAL)
+        except queue.Empty:
+            if not multiprocessing.parent_process().is_alive():
+                break
+            continue
+        if task is None:
+            break
+        call_id, function_name, inputs = task
+        try:
+            if function_name == 'extract_features':
+                start, count = inputs
+                outputs = inference_model.extract_features(frames[start:start + count])
+            elif function_name == 'classify_clips':
+                start, count = inputs
+                clips = frames[start:start + count].reshape((-1, inference_model.sequence_length) + frames.shape[1:])
+                outputs = inference_model.classify_clips(clips)
+            else:
+                outputs = inference_model.classify_features(inputs)
+            results.put((call_id, outputs, None))
+        except Exception as error:
+            results.put((call_id, None, f'{type(error).__name__}: {error}'))
+    del frames
+    ring.close()
+
+
+class InferenceWorkerPool:
+    # The interface of InferenceModel, running the model in worker processes. Each worker loads
+    # its own copy of the model with intra_op_threads threads and takes the next model call from
+    # a shared queue, so a call from any thread of the serving process runs on the first idle
+    # worker. Since each process has its own interpreter and runtime, the workers scale with the
+    # cores where threads of one process contend for the GIL and one runtime.
+
+    def __init__(self, workers, backend, model_path, jit_compile=False, intra_op_threads=1, inter_op_threads=1,
+                 image_size=(64, 64), ring_frames=RING_FRAMES, warm_up_batch_size=1):
+        # Args:
+        #   workers: The number of worker processes.
+        #   backend: 'tensorflow' to load model_path with load_inference_model(), or 'tflite' to load
+        #            the TFLite export directory model_path.
+        #   intra_op_threads, inter_op_threads: The thread pool sizes of the runtime of each worker.
+        #   image_size: The (height, width) of the preprocessed frames.
+        #   ring_frames: The number of frames in the shared memory ring.
+        self.ring = SharedFrameRing(ring_frames, tuple(image_size) + (3,))
+        self.max_call_frames = ring_frames // MAX_CALL_SHARE
+        self.call_ids = itertools.count()
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.error = None
+
+        # The TensorFlow parent of the workers, if any, must not be forked.
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        context = multiprocessing.get_context(start_method)
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        worker_args = (backend, model_path, jit_compile, intra_op_threads, inter_op_threads, self.ring.shared_memory.name,
+                       self.ring.frames.shape, warm_up_batch_size, self.tasks, self.results)
+        self.processes = [context.Process(target=run_inference_worker, args=(worker_index,) + worker_args,
+                                          name=f'inference-worker-{worker_index}', daemon=True)
+                          for worker_index in range(workers)]
+        atexit.register(self.close)
+
+        # The first worker exports the SavedModel of the model if needed, before the others load it.
+        try:
+            self.processes[0].start()
+            model_shape = self.wait_until_ready(1)
+            for process in self.processes[1:]:
+                process.start()
+            self.wait_until_ready(workers - 1)
+        except Exception:
+            self.close()
+            raise
+
+        self.image_height = model_shape['image_height']
+        self.image_width = model_shape['image_width']
+        self.sequence_length = model_shape['sequence_length']
+        self.features_size = model_shape['features_size']
+        self.output_sizes = {'extract_features': self.features_size, 'classify_features': model_shape['classes_count'],
+                             'classify_clips': model_shape['classes_count']}
+        if (self.image_height, self.image_width) != tuple(image_size):
+            self.close()
+            raise ValueError(f'The model takes {self.image_height}x{self.image_width} frames, not {image_size[0]}x{image_size[1]}')
+        # A clip is written into the ring in one span, which may take at most half of it.
+        if self.sequence_length > ring_frames // 2:
+            self.close()
+            raise ValueError(f'A ring of {ring_frames} frames cannot hold the {self.sequence_length} frame clips of the model: '
+                             f'it needs at least {2 * self.sequence_length} frames')
+
+        self.result_reader = threading.Thread(target=self.read_results, name='inference-worker-results', daemon=True)
+        self.result_reader.start()
+
+    def wait_until_ready(self, workers):
+        model_shape = None
+        for _ in range(workers):
+            while True:
+                try:
+                    _, worker_index, model_shape = self.results.get(timeout=WORKER_CHECK_INTERVAL)
+                    break
+                except queue.Empty:
+                    if any(process.exitcode is not None for process in self.processes):
+                        raise RuntimeError('An inference worker exited while loading the model')
+            if isinstance(model_shape, str):
+                raise RuntimeError(f'Inference worker {worker_index} could not load the model: {model_shape}')
+        return model_shape
+
+    def read_results(self):
+        # Hand the results of the workers to the waiting calls; if a worker dies, fail every pending
+        # call and the later ones, since the task it was running is lost.
+        while True:
+            try:
+                call_id, outputs, error = self.results.get(timeout=WORKER_CHECK_INTERVAL)
+            except queue.Empty:
+                if any(process.exitcode is not None for process in self.processes):
+                    self.fail(RuntimeError('An inference worker exited'))
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+            with self.pending_lock:
+                future = self.pending.pop(call_id, None)
+            if future is None:
+                continue
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(outputs)
+
+    def fail(self, error):
+        with self.pending_lock:
+            self.error = error
+            futures = list(self.pending.values())
+            self.pending.clear()
+        for future in futures:
+            future.set_exception(error)
+
+    def submit(self, function_name, inputs):
+        future = Future()
+        call_id = next(self.call_ids)
+        with self.pending_lock:
+            if self.error is not None:
+                raise self.error
+            self.pending[call_id] = future
+        self.tasks.put((call_id, function_name, inputs))
+        return future
+
+    def call_on_frames(self, function_name, frames, frames_per_item=1):
+        # Write the frames into the ring and let a worker read them there; calls with more frames than
+        # a share of the ring are split.
+        if len(frames) == 0:
+            return self.empty_outputs(function_name)
+        items_per_call = max(self.max_call_frames // frames_per_item, 1)
+        outputs = []
+        for item_start in range(0, len(frames), items_per_call):
+            items = frames[item_start:item_start + items_per_call]
+            count = len(items) * frames_per_item
+            start = self.ring.allocate(count)
+            try:
+                self.ring.frames[start:start + count] = items.reshape((count,) + self.ring.frames.shape[1:])
+                outputs.append(self.submit(function_name, (start, count)).result())
+            finally:
+                self.ring.release(start)
+        return np.concatenate(outputs)
+
+    def empty_outputs(self, function_name):
+        # The outputs of a call without inputs, which is not sent to the workers.
+        return np.zeros((0, self.output_sizes[function_name]), dtype=np.float32)
+
+    def extract_features(self, frames_batch):
+        # Map uint8 frames (N, IMAGE_HEIGHT, IMAGE_WIDTH, 3) to their feature vectors.
+        return self.call_on_frames('extract_features', np.asarray(frames_batch, dtype=np.uint8))
+
+    def classify_features(self, features_windows):
+        # Map feature sequences (N, SEQUENCE_LENGTH, features) to class probabilities.
+        if len(features_windows) == 0:
+            return self.empty_outputs('classify_features')
+        return self.submit('classify_features', np.asarray(features_windows, dtype=np.float32)).result()
+
+    def classify_clips(self, clips):
+        # Map uint8 clips (N, SEQUENCE_LENGTH, IMAGE_HEIGHT, IMAGE_WIDTH, 3) to class probabilities.
+        return self.call_on_frames('classify_clips', np.asarray(clips, dtype=np.uint8), self.sequence_length)
+
+    def warm_up(self, batch_size=1):
+        # The workers warm their model up when they start.
+        pass
+
+    def close(self):
+        atexit.unregister(self.close)
+        for process in self.processes:
+            if process.is_alive():
+                self.tasks.put(None)
+        for process in self.processes:
+            if process.pid is not None:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        self.fail(RuntimeError('The inference workers were stopped'))
+        self.ring.close()
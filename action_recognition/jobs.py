@@ -0,0 +1,98 @@
+import time
+import uuid
+import shutil
+import threading
+
+
+class Job:
+    # Tracks the state and progress of one video processed in the background.
+
+    def __init__(self, job_dir):
+        self.job_id = uuid.uuid4().hex
+        self.job_dir = job_dir
+        self.result_path = None
+        self.result_mimetype = None
+        self.status = 'queued'
+        self.error = None
+        self.frames_processed = 0
+        self.total_frames = 0
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def update_progress(self, frames_processed, total_frames):
+        self.frames_processed = frames_processed
+        self.total_frames = total_frames
+
+    def to_dict(self):
+        elapsed_time = None
+        frames_per_second = None
+        if self.started_at is not None:
+            elapsed_time = (self.finished_at or time.time()) - self.started_at
+            if elapsed_time > 0:
+                frames_per_second = self.frames_processed / elapsed_time
+
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'error': self.error,
+            'frames_processed': self.frames_processed,
+            'total_frames': self.total_frames,
+            'fps': frames_per_second,
+            'elapsed_time': elapsed_time,
+        }
+
+
+class JobStore:
+    # Keeps the jobs of this process in memory and runs them on the given executor.
+    # Finished jobs, and the files in their directory, are removed after result_ttl seconds.
+
+    def __init__(self, executor, result_ttl=3600):
+        self.executor = executor
+        self.result_ttl = result_ttl
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, job, function, *args):
+        # This function will register the job and run function(job, *args) in the background.
+        # The job is marked as failed if the function raises.
+
+        def run_job():
+            job.status = 'running'
+            job.started_at = time.time()
+            try:
+                function(job, *args)
+                job.status = 'done'
+            except Exception as error:
+                job.status = 'failed'
+                job.error = str(error)
+            finally:
+                job.finished_at = time.time()
+
+        self.remove_expired_jobs()
+        with self.lock:
+            self.jobs[job.job_id] = job
+        self.executor.submit(run_job)
+        return job
+
+    def get(self, job_id):
+        self.remove_expired_jobs()
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def remove_expired_jobs(self):
+        expiry_time = time.time() - self.result_ttl
+        with self.lock:
+            expired_jobs = [job for job in self.jobs.values() if job.finished_at is not None and job.finished_at < expiry_time]
+            for job in expired_jobs:
+                del self.jobs[job.job_id]
+
+        for job in expired_jobs:
+            shutil.rmtree(job.job_dir, ignore_errors=True)
+
+    def count_by_status(self):
+        counts = {status: 0 for status in ('queued', 'running', 'done', 'failed')}
+        with self.lock:
+            for job in self.jobs.values():
+                counts[job.status] += 1
+        return counts
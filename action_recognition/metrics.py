@@ -0,0 +1,195 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Default histogram buckets for durations, in seconds.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _format_labels(labelnames, labelvalues, extra_labels=()):
+    labels = list(zip(labelnames, labelvalues)) + list(extra_labels)
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric:
+    # The values of one metric, per combination of label values.
+
+    metric_type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects the labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.metric_type}']
+        with self.lock:
+            samples = list(self.samples())
+        for suffix, labelvalues, extra_labels, value in samples:
+            lines.append(f'{self.name}{suffix}{_format_labels(self.labelnames, labelvalues, extra_labels)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+    def samples(self):
+        for labelvalues, value in self.values.items():
+            yield '', labelvalues, (), value
+
+
+class Counter(_Metric):
+    # A value that only goes up, such as a number of requests or a cumulative time.
+
+    metric_type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    # A value that goes up and down. When a function is given, it is called at every scrape and
+    # returns the value, or a dict mapping tuples of label values to values.
+
+    metric_type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self.function = function
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.function is None:
+            yield from super().samples()
+            return
+        values = self.function()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labelvalues, value in values.items():
+            yield '', tuple(str(labelvalue) for labelvalue in labelvalues), (), value
+
+
+class Histogram(_Metric):
+    # Counts observations in cumulative buckets, with their sum, for latency percentiles.
+
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            bucket_counts, total = self.values.get(key, ([0] * len(self.buckets), 0.0))
+            for bucket_index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    bucket_counts[bucket_index] += 1
+            self.values[key] = (bucket_counts, total + value)
+
+    def samples(self):
+        for labelvalues, (bucket_counts, total) in self.values.items():
+            for upper_bound, bucket_count in zip(self.buckets, bucket_counts):
+                yield '_bucket', labelvalues, (('le', _format_value(upper_bound)),), bucket_count
+            yield '_sum', labelvalues, (), total
+            yield '_count', labelvalues, (), bucket_counts[-1]
+
+
+class MetricsRegistry:
+    # The metrics of this process, rendered in the Prometheus text exposition format.
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
+
+
+class StageTimer:
+    # Accumulates the time spent in each stage of processing one video, event counts, and the
+    # largest depth seen on each queue. The stages run on several threads, so updates are locked.
+
+    def __init__(self):
+        self.stages = {}
+        self.queue_depths = {}
+        self.counts = {}
+        self.frames = 0
+        self.started_at = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds, calls=1):
+        with self.lock:
+            stage_seconds, stage_calls = self.stages.get(stage, (0.0, 0))
+            self.stages[stage] = (stage_seconds + seconds, stage_calls + calls)
+
+    @contextmanager
+    def time(self, stage):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start_time)
+
+    def timed(self, stage, function):
+        # Wrap a function so that every call to it is timed as the given stage.
+        def timed_function(*args, **kwargs):
+            with self.time(stage):
+                return function(*args, **kwargs)
+        return timed_function
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def queue_depth(self, queue_name, depth):
+        with self.lock:
+            self.queue_depths[queue_name] = max(self.queue_depths.get(queue_name, 0), depth)
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'elapsed_seconds': time.perf_counter() - self.started_at,
+                'frames': self.frames,
+                'stages': {stage: {'seconds': seconds, 'calls': calls} for stage, (seconds, calls) in self.stages.items()},
+                'max_queue_depths': dict(self.queue_depths),
+                'counts': dict(self.counts),
+            }
@@ -0,0 +1,680 @@
+import os
+import cv2
+# import pydot
+# import pygame
+# pip install youtube_dl
+import random
+import numpy as np
+import datetime as dt
+from .video_sampling import sample_frame_indexes, read_frames_at
+from .dataset_builder import build_dataset, list_dataset_videos, extract_clip
+from .model_registry import write_model_metadata
+
+# TensorFlow, matplotlib, pafy and moviepy are imported by the functions that need them, so
+# that importing this module (e.g. for frames_extraction()) stays fast and has no side effects.
+
+# from tensorflow.keras.layers import *
+# from tensorflow.keras.models import Sequential
+# from tensorflow.keras.utils import to_categorical
+# from tensorflow.keras.callbacks import EarlyStopping
+# from tensorflow.keras.utils import plot_model
+
+
+# Seed of Numpy, Python and Tensorflow, and of the train/validation/test split.
+seed_constant = 27
+
+# Download Dataset
+# https://www.crcv.ucf.edu/data/UCF50.rar
+
+# ---------------------------------------------------------------------
+
+#                          Preprocessing the data
+
+# Specify the height and width to which each video frame will be resized in our dataset.
+IMAGE_HEIGHT , IMAGE_WIDTH = 64, 64
+
+# Specify the number of frames of a video that will be fed to the model as one sequence.
+SEQUENCE_LENGTH = 20
+
+# Specify the directory containing the UCF50 dataset.
+DATASET_DIR = 'UCF50'
+
+# Specify the directory where the extracted dataset is cached between runs.
+DATASET_CACHE_DIR = 'dataset_cache'
+
+# Where the training clips are read from: 'cache' creates the dataset in DATASET_CACHE_DIR first,
+# 'videos' decodes the clips straight from the videos on every epoch, and 'clip_store' reads them
+# from a clip store built beforehand with
+#   python -m action_recognition clip-store build UCF50 clip_store
+CLIPS_SOURCES = ('cache', 'videos', 'clip_store')
+CLIP_STORE_DIR = 'clip_store'
+
+# Randomly flip the training clips horizontally.
+AUGMENT_TRAINING_CLIPS = False
+
+# Specify the list containing the names of the classes used for training.
+# We can also choose any set of classes here
+CLASSES_LIST = ["WalkingWithDog", "TaiChi", "JumpRope", "HorseRace"]
+
+# The fractions of the clips kept for testing, and of the remaining clips kept for validation.
+TEST_SIZE = 0.25
+VALIDATION_SPLIT = 0.2
+
+
+def set_seeds(seed=seed_constant):
+    # This function will set the Numpy, Python and Tensorflow seeds to get consistent result on every execution.
+    import tensorflow as tf
+    np.random.seed(seed)
+    random.seed(seed)
+    tf.random.set_seed(seed)
+
+
+def plot_dataset_samples(dataset_dir=DATASET_DIR, samples_count=20):
+    # This function will visualize the first frame of a random video from random categories of
+    # the dataset with their associated labels written. This way we'll visualize a subset
+    # (20 random videos) of the dataset.
+    import matplotlib.pyplot as plt
+
+    # Get the names of all classes/categories in UCF50
+    all_classes_names = os.listdir(dataset_dir)
+
+    # Generate the list of 20 random values. The Values will be between 0-50,
+    # Where 50 is the total classes in the dataset
+    random_range = random.sample(range(len(all_classes_names)), min(samples_count, len(all_classes_names)))
+
+    # Create a matplotlib figure and specify the size of the figure
+    plt.figure(figsize=(20,20))
+
+    # Iterating through all the generated random values.
+    for counter, random_index in enumerate(random_range, 1):
+
+        # Retreive a Class Name using the random index.
+        selected_class_Name = all_classes_names[random_index]
+
+        # Retreive the list of all the video files present in the randomly selected Class Directory.
+        video_files_names_list = os.listdir(f'{dataset_dir}/{selected_class_Name}')
+
+        # Randomly select a video file from the list retreived from the
+        # randomly selected Class Directory
+        selected_video_file_name = random.choice(video_files_names_list)
+
+        # Initialize a VideoCapture object to read from the video file.
+        video_reader = cv2.VideoCapture(f'{dataset_dir}/{selected_class_Name}/{selected_video_file_name}')
+
+        # Read the first frame of the Video File
+        _, bgr_frame = video_reader.read()
+
+        # Release the videoCapture Object.
+        video_reader.release()
+
+        # Convert the frame from BGR into RGB format.
+        rgb_frame = cv2.cvtColor(bgr_frame, cv2.COLOR_BGR2RGB)
+
+        # Write the class name on the video frame
+        cv2.putText(rgb_frame, selected_class_Name, (10,30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255,255,255), 2)
+        cv2.putText(rgb_frame, "DETECTED", (10,60), cv2.FONT_HERSHEY_SIMPLEX, 1, (0,255,0), 2)
+
+        # Display the frame
+        plt.subplot(5, 4, counter)
+        plt.imshow(rgb_frame)
+        plt.axis('off')
+    plt.show()
+
+
+# Creating a Function to Extract and Resize Frames
+def frames_extraction(video_path, sequence_length=SEQUENCE_LENGTH, image_height=IMAGE_HEIGHT, image_width=IMAGE_WIDTH):
+    # This function will extract the requried frames from a video after resizing them.
+    # The frames are kept as uint8: the model normalizes them itself.
+    # Arguments :
+    #   video_path : The path of the video in the disk, whose frames are to be extracted.
+    # Returns :
+    # frames_list: A list containing the resized frames of the video.
+
+    # Declare a list to store video frames.
+    frames_list = []
+
+    # Read the Video File using the VideoCapture object.
+    video_reader = cv2.VideoCapture(video_path)
+
+    # Get the total number of frames in the video.
+    video_frames_count = int(video_reader.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    # Calculate the indexes of the frames to add to the list, spread evenly over the video.
+    frame_indexes = sample_frame_indexes(video_frames_count, sequence_length)
+
+    # Read the sampled frames in one sequential pass instead of seeking before every frame,
+    # which would decode the same group of pictures again for every sample.
+    for frame in read_frames_at(video_reader, frame_indexes):
+
+        # Resize the Frame to fixed height and width.
+        resized_frame = cv2.resize(frame, (image_width, image_height))
+
+        # Append the resized frame into the frames list
+        frames_list.append(resized_frame)
+
+    # Release the VideoCapture Object.
+    video_reader.release()
+
+    # Return the frames list.
+    return frames_list
+
+#  Creating a function for Dataset Creation
+def create_dataset(dataset_dir=DATASET_DIR, classes_list=CLASSES_LIST, cache_dir=DATASET_CACHE_DIR):
+    # This function will extract the data of the selected classes and create
+    # the required dataset. The videos are extracted in parallel by a pool of processes
+    # into a uint8 array memory-mapped from the cache directory, and a manifest of the
+    # extracted videos lets the next run extract only the new or changed ones.
+    # Returns:
+    #   Features: An array containing the extracted frames of the videos.
+    #   Labels: An array containing the indexes of the classes associated with the videos.
+    #   video_files_paths: A list containing the paths of the videos in the disk.
+
+    # Build (or update) the cached dataset of the classes in the classes list.
+    # Videos having frames less than the SEQUENCE_LENGTH are ignored.
+    features, labels, video_files_paths = build_dataset(dataset_dir, classes_list, cache_dir,
+                                                        SEQUENCE_LENGTH, IMAGE_HEIGHT, IMAGE_WIDTH)
+
+    # Return the frames, class index, and video file path.
+    return features, labels, video_files_paths
+
+
+def load_training_clips(clips_source='cache', dataset_dir=DATASET_DIR, classes_list=CLASSES_LIST,
+                        cache_dir=DATASET_CACHE_DIR, clip_store_dir=CLIP_STORE_DIR):
+    # This function will give access to the clips of the selected classes, from one of CLIPS_SOURCES.
+    # Returns:
+    #   load_clip: A function returning the uint8 frames of the clip at an index.
+    #   labels: An array containing the indexes of the classes associated with the clips.
+    #   video_files_paths: A list containing the paths of the videos of the clips.
+
+    if clips_source not in CLIPS_SOURCES:
+        raise ValueError(f'clips_source must be one of {CLIPS_SOURCES}')
+
+    if clips_source == 'videos':
+
+        # Decode the clips from the video files on every epoch instead of creating the dataset.
+        # Videos having frames less than the SEQUENCE_LENGTH are skipped by the input pipeline.
+        videos = list_dataset_videos(dataset_dir, classes_list)
+        video_files_paths = [video_file_path for video_file_path, _ in videos]
+        labels = np.array([classes_list.index(class_name) for _, class_name in videos])
+        load_clip = lambda index: extract_clip(video_files_paths[index], SEQUENCE_LENGTH, IMAGE_HEIGHT, IMAGE_WIDTH)
+
+    elif clips_source == 'clip_store':
+
+        # Open the clips of the selected classes from the clip store, memory-mapped without copying.
+        from .clip_store import ClipStore
+        clip_store = ClipStore(clip_store_dir)
+        clip_indexes, labels, video_files_paths = clip_store.select(classes_list)
+        load_clip = lambda index: clip_store[clip_indexes[index]]
+
+    else:
+
+        # Create the dataset. The features stay memory-mapped from the disk.
+        features, labels, video_files_paths = create_dataset(dataset_dir, classes_list, cache_dir)
+        load_clip = lambda index: features[index]
+
+    return load_clip, labels, video_files_paths
+
+
+def create_training_datasets(load_clip, labels, classes_count, augment=AUGMENT_TRAINING_CLIPS, batch_size=4):
+    # This function will split the clips into a train, validation and test set and build the
+    # tf.data input pipelines streaming the clips of each set, with the labels (class indexes)
+    # converted into one-hot encoded vectors.
+    # Returns:
+    #   train_dataset, validation_dataset, test_dataset: The input pipelines of the three sets.
+
+    from .train_input import split_dataset_indexes, make_clips_dataset
+
+    # Split the Data into Train(75%) and Test Set(25%), and keep the last 20% of the
+    # Train Set for validation.
+    train_indexes, validation_indexes, test_indexes = split_dataset_indexes(
+        len(labels), test_size=TEST_SIZE, validation_split=VALIDATION_SPLIT, seed=seed_constant
+    )
+
+    clip_shape = (SEQUENCE_LENGTH, IMAGE_HEIGHT, IMAGE_WIDTH, 3)
+    train_dataset = make_clips_dataset(load_clip, labels, train_indexes, classes_count, clip_shape, batch_size=batch_size,
+                                       shuffle=True, seed=seed_constant, augment=augment)
+    validation_dataset = make_clips_dataset(load_clip, labels, validation_indexes, classes_count, clip_shape, batch_size=batch_size)
+    test_dataset = make_clips_dataset(load_clip, labels, test_indexes, classes_count, clip_shape, batch_size=batch_size)
+    return train_dataset, validation_dataset, test_dataset
+
+#                           # Constructing the model
+ 
+# def create_convlstm_model():
+#     # This function will construct the required convlstm model.
+#     # returns:
+#     #   model: It is the required constructed convlstm model.
+
+#     # We will use a Sequential Model for model construction
+#     model = tf.keras.models.Sequential()
+
+#     # Define the Model Architecture.
+#     # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # 
+
+#     model.add(
+#         tf.keras.layers.ConvLSTM2D(filters = 4, kernel_size = (3,3),
+#                                    activation='tanh', data_format="channels_last",
+#                                    recurrent_dropout=0.2, return_sequences=True,
+#                                    input_shape = (SEQUENCE_LENGTH, IMAGE_HEIGHT, IMAGE_WIDTH, 3)))
+    
+#     model.add(tf.keras.layers.MaxPooling3D(pool_size=(1,2,2), padding='same',
+#                                            data_format='channels_last'))
+    
+#     model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.Dropout(0.2)))
+#     model.add(tf.keras.layers.ConvLSTM2D(filters = 8, kernel_size=(3,3), activation='tanh', 
+#                          data_format = 'channels_last', recurrent_dropout=0.2,
+#                          return_sequences=True))
+    
+#     model.add(tf.keras.layers.MaxPooling3D(pool_size=(1,2,2), padding='same',
+#                                            data_format='channels_last'))
+    
+#     model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.Dropout(0.2)))
+#     model.add(tf.keras.layers.ConvLSTM2D(filters = 14, kernel_size=(3,3), activation='tanh', 
+#                          data_format = 'channels_last', recurrent_dropout=0.2,
+#                          return_sequences=True))
+    
+#     model.add(tf.keras.layers.MaxPooling3D(pool_size=(1,2,2), padding='same',
+#                                            data_format='channels_last'))
+    
+#     model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.Dropout(0.2)))
+#     model.add(tf.keras.layers.ConvLSTM2D(filters = 16, kernel_size=(3,3), activation='tanh', 
+#                          data_format = 'channels_last', recurrent_dropout=0.2,
+#                          return_sequences=True))
+    
+#     model.add(tf.keras.layers.MaxPooling3D(pool_size=(1,2,2), padding='same',
+#                                            data_format='channels_last'))
+#     #model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.Dropout(0.2)))
+
+#     model.add(tf.keras.layers.Flatten())
+#     model.add(tf.keras.layers.Dense(len(CLASSES_LIST), activation="softmax"))
+
+#     # Display the model Summary.
+#     model.summary()
+
+#     # Return the constructed model convlstm model
+#     return model
+
+# # Now we will utilize the function create_convlstm_model() to construct the
+# # required convlstm model.
+
+# # Construct the required convlstm model.
+# convlstm_model = create_convlstm_model()
+
+# # Display the success message.
+# print("Model Created Successfully!")
+
+# #                       Compile and Train the model
+
+# # Next we will add an early stopping callback to prevent overfitting
+# # and start the training after compiling the model.
+
+# # Create an Instance of Early Stopping callback
+# early_stopping_callback = tf.keras.callbacks.EarlyStopping(monitor = 'val_loss', patience=10, mode='min', restore_best_weights=True)
+
+# # Compile the model and specify loss function, optimizer and metrices values to the model
+# convlstm_model.compile(loss='categorical_crossentropy', optimizer='adam', metrics=["accuracy"])
+
+# # Start training the model
+# convlstm_model_training_history = convlstm_model.fit(x=features_train, y=labels_train, epochs=50, batch_size=4, 
+#                                                      shuffle=True, validation_split=0.2,
+#                                                      callbacks=[early_stopping_callback])
+
+# #                            Evaluating the model
+
+# # Evaluate the trained model
+# model_evaluation_history = convlstm_model.evaluate(features_test, labels_test)
+
+
+# #                               Save the model 
+
+# # Get the loss and accuracy from model_evaluation_history.
+# model_evaluation_loss, model_evaluation_accuracy = model_evaluation_history
+
+# # Define the string date format.
+# # Get the current Date and Time in a DateTime Object.
+# # Convert the DateTime object to string according to the style mentioned in date_time_format string.
+# date_time_format = '%Y_%m_%d__%H_%M_%S'
+# current_date_time_dt = dt.datetime.now()
+# current_date_time_string = dt.datetime.strftime(current_date_time_dt, date_time_format)
+
+# # Define a useful name for our model to make it easy for us while navigating 
+# # through multiple saved models.
+# model_file_name = f'convlstm_model__Date_Time_{current_date_time_string}__Loss_{model_evaluation_loss}__Accuracy_{model_evaluation_accuracy}.h5'
+
+# # Save your Model.
+# convlstm_model.save(model_file_name)
+
+
+# #                       Plot Model's Loss And Accuracy Curves
+
+# def plot_metric(model_training_history, metric_name_1, metric_name_2, plot_name):
+#     # This function will plot the metrics passed to it in a graph.
+#     # Args:
+#     #       model_training_history: A history object containing a record of training and validation
+#     #                               loss values and metrics values at successive epochs
+#     #       metric_name_1: The name of the first metric that needs to be plotted in the graph
+#     #       metric_name_2: The name of the second metric that needs to be plotted in the graph
+#     #       plot_name: the title of the graph
+
+#     # Get metric values using metric names as identifiers.
+#     metric_value_1 = model_training_history.history[metric_name_1]
+#     metric_value_2 = model_training_history.history[metric_name_2]
+
+#     # Construct a range object which will be used as x-axis(horizontal plane) of the graph.
+#     epochs = range(len(metric_value_1))
+
+#     # Plot the Graph.
+#     plt.plot(epochs, metric_value_1, 'blue', label=metric_name_1)
+#     plt.plot(epochs, metric_value_2, 'red', label=metric_name_2)
+
+#     # Add the title to the plot
+#     plt.title(str(plot_name))
+
+#     # Add legend to the plot
+#     plt.legend()
+#     plt.show()
+
+# #Now utililze the function plot_metric()
+
+# # Visualize the training and validation loss metrics.
+# plot_metric(convlstm_model_training_history, 'loss', 'val_loss', "Total Loss vs Total Validation Loss")
+
+# # Visualize the training and validation accuracy metrics.
+# plot_metric(convlstm_model_training_history, 'accuracy', 'val_accuracy', "Total Accuracy vs Total Validation Accuarcy")
+
+
+
+
+
+# ------------------CONSTRUCTING A NEW MODEL LRCM MODEL-----------------
+
+def create_LRCN_model(classes_count=len(CLASSES_LIST), sequence_length=SEQUENCE_LENGTH, image_height=IMAGE_HEIGHT, image_width=IMAGE_WIDTH):
+    # This function will construct the required LRCN Model.
+    # Returns:
+    #   model: It is the required constructed model.
+
+    import tensorflow as tf
+
+    # We will use a Sequential model for model construction.
+    model = tf.keras.models.Sequential()
+
+    # Define the model achitecture
+    # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
+
+    # The model takes the uint8 frames as they are stored and normalizes them itself
+    # in float32, so that each pixel value then lies between 0 and 1.
+    model.add(tf.keras.layers.Rescaling(1./255, input_shape = (sequence_length, image_height, image_width, 3)))
+
+    model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.Conv2D(16, (3,3), padding='same', activation='relu')))
+
+    model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.MaxPooling2D((4,4))))
+    model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.Dropout(0.25)))
+
+    model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.Conv2D(32, (3,3), padding='same', activation='relu')))
+    model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.MaxPooling2D((4,4))))
+    model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.Dropout(0.25)))
+
+    model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.Conv2D(64, (3,3), padding='same', activation='relu')))
+    model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.MaxPooling2D((2,2))))
+    model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.Dropout(0.25)))
+
+    model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.Conv2D(64, (3,3), padding='same', activation='relu')))
+    model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.MaxPooling2D((2,2))))
+    # model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.Dropout(0.25)))
+
+    model.add(tf.keras.layers.TimeDistributed(tf.keras.layers.Flatten()))
+
+    model.add(tf.keras.layers.LSTM(32))
+    model.add(tf.keras.layers.Dense(classes_count, activation='softmax'))
+
+    # Display the models summary.
+    model.summary()
+
+    # Return the constructed LRCN model
+    return model
+
+#                       Compile and Train LRCN Model
+
+def train_LRCN_model(train_dataset, validation_dataset, classes_count, epochs=70, patience=15):
+    # This function will construct, compile and train an LRCN model.
+    # An early stopping callback prevents overfitting.
+    # Returns:
+    #   LRCN_model: The trained model, with the weights of its best validation loss.
+    #   LRCN_model_training_history: The history object of the training.
+
+    import tensorflow as tf
+
+    # Construct the required LRCN model.
+    LRCN_model = create_LRCN_model(classes_count)
+
+    # Create an Instance of Early Stopping callback
+    early_stopping_callback = tf.keras.callbacks.EarlyStopping(monitor = 'val_loss', patience=patience, mode='min', restore_best_weights=True)
+
+    # Compile the model and specify loss function, optimizer and metrices values to the model
+    LRCN_model.compile(loss='categorical_crossentropy', optimizer='adam', metrics=["accuracy"])
+
+    # Start training the model
+    LRCN_model_training_history = LRCN_model.fit(train_dataset, epochs=epochs, validation_data=validation_dataset,
+                                                 callbacks=[early_stopping_callback])
+    return LRCN_model, LRCN_model_training_history
+
+#                               Save the LRCN model
+
+def save_LRCN_model(LRCN_model, model_evaluation_loss, model_evaluation_accuracy, output_dir='.', classes_list=None):
+    # This function will save a trained model under a name with the date, loss and accuracy, with
+    # the JSON sidecar the model registry of the API reads its classes and input shape from.
+    # Returns:
+    #   model_file_path: The path of the saved .h5 file.
+
+    # Define the string date format.
+    # Get the current Date and Time in a DateTime Object.
+    # Convert the DateTime object to string according to the style mentioned in date_time_format string.
+    date_time_format = '%Y_%m_%d__%H_%M_%S'
+    current_date_time_dt = dt.datetime.now()
+    current_date_time_string = dt.datetime.strftime(current_date_time_dt, date_time_format)
+
+    # Define a useful name for our model to make it easy for us while navigating
+    # through multiple saved models.
+    model_file_name = f'LRCN_model__Date_Time_{current_date_time_string}__Loss_{model_evaluation_loss}__Accuracy_{model_evaluation_accuracy}.h5'
+
+    # Save your Model.
+    model_file_path = os.path.join(output_dir, model_file_name)
+    LRCN_model.save(model_file_path)
+
+    # The sidecar is written after the model, so the model is complete once it has one.
+    sequence_length, image_height, image_width = LRCN_model.input_shape[1:4]
+    write_model_metadata(model_file_path, {
+        'name': 'LRCN_model', 'version': current_date_time_string,
+        'classes': list(classes_list if classes_list is not None else CLASSES_LIST),
+        'sequence_length': sequence_length, 'image_height': image_height, 'image_width': image_width,
+        'loss': float(model_evaluation_loss), 'accuracy': float(model_evaluation_accuracy),
+        'created_at': current_date_time_dt.isoformat(timespec='seconds'),
+    })
+    return model_file_path
+
+
+#                       Plot Model's Loss And Accuracy Curves
+
+def plot_metric(model_training_history, metric_name_1, metric_name_2, plot_name):
+    # This function will plot the metrics passed to it in a graph.
+    # Args:
+    #       model_training_history: A history object containing a record of training and validation
+    #                               loss values and metrics values at successive epochs
+    #       metric_name_1: The name of the first metric that needs to be plotted in the graph
+    #       metric_name_2: The name of the second metric that needs to be plotted in the graph
+    #       plot_name: the title of the graph
+
+    import matplotlib.pyplot as plt
+
+    # Get metric values using metric names as identifiers.
+    metric_value_1 = model_training_history.history[metric_name_1]
+    metric_value_2 = model_training_history.history[metric_name_2]
+
+    # Construct a range object which will be used as x-axis(horizontal plane) of the graph.
+    epochs = range(len(metric_value_1))
+
+    # Plot the Graph.
+    plt.plot(epochs, metric_value_1, 'blue', label=metric_name_1)
+    plt.plot(epochs, metric_value_2, 'red', label=metric_name_2)
+
+    # Add the title to the plot
+    plt.title(str(plot_name))
+
+    # Add legend to the plot
+    plt.legend()
+    plt.show()
+
+#                       Defininig Download Youtube Videos Function
+
+def download_youtube_videos(youtube_video_url, output_directory):
+    # This function downloads the youtube video whose URL is passed to it as an argument.
+    # Args:
+    #   youtube_video_url: URL of the video that URL is passed to it as an argument.
+    #   output_directory: The directory path to which the video needs to be stored after downloading.
+    # Returns:
+    #   title: The title of the downloaded youtube video
+
+    import pafy
+
+    # Make the output directory if it does not exist
+    os.makedirs(output_directory, exist_ok=True)
+
+    # Create a video object which contains useful information about the video
+    video = pafy.new(youtube_video_url)
+
+    # Retreive the title of the video
+    title = video.title
+
+    # Get the best available quality object for the video
+    video_best = video.getbest()
+
+    # Construct the output file path
+    output_file_path = f'{output_directory}/{title}.mp4'
+
+    # Download the youtube video at the best available quality and store it to the constructed path
+    video_best.download(filepath = output_file_path, quiet=True)
+
+    # Return the video title
+    return title
+
+# ************************************************************************
+
+# # Download a YouTube video.
+# video_title = download_youtube_videos('https://www.youtube.com/watch?v=8u0qjmHI0cE', test_videos_directory)
+
+# # Get the Youtube Video's path we just downloaded
+# input_video_file_path = f'{test_videos_directory}/{video_title}.mp4'
+
+# #           Create a Function To Perform Action Recognition on Videos
+
+# def predict_on_video(video_file_path, output_file_path, SEQUENCE_LENGTH):
+
+#     # This function will perform action recognition on a video using LRCN model
+#     # Args:
+#     #    video_file_path: The path of the video stored in the disk on which the action recognition is to be performed
+#     #    output_file_path: The path where the output video with the prediction action being performed overlayed will be stored.
+#     #    SEQUENCE_LENGTH: The fixed number of frames of a video that can be passed to the model as one sequence.
+
+#     # Initialize the VideoCapture object to read form the video file
+#     video_reader = cv2.VideoCapture(video_file_path)
+
+#     # Get the width and height of the video
+#     Original_video_width = int(video_reader.get(cv2.CAP_PROP_FRAME_WIDTH))
+#     Original_video_height = int(video_reader.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+#     # Initialize the VideoWriter Object to store the output video in the disk
+#     video_writer = cv2.VideoWriter(output_file_path, cv2.VideoWriter_fourcc('M', 'P', '4', 'V'),
+#                                    video_reader.get(cv2.CAP_PROP_FPS), (Original_video_width, Original_video_height))
+    
+#     # Declare a queue to store video frames.
+#     frames_queue = deque(maxlen=SEQUENCE_LENGTH)
+
+#     # Initialize a variable to store the predicted action being performed in the video.
+#     predicted_class_name = ''
+
+#     # Iterate until the video is accessed successfully.
+#     while video_reader.isOpened():
+
+#         # Read the frame.
+#         ok, frame = video_reader.read()
+
+#         # Check if frame is not read properly then break the loop.
+#         if not ok:
+#              break
+        
+#         # Resize the frame to fixed Dimensions.
+#         resized_frame = cv2.resize(frame, (IMAGE_HEIGHT, IMAGE_WIDTH))
+
+#         # Normalize the resized frame by dividing it with 255 so that each pixel value then lies between 0 and 1
+#         normalized_frame = resized_frame / 255
+
+#         # Appending the preprocessed frame into the frames list.
+#         frames_queue.append(normalized_frame)
+
+#         # Check if the number of frames to the model and get the predicted probabilities.
+#         if len(frames_queue) == SEQUENCE_LENGTH:
+
+#             # Pass the normalized frames to the model and get the predicted probablities.
+#             predicted_label_probabilities = LRCN_model.predict(np.expand_dims(frames_queue, axis=0))[0]
+
+#             # Get the index of class with the highest probability
+#             predicted_label = np.argmax(predicted_label_probabilities)
+
+#             # Get the class name using the retreived index
+#             predicted_class_name = CLASSES_LIST[predicted_label]
+
+#         # Write predicted class name on top of the frame
+#         cv2.putText(frame, predicted_class_name, (10,30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+
+#         # Write the frame into the disk using the VideoWriter Object
+#         video_writer.write(frame)
+
+#     # Release the VideoCapture and VideoWriter Objects
+#     video_reader.release()
+#     video_writer.release()
+
+
+# #                Perform Action Recognition on Test Video
+
+# # Construct the output video path
+# output_video_file_path = f'{test_videos_directory}/{video_title}--Output-SeqLen{SEQUENCE_LENGTH}.mp4'
+
+# # Perform Action Recognition on the Test Video
+# predict_on_video(input_video_file_path, output_video_file_path, SEQUENCE_LENGTH)
+
+# # Display the output video
+# VideoFileClip(output_video_file_path, audio=False, target_resolution=(300, None)).ipython_display()
+
+
+# *********************************************************************
+
+#           Create a Function To perform a Single Prediction on Videos
+
+def predict_single_action(video_file_path, inference_model, classes_list=CLASSES_LIST):
+    # This function will perform single action recognition on a video using the LRCN model.
+    # Args:
+    #   video_file_path: The path of the video stored in the disk on which the action recognition is to be performed
+    #   inference_model: The InferenceModel (or TFLiteInferenceModel) of the LRCN model, see load_inference_model().
+    #   classes_list: The class names indexed by the model's predicted labels.
+    # Returns:
+    #   predicted_class_name: The name of the predicted action.
+    #   confidence: The probability of the predicted action.
+    # Raises:
+    #   ValueError: If the video cannot be read or is too short for one clip.
+
+    # Extract the fixed number of frames the model takes, spread evenly over the video.
+    frames_list = frames_extraction(video_file_path, inference_model.sequence_length, inference_model.image_height,
+                                    inference_model.image_width)
+    if len(frames_list) != inference_model.sequence_length:
+        raise ValueError(f'{video_file_path} has fewer than {inference_model.sequence_length} readable frames')
+
+    # Pass the uint8 frames to the model, which normalizes them, and get the predicted probablities.
+    predicted_label_probabilities = inference_model.classify_clips(np.expand_dims(frames_list, axis=0))[0]
+
+    # Get the index of class with the highest probability
+    predicted_label = np.argmax(predicted_label_probabilities)
+
+    # Get the class name using the retreived index
+    predicted_class_name = classes_list[predicted_label]
+
+    # Return the predicted action along with the prediction confidence.
+    return predicted_class_name, float(predicted_label_probabilities[predicted_label])
@@ -0,0 +1,327 @@
+import os
+import re
+import json
+import time
+import queue
+import threading
+import cv2
+import numpy as np
+from contextlib import contextmanager
+
+# Extension of the model files found by the registry. The metadata of a model (its classes,
+# SEQUENCE_LENGTH and image size, ...) is in a JSON sidecar with the same name.
+MODEL_EXTENSION = '.h5'
+SIDECAR_EXTENSION = '.json'
+
+# Names of the files written by save_LRCN_model() in model.py: <name>__Date_Time_<version>__Loss_...
+MODEL_FILE_NAME_PATTERN = re.compile(r'^(?P<name>.+?)__Date_Time_(?P<version>\d{4}_\d{2}_\d{2}__\d{2}_\d{2}_\d{2})')
+VERSION_FORMAT = '%Y_%m_%d__%H_%M_%S'
+
+
+def sidecar_path(model_path):
+    return os.path.splitext(model_path)[0] + SIDECAR_EXTENSION
+
+
+def parse_model_file_name(model_path):
+    # This function will read the model name and version from the name of a model file.
+    # Returns:
+    #   name: The model name, or the file name without its extension.
+    #   version: The date and time of the model, or None.
+    file_name = os.path.splitext(os.path.basename(model_path))[0]
+    match = MODEL_FILE_NAME_PATTERN.match(file_name)
+    if match is None:
+        return file_name, None
+    return match.group('name'), match.group('version')
+
+
+def write_model_metadata(model_path, metadata):
+    # This function will write the sidecar of a model file. Write it once the model is saved: a
+    # model with a sidecar is complete, so the registry loads it as soon as it sees the sidecar.
+    path = sidecar_path(model_path)
+    with open(path + '.tmp', 'w') as sidecar_file:
+        json.dump(metadata, sidecar_file, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def read_model_metadata(model_path, default_metadata=None):
+    # This function will read the metadata of a model file from its sidecar. Models saved before
+    # the sidecars existed get default_metadata, and their name and version from the file name
+    # (or its modification time).
+    # Returns:
+    #   metadata: A dict with at least the name, version and classes of the model.
+    metadata = dict(default_metadata or {})
+    if os.path.exists(sidecar_path(model_path)):
+        with open(sidecar_path(model_path)) as sidecar_file:
+            metadata.update(json.load(sidecar_file))
+    name, version = parse_model_file_name(model_path)
+    metadata.setdefault('name', name)
+    metadata.setdefault('version', version or time.strftime(VERSION_FORMAT, time.localtime(os.path.getmtime(model_path))))
+    if 'classes' not in metadata:
+        raise ValueError(f'No classes for {model_path}: its sidecar {sidecar_path(model_path)} has none')
+    return metadata
+
+
+class ServedModel:
+    # A loaded version of a model, shared by the requests using it. It is reference counted: the
+    # registry holds a reference while it serves the version and every request holds one while
+    # it runs, so a version that is replaced is only closed after the last request using it.
+
+    def __init__(self, path, metadata, inference_model, files_identity):
+        self.path = path
+        self.metadata = metadata
+        self.name = metadata['name']
+        self.version = metadata['version']
+        self.classes_list = list(metadata['classes'])
+        self.inference_model = inference_model
+        self.files_identity = files_identity
+        self.sequence_length = inference_model.sequence_length
+        self.image_height = inference_model.image_height
+        self.image_width = inference_model.image_width
+        self.references = 1
+        self.lock = threading.Lock()
+
+    def preprocess_frame(self, frame):
+        return cv2.resize(frame, (self.image_width, self.image_height))
+
+    def acquire(self):
+        with self.lock:
+            self.references += 1
+        return self
+
+    def release(self):
+        with self.lock:
+            self.references -= 1
+            unused = self.references == 0
+        # Stopping the batcher threads or the worker processes of the model can take a moment.
+        if unused and hasattr(self.inference_model, 'close'):
+            threading.Thread(target=self.inference_model.close, name=f'model-closer-{self.version}', daemon=True).start()
+
+    def to_dict(self):
+        return {'name': self.name, 'version': self.version, 'classes': self.classes_list, 'sequence_length': self.sequence_length,
+                'image_height': self.image_height, 'image_width': self.image_width, 'requests_in_progress': self.references - 1}
+
+
+class ModelRegistry:
+    # Finds the model files of a directory and serves the newest versions_loaded versions of
+    # every model. New and changed files are loaded and warmed up on a background thread, then
+    # swapped in under a lock: the requests running keep the version they started with, and the
+    # next ones get the new version, without a pause. Versions are ordered as strings, which
+    # orders the Date_Time versions written by training chronologically. The directory is
+    # scanned every poll_interval seconds, and whenever scan() is called.
+
+    def __init__(self, models_dir, load_model_version, default_model, default_metadata=None, versions_loaded=2, poll_interval=10):
+        # Args:
+        #   models_dir: The directory of the model files.
+        #   load_model_version: A function taking the path and metadata of a model file, which loads
+        #                       and warms up its model and returns (inference_model, files_identity).
+        #   default_model: The name of the model served to requests that do not choose one.
+        #   default_metadata: The metadata of the models without a sidecar.
+        self.models_dir = models_dir
+        self.load_model_version = load_model_version
+        self.default_model = default_model
+        self.default_metadata = default_metadata
+        self.versions_loaded = versions_loaded
+        self.poll_interval = poll_interval
+
+        self.model_files = {}
+        self.unsettled_files = {}
+        self.models = {}
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.load_queue = queue.Queue()
+
+    def start(self):
+        self.scan(initial=True)
+        threading.Thread(target=self.load_models, name='model-loader', daemon=True).start()
+        if self.poll_interval > 0:
+            threading.Thread(target=self.poll, name='model-registry-poll', daemon=True).start()
+        return self
+
+    def poll(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self.scan()
+
+    def scan(self, initial=False):
+        # This function will look for new, changed and removed model files, queue the loading of
+        # the versions to serve, and stop serving the versions whose file was removed.
+        try:
+            file_names = sorted(os.listdir(self.models_dir))
+        except OSError:
+            file_names = []
+        file_states = {}
+        for file_name in file_names:
+            path = os.path.join(self.models_dir, file_name)
+            if not file_name.endswith(MODEL_EXTENSION):
+                continue
+            try:
+                model_stat = os.stat(path)
+                sidecar_mtime = os.stat(sidecar_path(path)).st_mtime_ns if os.path.exists(sidecar_path(path)) else None
+            except FileNotFoundError:
+                continue
+            file_states[path] = (model_stat.st_mtime_ns, model_stat.st_size, sidecar_mtime)
+
+        retired = []
+        with self.lock:
+            for path, file_state in file_states.items():
+                model_file = self.model_files.get(path)
+                if model_file is not None and model_file['file_state'] == file_state:
+                    continue
+                # A model without a sidecar may still be being written: wait until it stops changing.
+                if not initial and file_state[2] is None and self.unsettled_files.get(path) != file_state:
+                    self.unsettled_files[path] = file_state
+                    continue
+                self.unsettled_files.pop(path, None)
+                model_file = {'path': path, 'file_state': file_state, 'status': 'available', 'error': None}
+                try:
+                    model_file['metadata'] = read_model_metadata(path, self.default_metadata)
+                except (OSError, ValueError) as error:
+                    name, version = parse_model_file_name(path)
+                    model_file.update(status='failed', error=str(error), metadata={'name': name, 'version': version})
+                self.model_files[path] = model_file
+
+            for path in set(self.model_files) - set(file_states):
+                del self.model_files[path]
+                for versions in self.models.values():
+                    for version, served_model in list(versions.items()):
+                        if served_model.path == path:
+                            retired.append(versions.pop(version))
+            self.queue_versions_to_load()
+            self.changed.notify_all()
+
+        for served_model in retired:
+            served_model.release()
+
+    def queue_versions_to_load(self):
+        # Queue the newest versions of every model that can be loaded; a version that fails to
+        # load leaves its place to the next one.
+        model_files_by_name = {}
+        for model_file in self.model_files.values():
+            if model_file['status'] != 'failed':
+                model_files_by_name.setdefault(model_file['metadata']['name'], []).append(model_file)
+        for model_files in model_files_by_name.values():
+            model_files.sort(key=lambda model_file: model_file['metadata']['version'], reverse=True)
+            for model_file in model_files[:self.versions_loaded]:
+                if model_file['status'] == 'available':
+                    model_file['status'] = 'queued'
+                    self.load_queue.put(model_file)
+
+    def load_models(self):
+        while True:
+            model_file = self.load_queue.get()
+            with self.lock:
+                if self.model_files.get(model_file['path']) is not model_file:
+                    continue
+                model_file['status'] = 'loading'
+
+            served_model = None
+            try:
+                inference_model, files_identity = self.load_model_version(model_file['path'], model_file['metadata'])
+                served_model = ServedModel(model_file['path'], model_file['metadata'], inference_model, files_identity)
+                # A sidecar listing other classes than the model was trained on would mislabel every window.
+                probabilities = inference_model.classify_clips(np.zeros(
+                    (1, served_model.sequence_length, served_model.image_height, served_model.image_width, 3), dtype=np.uint8))
+                if probabilities.shape[-1] != len(served_model.classes_list):
+                    raise ValueError(f'The model has {probabilities.shape[-1]} outputs for {len(served_model.classes_list)} classes')
+            except Exception as error:
+                if served_model is not None:
+                    served_model.release()
+                with self.lock:
+                    model_file.update(status='failed', error=f'{type(error).__name__}: {error}')
+                    self.queue_versions_to_load()
+                    self.changed.notify_all()
+                continue
+
+            retired = []
+            with self.lock:
+                if self.model_files.get(model_file['path']) is not model_file:
+                    # The file changed or was removed while it was loading.
+                    retired.append(served_model)
+                else:
+                    model_file['status'] = 'loaded'
+                    versions = self.models.setdefault(served_model.name, {})
+                    if served_model.version in versions:
+                        retired.append(versions[served_model.version])
+                    versions[served_model.version] = served_model
+                    for version in sorted(versions, reverse=True)[self.versions_loaded:]:
+                        retired.append(versions.pop(version))
+                        for other_model_file in self.model_files.values():
+                            if other_model_file['path'] == retired[-1].path and other_model_file['status'] == 'loaded':
+                                other_model_file['status'] = 'available'
+                self.changed.notify_all()
+
+            for retired_model in retired:
+                retired_model.release()
+
+    def is_loading(self, name):
+        return any(model_file['status'] in ('queued', 'loading') and model_file['metadata']['name'] == name
+                   for model_file in self.model_files.values())
+
+    def loading_errors(self, name):
+        return [f"{os.path.basename(model_file['path'])}: {model_file['error']}" for model_file in self.model_files.values()
+                if model_file['status'] == 'failed' and model_file['metadata']['name'] == name]
+
+    def model_status(self, name=None):
+        # This function will tell whether a model can serve requests.
+        # Returns:
+        #   status: 'ready' once a version is loaded, 'loading' until then, 'failed' if none could be loaded.
+        #   error: Why the versions could not be loaded, or None.
+        name = name or self.default_model
+        with self.lock:
+            if self.models.get(name):
+                return 'ready', None
+            if self.is_loading(name):
+                return 'loading', None
+            return 'failed', '; '.join(self.loading_errors(name)) or f'No model file of {name} in {self.models_dir}'
+
+    def wait_until_loaded(self, name=None, timeout=None):
+        # This function will wait until a version of the model is loaded, or none is left to load.
+        # Returns:
+        #   loaded: Whether a version of the model is loaded.
+        name = name or self.default_model
+        with self.changed:
+            self.changed.wait_for(lambda: self.models.get(name) or not self.is_loading(name), timeout)
+            return bool(self.models.get(name))
+
+    def acquire(self, name=None, version=None):
+        # This function will return a loaded version of a model, the newest one by default, and hold
+        # it until it is released.
+        # Returns:
+        #   served_model: The ServedModel; call its release() once done with it.
+        name = name or self.default_model
+        with self.lock:
+            versions = self.models.get(name)
+            if not versions:
+                if not any(model_file['metadata']['name'] == name for model_file in self.model_files.values()):
+                    raise LookupError(f'Unknown model {name}')
+                raise RuntimeError(f'No version of the model {name} is loaded: ' + ('; '.join(self.loading_errors(name)) or 'loading'))
+            if version in (None, 'latest'):
+                version = max(versions)
+            elif version not in versions:
+                raise LookupError(f'Version {version} of the model {name} is not loaded; loaded versions: {", ".join(sorted(versions))}')
+            return versions[version].acquire()
+
+    @contextmanager
+    def use(self, name=None, version=None):
+        served_model = self.acquire(name, version)
+        try:
+            yield served_model
+        finally:
+            served_model.release()
+
+    def status(self):
+        # This function will describe the model files found, with the versions being served.
+        with self.lock:
+            model_files = sorted(self.model_files.values(), key=lambda model_file: (model_file['metadata']['name'], str(model_file['metadata']['version'])))
+            models = []
+            for model_file in model_files:
+                metadata = model_file['metadata']
+                served_model = self.models.get(metadata['name'], {}).get(metadata['version'])
+                model_status = {'name': metadata['name'], 'version': metadata['version'], 'file': os.path.basename(model_file['path']),
+                                'status': model_file['status'], 'error': model_file['error'],
+                                'default': metadata['name'] == self.default_model,
+                                'accuracy': metadata.get('accuracy'), 'loss': metadata.get('loss')}
+                if served_model is not None and served_model.path == model_file['path']:
+                    model_status.update(served_model.to_dict())
+                models.append(model_status)
+            return {'default_model': self.default_model, 'models': models}
@@ -0,0 +1,132 @@
+import os
+import queue
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from .metrics import StageTimer
+
+# Marker put on a stage queue once its producer has no more frames.
+_END_OF_STREAM = object()
+
+
+def _put(stage_queue, item, stop_event):
+    # Block until there is room on the queue (backpressure), unless the pipeline is stopping.
+    while not stop_event.is_set():
+        try:
+            stage_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(stage_queue, stop_event):
+    # Block until the next item is available, or report the end of the stream if the pipeline is stopping.
+    while True:
+        try:
+            return stage_queue.get(timeout=0.1)
+        except queue.Empty:
+            if stop_event.is_set():
+                return _END_OF_STREAM
+
+
+def run_video_pipeline(video_reader, video_writer, classifier, classes_list, preprocess_frame, annotate_frame,
+                       batch_size=32, preprocess_workers=None, queue_size=32, progress_callback=None, stage_timer=None):
+    # This function will run action recognition over a video as a staged pipeline: a decoder
+    # thread, a pool of preprocessing workers, a batched inference stage (on the calling thread)
+    # and an encoder thread, connected by bounded queues so that a slow stage holds back the
+    # others instead of buffering the whole video. Frames are written in their original order.
+    # Args:
+    #   video_reader: The opened cv2.VideoCapture to read frames from.
+    #   video_writer: The opened cv2.VideoWriter to write the annotated frames to.
+    #   classifier: A SlidingWindowClassifier fed with the preprocessed frames.
+    #   classes_list: The class names indexed by the classifier's predicted labels.
+    #   preprocess_frame: A function mapping a decoded frame to the model's input frame.
+    #   annotate_frame: A function drawing the predicted class name onto a decoded frame in place.
+    #   batch_size: The number of frames fed to the classifier in one forward pass.
+    #   preprocess_workers: The number of preprocessing threads (defaults to the number of CPUs).
+    #   queue_size: The maximum number of frames waiting between two stages.
+    #   progress_callback: An optional function called with the number of frames written so far.
+    #   stage_timer: An optional StageTimer accumulating the time spent decoding, preprocessing,
+    #                classifying, annotating and encoding, and the depth of the queues.
+
+    stage_timer = stage_timer or StageTimer()
+    timed_preprocess_frame = stage_timer.timed('preprocess', preprocess_frame)
+
+    decoded_queue = queue.Queue(maxsize=queue_size)
+    encoded_queue = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+    errors = []
+
+    def decode_frames():
+        try:
+            while not stop_event.is_set():
+                with stage_timer.time('decode'):
+                    ok, frame = video_reader.read()
+                if not ok:
+                    break
+                _put(decoded_queue, (frame, preprocess_pool.submit(timed_preprocess_frame, frame)), stop_event)
+                stage_timer.queue_depth('decoded', decoded_queue.qsize())
+        except Exception as error:
+            errors.append(error)
+            stop_event.set()
+        finally:
+            _put(decoded_queue, _END_OF_STREAM, stop_event)
+
+    def encode_frames():
+        frames_written = 0
+        try:
+            while True:
+                item = _get(encoded_queue, stop_event)
+                if item is _END_OF_STREAM:
+                    break
+                frame, predicted_class_name = item
+                with stage_timer.time('annotate'):
+                    annotate_frame(frame, predicted_class_name)
+                with stage_timer.time('encode'):
+                    video_writer.write(frame)
+                frames_written += 1
+                stage_timer.frames = frames_written
+                if progress_callback is not None:
+                    progress_callback(frames_written)
+        except Exception as error:
+            errors.append(error)
+            stop_event.set()
+
+    with ThreadPoolExecutor(max_workers=preprocess_workers or os.cpu_count()) as preprocess_pool:
+        decoder = threading.Thread(target=decode_frames, name='pipeline-decoder', daemon=True)
+        encoder = threading.Thread(target=encode_frames, name='pipeline-encoder', daemon=True)
+        decoder.start()
+        encoder.start()
+
+        try:
+            predicted_class_name = ''
+            pending_frames = []
+            while True:
+                item = _get(decoded_queue, stop_event)
+                if item is not _END_OF_STREAM:
+                    pending_frames.append(item)
+
+                if pending_frames and (item is _END_OF_STREAM or len(pending_frames) == batch_size):
+                    frames_batch = np.asarray([future.result() for _, future in pending_frames])
+                    with stage_timer.time('inference'):
+                        predictions = classifier.process(frames_batch)
+                    for (frame, _), predicted_labels_probabilities in zip(pending_frames, predictions):
+                        if predicted_labels_probabilities is not None:
+                            predicted_class_name = classes_list[np.argmax(predicted_labels_probabilities)]
+                        _put(encoded_queue, (frame, predicted_class_name), stop_event)
+                    stage_timer.queue_depth('encoded', encoded_queue.qsize())
+                    pending_frames = []
+
+                if item is _END_OF_STREAM:
+                    break
+        except Exception as error:
+            errors.append(error)
+            stop_event.set()
+        finally:
+            _put(encoded_queue, _END_OF_STREAM, stop_event)
+            decoder.join()
+            encoder.join()
+
+    if errors:
+        raise errors[0]
@@ -0,0 +1,144 @@
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    # This function will hash the content of a file without reading it into memory at once.
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as hashed_file:
+        while True:
+            chunk = hashed_file.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_identity(file_path):
+    # This function will describe a file by its path, modification time and size, so that a
+    # replaced model invalidates the results computed with the previous one.
+    file_stat = os.stat(file_path)
+    return [os.path.abspath(file_path), file_stat.st_mtime_ns, file_stat.st_size]
+
+
+def result_cache_key(content_hash, model_identity, parameters):
+    # This function will combine the hash of an uploaded video with everything else its results
+    # depend on: the model and the inference parameters.
+    # Args:
+    #   content_hash: The sha256 of the uploaded video.
+    #   model_identity: A JSON-serializable description of the model files and backend.
+    #   parameters: A JSON-serializable dict of the inference parameters.
+    # Returns:
+    #   key: A hex digest naming the cache entry.
+
+    description = json.dumps({'content': content_hash, 'model': model_identity, 'parameters': parameters}, sort_keys=True)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+class ResultCache:
+    # A content-addressed cache of prediction results on local disk. Every entry is a directory
+    # named by its key, holding result files (the timeline JSON, the annotated video). The sizes
+    # and the recency of the entries are kept in memory; when the files exceed max_bytes, the
+    # least recently used entries are removed. Files are written under a temporary name and
+    # renamed into place, so that a crash never leaves a partial result behind.
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.load_entries()
+
+    def load_entries(self):
+        # Rebuild the in-memory metadata from the entries left by a previous run, oldest first.
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, key)
+            if key.startswith('.tmp-'):
+                os.remove(entry_dir)
+                continue
+            if not os.path.isdir(entry_dir):
+                continue
+            files = {name: os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir)}
+            entries.append((os.path.getmtime(entry_dir), key, files))
+
+        for _, key, files in sorted(entries):
+            self.entries[key] = files
+            self.total_bytes += sum(files.values())
+        with self.lock:
+            self.evict()
+
+    def open(self, key, name, mode='rb'):
+        # This function will open a result file if it is cached and mark its entry as recently used.
+        # The file is opened under the lock, so a concurrent eviction cannot remove it in between;
+        # once open it can be read even if it is evicted.
+        # Returns:
+        #   result_file: The open file, or None on a miss.
+
+        with self.lock:
+            if name not in self.entries.get(key, {}):
+                return None
+            try:
+                result_file = open(os.path.join(self.cache_dir, key, name), mode)
+            except FileNotFoundError:
+                self.remove(key)
+                return None
+            self.entries.move_to_end(key)
+            os.utime(os.path.join(self.cache_dir, key))
+            return result_file
+
+    def put(self, key, name, source_path):
+        # This function will copy a result file into the cache, then evict entries if needed.
+        temporary_path = os.path.join(self.cache_dir, f'.tmp-{uuid.uuid4().hex}')
+        shutil.copyfile(source_path, temporary_path)
+        self.add(key, name, temporary_path)
+
+    def add(self, key, name, temporary_path):
+        # Move a complete file, written in the cache directory, into its entry.
+        with self.lock:
+            entry_dir = os.path.join(self.cache_dir, key)
+            os.makedirs(entry_dir, exist_ok=True)
+            os.replace(temporary_path, os.path.join(entry_dir, name))
+            files = self.entries.setdefault(key, {})
+            self.total_bytes -= files.get(name, 0)
+            files[name] = os.path.getsize(os.path.join(entry_dir, name))
+            self.total_bytes += files[name]
+            self.entries.move_to_end(key)
+            self.evict()
+
+    def put_json(self, key, name, result):
+        # This function will write a JSON-serializable result to the cache.
+        temporary_path = os.path.join(self.cache_dir, f'.tmp-{uuid.uuid4().hex}')
+        with open(temporary_path, 'w') as result_file:
+            json.dump(result, result_file)
+        self.add(key, name, temporary_path)
+
+    def get_json(self, key, name):
+        result_file = self.open(key, name, 'r')
+        if result_file is None:
+            return None
+        with result_file:
+            return json.load(result_file)
+
+    def evict(self):
+        # Remove the least recently used entries until the cache fits in max_bytes. Called with the lock held.
+        while self.total_bytes > self.max_bytes and self.entries:
+            self.remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def remove(self, key):
+        files = self.entries.pop(key, {})
+        self.total_bytes -= sum(files.values())
+        shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'bytes': self.total_bytes, 'max_bytes': self.max_bytes, 'evictions': self.evictions}
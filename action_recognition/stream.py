@@ -0,0 +1,332 @@
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import cv2
+import numpy as np
+from collections import deque
+
+# Default number of windows classified per second, whatever the frame rate of the source.
+INFERENCE_RATE = 5.0
+
+
+def open_video_source(video_source):
+    # This function will open a camera (given by its device index), a video file or a stream URL.
+    if isinstance(video_source, str) and video_source.isdigit():
+        video_source = int(video_source)
+    return cv2.VideoCapture(video_source)
+
+
+def is_live_source(video_source):
+    # Cameras and network streams produce frames in real time; files are read as fast as possible.
+    return isinstance(video_source, int) or str(video_source).isdigit() or '://' in str(video_source)
+
+
+class StreamRecognizer:
+    # Recognizes actions on a live frame source. A capture thread reads frames as they arrive and
+    # keeps only the latest SEQUENCE_LENGTH of them; an inference thread classifies the latest
+    # window at a fixed rate, independent of the frame rate of the source. The CNN runs once on
+    # every frame of a classified window, whose features are kept in a ring of the last
+    # SEQUENCE_LENGTH frames, so each tick only extracts the frames captured since the previous
+    # one and runs the temporal head on the window. Under load the oldest
+    # frames are dropped and late inference ticks are skipped instead of queued, so the labels
+    # never lag behind the source. Every classified window is sent as an event to the listeners.
+
+    def __init__(self, video_source, inference_model, classes_list, preprocess_frame, sequence_length,
+                 inference_rate=INFERENCE_RATE, realtime=None):
+        # Args:
+        #   video_source: A camera device index, a video file path or a stream URL.
+        #   inference_model: The InferenceModel (or TFLiteInferenceModel) of the LRCN model.
+        #   classes_list: The class names indexed by the model's predicted labels.
+        #   preprocess_frame: A function mapping a decoded frame to the model's input frame.
+        #   sequence_length: The number of frames in one window.
+        #   inference_rate: The number of windows classified per second.
+        #   realtime: Whether to read the source at its own frame rate; defaults to True for files,
+        #             so that a file stands in for a camera, since live sources pace themselves.
+
+        self.video_source = video_source
+        self.inference_model = inference_model
+        self.classes_list = classes_list
+        self.preprocess_frame = preprocess_frame
+        self.sequence_length = sequence_length
+        self.inference_period = 1.0 / inference_rate
+        self.realtime = not is_live_source(video_source) if realtime is None else realtime
+
+        self.frames_window = deque(maxlen=sequence_length)
+        self.features_window = deque(maxlen=sequence_length)
+        self.frames_lock = threading.Lock()
+        self.listeners = []
+        self.listeners_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.error = None
+
+        self.frames_captured = 0
+        self.frames_extracted = 0
+        self.windows_classified = 0
+        self.late_ticks = 0
+        self.last_event = None
+
+    def add_listener(self, listener):
+        # Register a function called with every event, from the inference thread, and with None
+        # once the recognizer stops.
+        with self.listeners_lock:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self.listeners_lock:
+            if listener in self.listeners:
+                self.listeners.remove(listener)
+
+    def start(self):
+        # A recognizer that cannot start stops at once: its listeners get None, as when it stops later.
+        video_reader = open_video_source(self.video_source)
+        if not video_reader.isOpened():
+            self.emit(None)
+            raise IOError(f'Could not open the video source {self.video_source}')
+        self.threads = [
+            threading.Thread(target=self.capture_frames, args=(video_reader,), name='stream-capture', daemon=True),
+            threading.Thread(target=self.classify_windows, name='stream-inference', daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join()
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self.threads)
+
+    def capture_frames(self, video_reader):
+        fps = video_reader.get(cv2.CAP_PROP_FPS) or 25.0
+        start_time = time.monotonic()
+        try:
+            while not self.stop_event.is_set():
+                ok, frame = video_reader.read()
+                if not ok:
+                    break
+                captured_at = time.monotonic()
+                stream_time = video_reader.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                preprocessed_frame = self.preprocess_frame(frame)
+                with self.frames_lock:
+                    self.frames_window.append((preprocessed_frame, self.frames_captured, captured_at, stream_time))
+                    self.frames_captured += 1
+
+                if self.realtime:
+                    delay = start_time + self.frames_captured / fps - time.monotonic()
+                    if delay > 0:
+                        self.stop_event.wait(delay)
+        except Exception as error:
+            self.error = error
+        finally:
+            video_reader.release()
+            self.stop_event.set()
+
+    def classify_windows(self):
+        last_frame_index = None
+        next_tick = time.monotonic()
+        try:
+            while not self.stop_event.wait(max(next_tick - time.monotonic(), 0)):
+                now = time.monotonic()
+                next_tick += self.inference_period
+                if next_tick < now:
+                    # Inference fell behind the rate: skip the missed ticks rather than catching up.
+                    self.late_ticks += int((now - next_tick) / self.inference_period) + 1
+                    next_tick = now + self.inference_period
+
+                with self.frames_lock:
+                    if len(self.frames_window) < self.sequence_length or self.frames_window[-1][1] == last_frame_index:
+                        continue
+                    window = list(self.frames_window)
+
+                frames, frame_indexes, captured_times, stream_times = zip(*window)
+                predicted_labels_probabilities = self.classify_window(frames, frame_indexes)
+                predicted_label = int(np.argmax(predicted_labels_probabilities))
+                last_frame_index = frame_indexes[-1]
+                self.windows_classified += 1
+
+                event = {
+                    'label': self.classes_list[predicted_label],
+                    'confidence': float(predicted_labels_probabilities[predicted_label]),
+                    'probabilities': dict(zip(self.classes_list, predicted_labels_probabilities.tolist())),
+                    'changed': self.last_event is None or self.last_event['label'] != self.classes_list[predicted_label],
+                    'start_frame': frame_indexes[0],
+                    'end_frame': frame_indexes[-1],
+                    'stream_time': stream_times[-1],
+                    'timestamp': time.time(),
+                    'latency': time.monotonic() - captured_times[-1],
+                }
+                self.last_event = event
+                self.emit(event)
+        except Exception as error:
+            self.error = error
+            self.stop_event.set()
+        finally:
+            self.emit(None)
+
+    def classify_window(self, frames, frame_indexes):
+        # Extract the features of the frames not seen yet; the frames of the window follow each
+        # other, so they are those after the last frame of the features ring.
+        last_extracted_index = self.features_window[-1][0] if self.features_window else -1
+        first_new_frame = next((position for position, frame_index in enumerate(frame_indexes) if frame_index > last_extracted_index), None)
+        if first_new_frame is not None:
+            new_features = self.inference_model.extract_features(np.asarray(frames[first_new_frame:]))
+            self.features_window.extend(zip(frame_indexes[first_new_frame:], new_features))
+            self.frames_extracted += len(new_features)
+        features = np.asarray([frame_features for _, frame_features in self.features_window])
+        return self.inference_model.classify_features(features[None])[0]
+
+    def emit(self, event):
+        with self.listeners_lock:
+            listeners = list(self.listeners)
+        for listener in listeners:
+            listener(event)
+
+    def status(self):
+        return {
+            'source': str(self.video_source),
+            'running': self.is_running(),
+            'error': str(self.error) if self.error is not None else None,
+            'frames_captured': self.frames_captured,
+            'frames_extracted': self.frames_extracted,
+            'windows_classified': self.windows_classified,
+            'late_ticks': self.late_ticks,
+            'last_event': self.last_event,
+        }
+
+
+class StreamManager:
+    # Runs one StreamRecognizer per configured source while it has subscribers, and fans its
+    # events out to a bounded queue per subscriber. A subscriber that does not keep up loses
+    # events instead of slowing down the others.
+
+    def __init__(self, sources, create_recognizer):
+        # Args:
+        #   sources: A dict mapping stream names to video sources.
+        #   create_recognizer: A function creating the (not started) StreamRecognizer of a source.
+        self.sources = sources
+        self.create_recognizer = create_recognizer
+        self.recognizers = {}
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, name, max_queued_events=100):
+        # This function will start the recognizer of a stream if needed and register a subscriber.
+        # Returns:
+        #   event_queue: A queue receiving the events of the stream, then None when it stops.
+
+        event_queue = queue.Queue(maxsize=max_queued_events)
+
+        def listener(event):
+            try:
+                event_queue.put_nowait(event)
+            except queue.Full:
+                if event is None:
+                    event_queue.get_nowait()
+                    event_queue.put_nowait(None)
+
+        with self.lock:
+            if self.add_subscriber(name, event_queue, listener):
+                return event_queue
+
+        # Start a recognizer outside the lock: waiting for the model or a slow source must not hold
+        # up the other streams. If another subscriber started one meanwhile, share it instead.
+        recognizer = self.create_recognizer(self.sources[name])
+        recognizer.add_listener(listener)
+        recognizer.start()
+        with self.lock:
+            if not self.add_subscriber(name, event_queue, listener):
+                self.recognizers[name] = recognizer
+                self.subscribers[name] = {event_queue: listener}
+                return event_queue
+        recognizer.remove_listener(listener)
+        recognizer.stop()
+        return event_queue
+
+    def add_subscriber(self, name, event_queue, listener):
+        # This function will register a subscriber with the running recognizer of a stream; the
+        # caller holds the lock.
+        # Returns:
+        #   True if the subscriber was registered, False if the stream has no running recognizer.
+        recognizer = self.recognizers.get(name)
+        if recognizer is None or not recognizer.is_running():
+            return False
+        recognizer.add_listener(listener)
+        self.subscribers[name][event_queue] = listener
+        return True
+
+    def unsubscribe(self, name, event_queue):
+        # This function will remove a subscriber, and stop the recognizer of its stream once it has none left.
+        with self.lock:
+            listener = self.subscribers.get(name, {}).pop(event_queue, None)
+            recognizer = self.recognizers.get(name)
+            if recognizer is None:
+                return
+            if listener is not None:
+                recognizer.remove_listener(listener)
+            if self.subscribers[name]:
+                return
+            del self.recognizers[name]
+        recognizer.stop()
+
+    def status(self):
+        with self.lock:
+            return {name: dict(self.recognizers[name].status(), subscribers=len(self.subscribers[name]))
+                    if name in self.recognizers else {'source': str(source), 'running': False, 'subscribers': 0}
+                    for name, source in self.sources.items()}
+
+
+def parse_stream_sources(value):
+    # This function will parse stream sources configured as "name=source,name=source"
+    # (e.g. "webcam=0,door=rtsp://camera/stream").
+    sources = {}
+    for item in filter(None, (item.strip() for item in value.split(','))):
+        name, _, source = item.partition('=')
+        sources[name.strip()] = source.strip()
+    return sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print the actions recognized on a camera, video file or stream.')
+    parser.add_argument('model_path', help='.h5 file saved by model.py')
+    parser.add_argument('source', help='camera device index, video file path or stream URL')
+    parser.add_argument('--rate', type=float, default=INFERENCE_RATE, help='windows classified per second')
+    parser.add_argument('--classes', nargs='+', help='class names of the model (default: those of its sidecar)')
+    parser.add_argument('--changes-only', action='store_true', help='only print the events where the label changes')
+    args = parser.parse_args()
+
+    from .model import CLASSES_LIST
+    from .inference import load_inference_model
+    from .model_registry import read_model_metadata
+    inference_model = load_inference_model(args.model_path)
+    classes_list = args.classes or read_model_metadata(args.model_path, {'classes': CLASSES_LIST})['classes']
+    image_size = (inference_model.image_width, inference_model.image_height)
+
+    def print_event(event):
+        if event is not None and (event['changed'] or not args.changes_only):
+            print(json.dumps(event), flush=True)
+
+    recognizer = StreamRecognizer(args.source, inference_model, classes_list, lambda frame: cv2.resize(frame, image_size),
+                                  inference_model.sequence_length, args.rate)
+    recognizer.add_listener(print_event)
+    recognizer.start()
+    try:
+        while recognizer.is_running():
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+    recognizer.stop()
+    if recognizer.error is not None:
+        print(recognizer.error)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
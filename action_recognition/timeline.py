@@ -0,0 +1,114 @@
+import cv2
+import numpy as np
+from .inference import SlidingWindowClassifier
+from .metrics import StageTimer
+
+
+def predict_timeline(video_reader, inference_model, sequence_length, classes_list, preprocess_frame,
+                     stride, batch_size=32, progress_callback=None, stage_timer=None, motion_threshold=0, smoothing='none'):
+    # This function will classify the sliding windows of a video, see iterate_timeline().
+    # Returns:
+    #   windows: A list with the time range, predicted class and class probabilities of every window.
+
+    return list(iterate_timeline(video_reader, inference_model, sequence_length, classes_list, preprocess_frame, stride,
+                                 batch_size, progress_callback, stage_timer, motion_threshold, smoothing))
+
+
+def iterate_timeline(video_reader, inference_model, sequence_length, classes_list, preprocess_frame,
+                     stride, batch_size=32, progress_callback=None, stage_timer=None, motion_threshold=0, smoothing='none'):
+    # This function will classify the sliding windows of a video without producing an output video.
+    # Windows start every `stride` frames; when the stride is longer than a window, the frames
+    # between two windows are only grabbed from the stream and never retrieved or preprocessed.
+    # Args:
+    #   video_reader: The opened cv2.VideoCapture to read frames from.
+    #   inference_model: The InferenceModel of the LRCN model.
+    #   sequence_length: The number of frames in one window.
+    #   classes_list: The class names indexed by the model's predicted labels.
+    #   preprocess_frame: A function mapping a decoded frame to the model's input frame.
+    #   stride: The number of frames between the starts of two consecutive windows.
+    #   batch_size: The number of frames fed to the model in one forward pass.
+    #   progress_callback: An optional function called with the number of frames read so far.
+    #   stage_timer: An optional StageTimer accumulating the time spent decoding, preprocessing and classifying.
+    #   motion_threshold, smoothing: The motion gating and smoothing of the SlidingWindowClassifier.
+    # Returns:
+    #   A generator of the windows, each with its time range, predicted class and class
+    #   probabilities, yielded as soon as the batch closing it has been classified.
+
+    fps = video_reader.get(cv2.CAP_PROP_FPS) or 1.0
+    stage_timer = stage_timer or StageTimer()
+
+    # When windows overlap every frame is needed and the classifier picks the windows itself.
+    # Otherwise only the frames of each window are fed, so every sequence_length-th fed frame closes one.
+    classifier = SlidingWindowClassifier(inference_model, sequence_length, min(stride, sequence_length), motion_threshold, smoothing)
+
+    frames_batch = []
+    frames_indexes = []
+
+    def flush_frames_batch():
+        windows = []
+        with stage_timer.time('inference'):
+            predictions = classifier.process(np.asarray(frames_batch))
+        for frame_index, predicted_labels_probabilities in zip(frames_indexes, predictions):
+            if predicted_labels_probabilities is None:
+                continue
+            predicted_label = int(np.argmax(predicted_labels_probabilities))
+            start_frame = frame_index - sequence_length + 1
+            windows.append({
+                'start_frame': start_frame,
+                'end_frame': frame_index,
+                'start_time': start_frame / fps,
+                'end_time': (frame_index + 1) / fps,
+                'label': classes_list[predicted_label],
+                'confidence': float(predicted_labels_probabilities[predicted_label]),
+                'probabilities': dict(zip(classes_list, predicted_labels_probabilities.tolist())),
+            })
+        frames_batch.clear()
+        frames_indexes.clear()
+        return windows
+
+    frame_index = 0
+    while True:
+        frame_needed = stride <= sequence_length or frame_index % stride < sequence_length
+        with stage_timer.time('decode'):
+            if frame_needed:
+                ok, frame = video_reader.read()
+            else:
+                ok = video_reader.grab()
+        if not ok:
+            break
+
+        if frame_needed:
+            with stage_timer.time('preprocess'):
+                frames_batch.append(preprocess_frame(frame))
+            frames_indexes.append(frame_index)
+            if len(frames_batch) == batch_size:
+                yield from flush_frames_batch()
+                if progress_callback is not None:
+                    progress_callback(frame_index + 1)
+
+        frame_index += 1
+        stage_timer.frames = frame_index
+
+    if frames_batch:
+        yield from flush_frames_batch()
+    if progress_callback is not None:
+        progress_callback(frame_index)
+    stage_timer.count('windows_classified', classifier.windows_classified)
+    stage_timer.count('windows_gated', classifier.windows_gated)
+
+
+def merge_segments(windows):
+    # This function will merge consecutive windows predicting the same class into action segments.
+    # Args:
+    #   windows: The windows returned by predict_timeline().
+    # Returns:
+    #   segments: A list with the class and time range of every segment.
+
+    segments = []
+    for window in windows:
+        if segments and segments[-1]['label'] == window['label']:
+            segments[-1]['end_frame'] = window['end_frame']
+            segments[-1]['end_time'] = window['end_time']
+        else:
+            segments.append({key: window[key] for key in ('label', 'start_frame', 'end_frame', 'start_time', 'end_time')})
+    return segments
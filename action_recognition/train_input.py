@@ -0,0 +1,79 @@
+import math
+import numpy as np
+import tensorflow as tf
+from sklearn.model_selection import train_test_split
+
+# Number of clips the training stream draws its shuffled samples from.
+SHUFFLE_BUFFER_SIZE = 256
+
+
+def split_dataset_indexes(clips_count, test_size, validation_split, seed):
+    # This function will split the clips into train, validation and test sets exactly like
+    # train_test_split() followed by fit(validation_split=...) did on the NumPy arrays: the
+    # test set is drawn by a seeded shuffle and the validation set is the tail of the train set.
+    # The indexes follow the sorted order of list_dataset_videos() in dataset_builder.py, where
+    # the original script took the order of os.listdir(), so the same seed selects other videos
+    # than it did then: the splits, and the test scores, of models trained before the dataset
+    # builder are not comparable with the current ones.
+    # Args:
+    #   clips_count: The number of clips in the dataset.
+    #   test_size: The fraction of the clips held out for testing.
+    #   validation_split: The fraction of the remaining clips used for validation.
+    #   seed: The random state of the train/test shuffle.
+    # Returns:
+    #   train_indexes, validation_indexes, test_indexes: Arrays of clip indexes.
+
+    train_indexes, test_indexes = train_test_split(np.arange(clips_count), test_size=test_size, shuffle=True, random_state=seed)
+    split_at = int(math.floor(len(train_indexes) * (1.0 - validation_split)))
+    return train_indexes[:split_at], train_indexes[split_at:], test_indexes
+
+
+def augment_clip(clip, label):
+    # Flip every frame of half of the clips horizontally; actions read the same mirrored.
+    flip = tf.random.uniform(()) < 0.5
+    clip = tf.cond(flip, lambda: tf.reverse(clip, axis=[2]), lambda: clip)
+    return clip, label
+
+
+def make_clips_dataset(load_clip, labels, indexes, classes_count, clip_shape, batch_size,
+                       shuffle=False, seed=None, augment=False):
+    # This function will build a tf.data pipeline streaming the given clips: the clip indexes are
+    # shuffled within a bounded buffer, the clips are loaded (and augmented) in parallel, then
+    # batched and prefetched while the model trains on the previous batch.
+    # Args:
+    #   load_clip: A function returning the uint8 clip at an index, or None if it cannot be read;
+    #              e.g. a row of the dataset memmap, or extract_clip() on the video file.
+    #   labels: An array containing the class index of every clip.
+    #   indexes: The indexes of the clips in this set.
+    #   classes_count: The number of classes, for the one-hot encoded labels.
+    #   clip_shape: The shape of one clip (SEQUENCE_LENGTH, IMAGE_HEIGHT, IMAGE_WIDTH, 3).
+    #   batch_size: The number of clips in one batch.
+    #   shuffle: Whether to reshuffle the clips on every epoch.
+    #   seed: The seed of the shuffle.
+    #   augment: Whether to apply random horizontal flips.
+    # Returns:
+    #   dataset: A tf.data.Dataset of (uint8 clips, one-hot labels) batches.
+
+    def load(index):
+        clip = load_clip(int(index))
+        if clip is None:
+            return np.zeros(clip_shape, dtype=np.uint8), False
+        return np.asarray(clip, dtype=np.uint8), True
+
+    def load_example(index, label):
+        clip, loaded = tf.numpy_function(load, [index], [tf.uint8, tf.bool])
+        clip.set_shape(clip_shape)
+        return clip, tf.one_hot(label, classes_count), loaded
+
+    indexes = np.asarray(indexes)
+    dataset = tf.data.Dataset.from_tensor_slices((indexes, np.asarray(labels)[indexes]))
+    if shuffle:
+        dataset = dataset.shuffle(min(len(indexes), SHUFFLE_BUFFER_SIZE), seed=seed, reshuffle_each_iteration=True)
+
+    dataset = dataset.map(load_example, num_parallel_calls=tf.data.AUTOTUNE, deterministic=True)
+    dataset = dataset.filter(lambda clip, label, loaded: loaded)
+    dataset = dataset.map(lambda clip, label, loaded: (clip, label))
+    if augment:
+        dataset = dataset.map(augment_clip, num_parallel_calls=tf.data.AUTOTUNE)
+
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,114 @@
+import os
+import shutil
+import threading
+
+# Largest number of bytes read from the start of an upload to find out whether its container can
+# be decoded while it arrives.
+SNIFF_LIMIT = 1 << 20
+
+# Size of the chunks copied from the request body.
+CHUNK_SIZE = 1 << 16
+
+
+def read_exactly(stream, size):
+    data = b''
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def sniff_container(stream, sniff_limit=SNIFF_LIMIT):
+    # This function will read the start of a video upload to find out whether it can be decoded
+    # sequentially, before the upload is complete. MP4/MOV files can only when their index (the
+    # moov box) comes before the media data (mdat), i.e. when they were written for streaming
+    # ("faststart"); Matroska/WebM and MPEG-TS always can. Everything else (AVI, MP4 with the
+    # index at the end, ...) needs the whole file.
+    # Args:
+    #   stream: The request body stream.
+    # Returns:
+    #   header: The bytes read from the stream, which must be sent to the decoder first.
+    #   streamable: Whether the video can be decoded while it is uploaded.
+
+    header = read_exactly(stream, 12)
+    if header[:4] == b'\x1a\x45\xdf\xa3':
+        return header, True
+    if header[4:8] != b'ftyp':
+        header += read_exactly(stream, 189 - len(header))
+        return header, len(header) > 188 and header[0] == 0x47 and header[188] == 0x47
+
+    # Walk the top-level boxes of the ISO base media file until moov or mdat shows up.
+    offset = 0
+    while offset + 16 <= sniff_limit:
+        header += read_exactly(stream, offset + 16 - len(header))
+        if len(header) < offset + 8:
+            return header, False
+        box_size = int.from_bytes(header[offset:offset + 4], 'big')
+        box_type = header[offset + 4:offset + 8]
+        if box_type == b'moov':
+            return header, True
+        if box_type == b'mdat' or box_size == 0:
+            return header, False
+        if box_size == 1:
+            box_size = int.from_bytes(header[offset + 8:offset + 16], 'big')
+        if box_size < 8:
+            return header, False
+        offset += box_size
+    return header, False
+
+
+def spool_upload(stream, header, file_path, chunk_size=CHUNK_SIZE):
+    # This function will write a whole upload to a file, starting with the sniffed header.
+    with open(file_path, 'wb') as video_file:
+        video_file.write(header)
+        shutil.copyfileobj(stream, video_file, chunk_size)
+
+
+class FifoUpload:
+    # Feeds an upload to the decoder through a named pipe while it is still arriving: a feeder
+    # thread copies the request body into the pipe, and cv2.VideoCapture reads the pipe like a file.
+    # The pipe holds a few kilobytes, so the upload advances only as fast as the video is decoded.
+
+    def __init__(self, stream, header, fifo_path, chunk_size=CHUNK_SIZE):
+        self.stream = stream
+        self.header = header
+        self.fifo_path = fifo_path
+        self.chunk_size = chunk_size
+        self.error = None
+        os.mkfifo(fifo_path)
+        self.feeder = threading.Thread(target=self.feed, name='upload-feeder', daemon=True)
+
+    def start(self):
+        self.feeder.start()
+        return self
+
+    def feed(self):
+        try:
+            # Opening the pipe blocks until the decoder opens it for reading.
+            with open(self.fifo_path, 'wb') as fifo:
+                fifo.write(self.header)
+                while True:
+                    chunk = self.stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    fifo.write(chunk)
+        except BrokenPipeError:
+            # The decoder stopped reading, e.g. the client went away or the video is invalid.
+            pass
+        except Exception as error:
+            self.error = error
+
+    def close(self):
+        # Unblock the feeder if the decoder never opened the pipe, then wait for it.
+        try:
+            reader = os.open(self.fifo_path, os.O_RDONLY | os.O_NONBLOCK)
+            os.close(reader)
+        except OSError:
+            pass
+        self.feeder.join(timeout=5)
+
+
+def can_stream_uploads():
+    return hasattr(os, 'mkfifo')
@@ -0,0 +1,79 @@
+import time
+import cv2
+
+# Largest gap, in frames, that may be crossed by grabbing frames sequentially. A seek on a
+# compressed stream decodes again from the keyframe preceding the target, so it costs at most one
+# GOP (250 frames with common encoder settings) and always beats grabbing a longer gap.
+MAX_SEQUENTIAL_GAP = 300
+
+# Shortest gap over which the cost of seeking is measured, to choose between seeking and grabbing
+# on videos with short GOPs.
+MIN_SEEK_PROBE_GAP = 8
+
+
+def sample_frame_indexes(video_frames_count, sequence_length):
+    # This function will compute the indexes of the frames sampled from a video: sequence_length
+    # frames spread evenly over the whole video.
+    # Args:
+    #   video_frames_count: The number of frames in the video.
+    #   sequence_length: The number of frames to sample.
+    # Returns:
+    #   frame_indexes: The increasing indexes of the frames to read.
+
+    skip_frames_window = max(int(video_frames_count/sequence_length), 1)
+    return [frame_counter * skip_frames_window for frame_counter in range(sequence_length)]
+
+
+def read_frames_at(video_reader, frame_indexes, max_sequential_gap=MAX_SEQUENTIAL_GAP):
+    # This function will read the frames at the given indexes in one sequential pass. The frames
+    # between two targets are only grabbed (decoded, but never converted to images). The reader
+    # seeks forward only when that is cheaper: for gaps longer than max_sequential_gap, or when a
+    # measured seek took less time than grabbing the frames of the gap would (short GOPs).
+    # Args:
+    #   video_reader: The opened cv2.VideoCapture to read frames from.
+    #   frame_indexes: The increasing indexes of the frames to read.
+    #   max_sequential_gap: The longest gap crossed without seeking.
+    # Returns:
+    #   frames_list: The frames read, stopping at the first frame that could not be read.
+
+    frames_list = []
+    position = int(video_reader.get(cv2.CAP_PROP_POS_FRAMES))
+
+    # Measured cost of grabbing one frame, and of one seek followed by reading the target frame.
+    grab_seconds = None
+    seek_seconds = None
+
+    for frame_index in frame_indexes:
+        gap = frame_index - position
+
+        if gap < 0 or gap > max_sequential_gap:
+            seek = True
+        elif gap == 0 or grab_seconds is None:
+            seek = False
+        elif seek_seconds is None:
+            # Probe the cost of one seek once the cost of grabbing is known.
+            seek = gap >= MIN_SEEK_PROBE_GAP
+        else:
+            seek = seek_seconds < (gap + 1) * grab_seconds
+
+        start_time = time.perf_counter()
+        if seek:
+            video_reader.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            position = frame_index
+        else:
+            while position < frame_index:
+                if not video_reader.grab():
+                    return frames_list
+                position += 1
+            if gap > 0:
+                grab_seconds = (time.perf_counter() - start_time) / gap
+
+        success, frame = video_reader.read()
+        if not success:
+            break
+        if seek:
+            seek_seconds = time.perf_counter() - start_time
+        position += 1
+        frames_list.append(frame)
+
+    return frames_list
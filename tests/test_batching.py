@@ -0,0 +1,113 @@
+import threading
+import numpy as np
+import pytest
+from action_recognition.batching import DynamicBatcher
+
+
+class RecordingFunction:
+    # Doubles its inputs and records the size of every batch; blocks until released, if asked to.
+
+    def __init__(self, blocked=False):
+        self.batch_sizes = []
+        self.started = threading.Event()
+        self.released = threading.Event()
+        if not blocked:
+            self.released.set()
+
+    def __call__(self, inputs):
+        self.batch_sizes.append(len(inputs))
+        self.started.set()
+        self.released.wait()
+        return np.asarray(inputs) * 2
+
+
+def test_concurrent_calls_share_a_batch():
+    function = RecordingFunction()
+    batcher = DynamicBatcher(function, max_batch_size=16, max_wait_seconds=0.2)
+    futures = [batcher.submit(np.arange(count) + 10 * count) for count in (1, 2, 3)]
+    results = [future.result(timeout=5) for future in futures]
+    batcher.close()
+
+    assert function.batch_sizes == [6]
+    for count, result in zip((1, 2, 3), results):
+        np.testing.assert_array_equal(result, (np.arange(count) + 10 * count) * 2)
+
+
+def test_calls_queued_during_a_batch_join_the_next_one():
+    function = RecordingFunction(blocked=True)
+    batcher = DynamicBatcher(function, max_batch_size=16, max_wait_seconds=0)
+    first = batcher.submit(np.ones(1))
+    assert function.started.wait(5)
+    others = [batcher.submit(np.ones(2)) for _ in range(3)]
+    function.released.set()
+    for future in [first] + others:
+        future.result(timeout=5)
+    batcher.close()
+    assert function.batch_sizes == [1, 6]
+
+
+def test_a_batch_never_exceeds_the_maximum_size():
+    function = RecordingFunction(blocked=True)
+    batcher = DynamicBatcher(function, max_batch_size=4, max_wait_seconds=0.2)
+    first = batcher.submit(np.ones(1))
+    assert function.started.wait(5)
+    futures = [batcher.submit(np.ones(3)) for _ in range(3)]
+    function.released.set()
+    for future in [first] + futures:
+        assert len(future.result(timeout=5)) in (1, 3)
+    batcher.close()
+    assert function.batch_sizes == [1, 3, 3, 3]
+
+
+def test_a_call_larger_than_the_maximum_runs_alone():
+    function = RecordingFunction()
+    batcher = DynamicBatcher(function, max_batch_size=4, max_wait_seconds=0)
+    assert len(batcher(np.ones(10))) == 10
+    batcher.close()
+    assert function.batch_sizes == [10]
+
+
+def test_errors_reach_every_call_of_the_batch():
+    def failing_function(inputs):
+        raise RuntimeError('model failed')
+
+    batcher = DynamicBatcher(failing_function, max_batch_size=16, max_wait_seconds=0.2)
+    futures = [batcher.submit(np.ones(2)) for _ in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match='model failed'):
+            future.result(timeout=5)
+
+    # The batcher keeps serving the next calls.
+    batcher.function = RecordingFunction()
+    np.testing.assert_array_equal(batcher(np.ones(2)), [2, 2])
+    batcher.close()
+
+
+def test_an_empty_call_skips_the_queue():
+    function = RecordingFunction()
+    batcher = DynamicBatcher(function, max_batch_size=16, max_wait_seconds=0.2)
+    assert len(batcher(np.zeros((0, 3)))) == 0
+    batcher.close()
+    assert function.batch_sizes == [0]
+
+
+def test_the_batches_are_reported():
+    batches = []
+    batcher = DynamicBatcher(RecordingFunction(), max_batch_size=16, max_wait_seconds=0.2,
+                             on_batch=lambda batch_size, queue_waits: batches.append((batch_size, len(queue_waits))))
+    futures = [batcher.submit(np.ones(2)) for _ in range(2)]
+    for future in futures:
+        future.result(timeout=5)
+    batcher.close()
+    assert batches == [(4, 2)]
+
+
+def test_closing_runs_the_queued_calls():
+    function = RecordingFunction(blocked=True)
+    batcher = DynamicBatcher(function, max_batch_size=1, max_wait_seconds=0)
+    futures = [batcher.submit(np.ones(1)) for _ in range(3)]
+    assert function.started.wait(5)
+    function.released.set()
+    batcher.close()
+    assert all(future.done() for future in futures)
+    assert function.batch_sizes == [1, 1, 1]
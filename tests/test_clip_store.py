@@ -0,0 +1,60 @@
+import os
+import cv2
+import numpy as np
+import pytest
+from action_recognition import clip_store
+from action_recognition.cli import main
+from action_recognition.clip_store import ClipStore, build_store, append_store
+
+
+def write_video(video_path, frames_count, height=30, width=40):
+    video_writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (width, height))
+    for frame_index in range(frames_count):
+        video_writer.write(np.full((height, width, 3), frame_index * 10 % 256, dtype=np.uint8))
+    video_writer.release()
+
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    for class_name in ['Running', 'Walking']:
+        os.makedirs(tmp_path / 'dataset' / class_name)
+        for video_index in range(2):
+            write_video(str(tmp_path / 'dataset' / class_name / f'video_{video_index}.avi'), 12)
+    return str(tmp_path / 'dataset')
+
+
+def test_build_store(dataset_dir, tmp_path):
+    store_dir = str(tmp_path / 'store')
+    assert build_store(dataset_dir, store_dir, ['Running', 'Walking'], 4, 48, 64, shard_size=3, max_workers=1) == 0
+    store = ClipStore(store_dir)
+    assert len(store) == 4
+    assert store[3].shape == (4, 48, 64, 3)
+    assert sorted(os.listdir(tmp_path)) == ['dataset', 'store']
+
+
+def test_an_interrupted_build_leaves_no_store(dataset_dir, tmp_path, monkeypatch):
+    def interrupted_add_videos(store_dir, index, videos, shard_size, max_workers=None):
+        clip_store.write_index(store_dir, index)
+        raise KeyboardInterrupt
+
+    store_dir = str(tmp_path / 'store')
+    monkeypatch.setattr(clip_store, 'add_videos', interrupted_add_videos)
+    with pytest.raises(KeyboardInterrupt):
+        build_store(dataset_dir, store_dir, ['Running', 'Walking'], 4, 48, 64, max_workers=1)
+    assert not os.path.exists(store_dir)
+    with pytest.raises(FileNotFoundError):
+        append_store(dataset_dir, store_dir, ['Running', 'Walking'])
+
+    monkeypatch.undo()
+    build_store(dataset_dir, store_dir, ['Running', 'Walking'], 4, 48, 64, max_workers=1)
+    assert len(ClipStore(store_dir)) == 4
+    assert sorted(os.listdir(tmp_path)) == ['dataset', 'store']
+
+
+def test_the_package_cli_builds_and_verifies_a_store(dataset_dir, tmp_path, capsys):
+    store_dir = str(tmp_path / 'store')
+    assert main(['clip-store', 'build', dataset_dir, store_dir, '--sequence-length', '4', '--image-size', '48', '64', '--workers', '1']) == 0
+    assert main(['clip-store', 'verify', store_dir]) == 0
+    assert '0 problems found' in capsys.readouterr().out
+    assert main(['clip-store', 'verify', str(tmp_path)]) == 1
+    assert 'is not a clip store' in capsys.readouterr().out
@@ -0,0 +1,37 @@
+import os
+import cv2
+import numpy as np
+from action_recognition.dataset_builder import extract_clip, build_dataset
+
+
+def write_video(video_path, frames_count, height=30, width=40):
+    video_writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (width, height))
+    for frame_index in range(frames_count):
+        video_writer.write(np.full((height, width, 3), frame_index * 10 % 256, dtype=np.uint8))
+    video_writer.release()
+
+
+def test_extract_clip_resizes_to_height_and_width(tmp_path):
+    video_path = str(tmp_path / 'video.avi')
+    write_video(video_path, 12)
+    clip = extract_clip(video_path, 4, 48, 64)
+    assert clip.shape == (4, 48, 64, 3)
+    assert clip.dtype == np.uint8
+
+
+def test_extract_clip_skips_short_videos(tmp_path):
+    video_path = str(tmp_path / 'video.avi')
+    write_video(video_path, 3)
+    assert extract_clip(video_path, 4, 48, 64) is None
+
+
+def test_build_dataset_with_a_non_square_clip(tmp_path):
+    dataset_dir = tmp_path / 'dataset'
+    for class_name in ['Walking', 'Running']:
+        os.makedirs(dataset_dir / class_name)
+        write_video(str(dataset_dir / class_name / 'video.avi'), 12)
+
+    features, labels, video_files_paths = build_dataset(str(dataset_dir), ['Walking', 'Running'], str(tmp_path / 'cache'), 4, 48, 64, max_workers=1)
+    assert features.shape == (2, 4, 48, 64, 3)
+    assert list(labels) == [0, 1]
+    assert [os.path.basename(os.path.dirname(path)) for path in video_files_paths] == ['Walking', 'Running']
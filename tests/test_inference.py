@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from action_recognition.inference import SlidingWindowClassifier
+
+
+class FakeModel:
+    # Stands in for InferenceModel: a frame's feature is its mean pixel value, and the windows are
+    # classified by the given probabilities, in turn, or by the parity of their last feature.
+
+    def __init__(self, probabilities=None):
+        self.probabilities = iter(probabilities) if probabilities is not None else None
+        self.frames_extracted = []
+        self.windows_classified = []
+
+    def extract_features(self, frames_batch):
+        self.frames_extracted.append(len(frames_batch))
+        return np.asarray(frames_batch, dtype=np.float32).reshape(len(frames_batch), -1).mean(axis=1, keepdims=True)
+
+    def classify_features(self, features_windows):
+        features_windows = np.asarray(features_windows)
+        self.windows_classified.append(len(features_windows))
+        if self.probabilities is not None:
+            return np.asarray([next(self.probabilities) for _ in features_windows], dtype=np.float32)
+        labels = features_windows[:, -1, 0].astype(int) % 2
+        return np.eye(2, dtype=np.float32)[labels]
+
+
+def make_frames(values):
+    return np.asarray([np.full((2, 2, 3), value, dtype=np.uint8) for value in values])
+
+
+def closed_windows(predictions):
+    return [frame_index for frame_index, prediction in enumerate(predictions) if prediction is not None]
+
+
+def test_windows_close_every_stride_frames():
+    classifier = SlidingWindowClassifier(FakeModel(), sequence_length=4, stride=3)
+    predictions = classifier.process(make_frames(range(10)))
+    assert closed_windows(predictions) == [3, 6, 9]
+    assert classifier.windows_classified == 3
+
+
+def test_windows_do_not_depend_on_the_batches():
+    frames = make_frames(range(11))
+    classifier = SlidingWindowClassifier(FakeModel(), sequence_length=4, stride=2)
+    predictions = []
+    for start in range(0, len(frames), 3):
+        predictions += classifier.process(frames[start:start + 3])
+
+    reference = SlidingWindowClassifier(FakeModel(), sequence_length=4, stride=2).process(frames)
+    assert closed_windows(predictions) == closed_windows(reference) == [3, 5, 7, 9]
+    for prediction, reference_prediction in zip(predictions, reference):
+        if prediction is not None:
+            np.testing.assert_array_equal(prediction, reference_prediction)
+
+
+def test_every_frame_goes_through_the_cnn_once():
+    model = FakeModel()
+    classifier = SlidingWindowClassifier(model, sequence_length=4, stride=1)
+    classifier.process(make_frames(range(6)))
+    classifier.process(make_frames(range(6, 9)))
+    assert sum(model.frames_extracted) == classifier.frames_extracted == 9
+    assert classifier.windows_classified == 6
+
+
+def test_an_empty_batch_predicts_nothing():
+    model = FakeModel()
+    assert SlidingWindowClassifier(model, sequence_length=4).process(make_frames([])) == []
+    assert model.frames_extracted == []
+
+
+def test_static_frames_reuse_the_features_and_the_prediction():
+    model = FakeModel()
+    classifier = SlidingWindowClassifier(model, sequence_length=3, stride=1, motion_threshold=1)
+    predictions = classifier.process(make_frames([10] * 8))
+
+    # Only the first frame moves: the first window is classified, the next ones are gated.
+    assert classifier.frames_extracted == 1
+    assert classifier.windows_classified == 1
+    assert classifier.windows_gated == 5
+    assert closed_windows(predictions) == [2, 3, 4, 5, 6, 7]
+    for prediction in predictions[2:]:
+        np.testing.assert_array_equal(prediction, predictions[2])
+
+
+def test_a_moving_frame_wakes_the_classifier_up():
+    classifier = SlidingWindowClassifier(FakeModel(), sequence_length=3, stride=1, motion_threshold=1)
+    predictions = classifier.process(make_frames([10, 10, 10, 10, 11, 11]))
+    assert classifier.frames_extracted == 2
+    assert classifier.windows_classified == 2
+    np.testing.assert_array_equal(predictions[3], [1, 0])
+    np.testing.assert_array_equal(predictions[4], [0, 1])
+    np.testing.assert_array_equal(predictions[5], [0, 1])
+
+
+def test_ema_smoothing():
+    probabilities = [[1, 0], [0, 1], [0, 1]]
+    classifier = SlidingWindowClassifier(FakeModel(probabilities), sequence_length=1, smoothing='ema', smoothing_factor=0.5)
+    predictions = classifier.process(make_frames(range(3)))
+    np.testing.assert_allclose(predictions, [[1, 0], [0.5, 0.5], [0.25, 0.75]])
+
+
+def test_majority_smoothing():
+    probabilities = [[0.9, 0.1], [0.2, 0.8], [0.3, 0.7], [0.6, 0.4]]
+    classifier = SlidingWindowClassifier(FakeModel(probabilities), sequence_length=1, smoothing='majority', smoothing_windows=3)
+    predictions = classifier.process(make_frames(range(4)))
+    np.testing.assert_allclose(predictions, [[1, 0], [0.5, 0.5], [1 / 3, 2 / 3], [1 / 3, 2 / 3]])
+
+
+def test_unknown_smoothing_is_rejected():
+    with pytest.raises(ValueError):
+        SlidingWindowClassifier(FakeModel(), sequence_length=4, smoothing='median')
@@ -0,0 +1,74 @@
+import threading
+import numpy as np
+import pytest
+from action_recognition.inference_workers import SharedFrameRing
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing(8, (2, 2, 3))
+    yield ring
+    ring.close()
+
+
+def allocate_in_thread(ring, count):
+    # Returns the thread allocating, and the list receiving the start of its span.
+    starts = []
+    thread = threading.Thread(target=lambda: starts.append(ring.allocate(count)), daemon=True)
+    thread.start()
+    return thread, starts
+
+
+def test_spans_are_allocated_in_order(ring):
+    assert ring.allocate(3) == 0
+    assert ring.allocate(2) == 3
+    assert ring.allocate(3) == 5
+
+
+def test_the_frames_are_shared_memory(ring):
+    start = ring.allocate(2)
+    ring.frames[start:start + 2] = 7
+    assert bytes(ring.shared_memory.buf[:24]) == b'\x07' * 24
+
+
+def test_allocation_wraps_around_once_the_start_is_released(ring):
+    assert ring.allocate(3) == 0
+    assert ring.allocate(2) == 3
+    ring.release(0)
+    assert ring.allocate(3) == 5
+    # [3, 8) is in use: the next span wraps around to the start, but never reaches the tail.
+    assert ring.allocate(2) == 0
+    thread, starts = allocate_in_thread(ring, 2)
+    thread.join(0.2)
+    assert thread.is_alive()
+
+    ring.release(3)
+    thread.join(5)
+    assert starts == [2]
+
+
+def test_spans_released_out_of_order_are_reclaimed_in_order(ring):
+    first = ring.allocate(4)
+    second = ring.allocate(3)
+    ring.release(second)
+
+    # The first span still holds the tail, so there is no room for 2 more frames.
+    thread, starts = allocate_in_thread(ring, 2)
+    thread.join(0.2)
+    assert thread.is_alive()
+
+    ring.release(first)
+    thread.join(5)
+    assert starts == [0]
+
+
+def test_an_empty_ring_starts_over(ring):
+    for _ in range(3):
+        start = ring.allocate(3)
+        ring.release(start)
+    assert ring.allocate(4) == 0
+
+
+def test_spans_larger_than_half_the_ring_are_rejected(ring):
+    with pytest.raises(ValueError):
+        ring.allocate(5)
@@ -0,0 +1,175 @@
+import os
+import time
+import threading
+import numpy as np
+import pytest
+from action_recognition.model_registry import ModelRegistry, parse_model_file_name, read_model_metadata, write_model_metadata
+
+CLASSES = ['walk', 'run', 'jump']
+
+
+class StubModel:
+    # Stands in for the inference model of a model file; its outputs count is read from the file.
+
+    def __init__(self, outputs_count):
+        self.sequence_length = 4
+        self.image_height = 8
+        self.image_width = 8
+        self.outputs_count = outputs_count
+        self.closed = threading.Event()
+
+    def classify_clips(self, clips):
+        return np.full((len(clips), self.outputs_count), 1 / self.outputs_count, dtype=np.float32)
+
+    def close(self):
+        self.closed.set()
+
+
+class StubLoader:
+    def __init__(self):
+        self.loaded = {}
+
+    def __call__(self, model_path, metadata):
+        with open(model_path) as model_file:
+            inference_model = StubModel(int(model_file.read() or len(CLASSES)))
+        self.loaded[metadata['version']] = inference_model
+        return inference_model, [model_path]
+
+
+def add_model_file(models_dir, version, name='model', outputs_count=len(CLASSES), classes=CLASSES):
+    model_path = os.path.join(models_dir, f'{name}__Date_Time_{version}__Loss_0.1__Accuracy_0.9.h5')
+    with open(model_path, 'w') as model_file:
+        model_file.write(str(outputs_count))
+    if classes is not None:
+        write_model_metadata(model_path, {'name': name, 'version': version, 'classes': classes})
+    return model_path
+
+
+def wait_until_idle(registry, timeout=5):
+    deadline = time.monotonic() + timeout
+    while any(model['status'] in ('queued', 'loading') for model in registry.status()['models']):
+        assert time.monotonic() < deadline, 'the registry is still loading'
+        time.sleep(0.01)
+
+
+def start_registry(models_dir, versions_loaded=2):
+    loader = StubLoader()
+    registry = ModelRegistry(str(models_dir), loader, 'model', {'classes': CLASSES}, versions_loaded, poll_interval=0).start()
+    wait_until_idle(registry)
+    return registry, loader
+
+
+def test_model_file_names_give_the_name_and_version():
+    assert parse_model_file_name('/m/LRCN_model__Date_Time_2024_07_07__16_03_46__Loss_0.4__Accuracy_0.9.h5') == ('LRCN_model', '2024_07_07__16_03_46')
+    assert parse_model_file_name('/m/custom.h5') == ('custom', None)
+
+
+def test_the_sidecar_overrides_the_defaults(tmp_path):
+    model_path = add_model_file(str(tmp_path), '2025_01_01__00_00_00', classes=['a', 'b'])
+    metadata = read_model_metadata(model_path, {'classes': CLASSES, 'sequence_length': 20})
+    assert metadata == {'classes': ['a', 'b'], 'sequence_length': 20, 'name': 'model', 'version': '2025_01_01__00_00_00'}
+
+    bare_path = add_model_file(str(tmp_path), '2025_02_01__00_00_00', classes=None)
+    assert read_model_metadata(bare_path, {'classes': CLASSES})['version'] == '2025_02_01__00_00_00'
+    with pytest.raises(ValueError):
+        read_model_metadata(bare_path)
+
+
+def test_the_newest_versions_are_served(tmp_path):
+    for version in ('2025_01_01__00_00_00', '2025_02_01__00_00_00', '2025_03_01__00_00_00'):
+        add_model_file(str(tmp_path), version)
+    registry, loader = start_registry(tmp_path)
+
+    assert registry.model_status() == ('ready', None)
+    assert sorted(loader.loaded) == ['2025_02_01__00_00_00', '2025_03_01__00_00_00']
+    with registry.use() as served_model:
+        assert served_model.version == '2025_03_01__00_00_00'
+        assert served_model.classes_list == CLASSES
+    with registry.use(version='2025_02_01__00_00_00') as served_model:
+        assert served_model.version == '2025_02_01__00_00_00'
+    with pytest.raises(LookupError):
+        registry.acquire(version='2025_01_01__00_00_00')
+    with pytest.raises(LookupError):
+        registry.acquire('unknown')
+
+
+def test_a_new_version_is_swapped_in_and_the_oldest_retired(tmp_path):
+    add_model_file(str(tmp_path), '2025_01_01__00_00_00')
+    add_model_file(str(tmp_path), '2025_02_01__00_00_00')
+    registry, loader = start_registry(tmp_path)
+
+    add_model_file(str(tmp_path), '2025_03_01__00_00_00')
+    registry.scan()
+    wait_until_idle(registry)
+
+    with registry.use() as served_model:
+        assert served_model.version == '2025_03_01__00_00_00'
+    assert loader.loaded['2025_01_01__00_00_00'].closed.wait(5)
+    assert not loader.loaded['2025_02_01__00_00_00'].closed.is_set()
+    statuses = {model['version']: model['status'] for model in registry.status()['models']}
+    assert statuses == {'2025_01_01__00_00_00': 'available', '2025_02_01__00_00_00': 'loaded', '2025_03_01__00_00_00': 'loaded'}
+
+
+def test_a_retired_version_is_closed_after_its_last_request(tmp_path):
+    add_model_file(str(tmp_path), '2025_01_01__00_00_00')
+    registry, loader = start_registry(tmp_path, versions_loaded=1)
+    served_model = registry.acquire()
+
+    add_model_file(str(tmp_path), '2025_02_01__00_00_00')
+    registry.scan()
+    wait_until_idle(registry)
+    with registry.use() as new_model:
+        assert new_model.version == '2025_02_01__00_00_00'
+
+    # The request holding the old version can still use it.
+    assert not loader.loaded['2025_01_01__00_00_00'].closed.wait(0.1)
+    served_model.release()
+    assert loader.loaded['2025_01_01__00_00_00'].closed.wait(5)
+
+
+def test_a_removed_file_is_no_longer_served(tmp_path):
+    add_model_file(str(tmp_path), '2025_01_01__00_00_00')
+    model_path = add_model_file(str(tmp_path), '2025_02_01__00_00_00')
+    registry, loader = start_registry(tmp_path)
+
+    os.remove(model_path)
+    registry.scan()
+    with registry.use() as served_model:
+        assert served_model.version == '2025_01_01__00_00_00'
+    assert loader.loaded['2025_02_01__00_00_00'].closed.wait(5)
+
+
+def test_a_model_that_does_not_match_its_classes_fails(tmp_path):
+    add_model_file(str(tmp_path), '2025_01_01__00_00_00', outputs_count=2)
+    registry, loader = start_registry(tmp_path)
+
+    status, error = registry.model_status()
+    assert status == 'failed'
+    assert 'The model has 2 outputs for 3 classes' in error
+    assert loader.loaded['2025_01_01__00_00_00'].closed.wait(5)
+    with pytest.raises(RuntimeError):
+        registry.acquire()
+
+
+def test_a_failed_version_leaves_its_place_to_an_older_one(tmp_path):
+    add_model_file(str(tmp_path), '2025_01_01__00_00_00')
+    add_model_file(str(tmp_path), '2025_02_01__00_00_00', outputs_count=2)
+    registry, loader = start_registry(tmp_path, versions_loaded=1)
+    with registry.use() as served_model:
+        assert served_model.version == '2025_01_01__00_00_00'
+
+
+def test_a_model_file_without_sidecar_is_loaded_once_it_stops_changing(tmp_path):
+    add_model_file(str(tmp_path), '2025_01_01__00_00_00')
+    registry, loader = start_registry(tmp_path)
+
+    add_model_file(str(tmp_path), '2025_02_01__00_00_00', classes=None)
+    registry.scan()
+    wait_until_idle(registry)
+    assert '2025_02_01__00_00_00' not in loader.loaded
+
+    registry.scan()
+    wait_until_idle(registry)
+    with registry.use() as served_model:
+        assert served_model.version == '2025_02_01__00_00_00'
+        assert served_model.classes_list == CLASSES
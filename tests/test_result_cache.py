@@ -0,0 +1,66 @@
+import os
+from action_recognition.result_cache import ResultCache, result_cache_key
+
+
+def put_bytes(cache, tmp_path, key, size, name='result.bin'):
+    source_path = tmp_path / f'{key}.src'
+    source_path.write_bytes(b'x' * size)
+    cache.put(key, name, str(source_path))
+
+
+def test_results_are_read_back(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=1000)
+    cache.put_json('a', 'timeline.json', {'windows': [1, 2]})
+    assert cache.get_json('a', 'timeline.json') == {'windows': [1, 2]}
+    assert cache.get_json('a', 'other.json') is None
+    assert cache.open('b', 'timeline.json') is None
+
+
+def test_the_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=250)
+    for key in ('a', 'b'):
+        put_bytes(cache, tmp_path, key, 100)
+
+    # Reading a makes b the least recently used entry.
+    with cache.open('a', 'result.bin') as result_file:
+        assert len(result_file.read()) == 100
+    put_bytes(cache, tmp_path, 'c', 100)
+
+    assert cache.open('b', 'result.bin') is None
+    assert not os.path.exists(tmp_path / 'cache' / 'b')
+    assert cache.stats() == {'entries': 2, 'bytes': 200, 'max_bytes': 250, 'evictions': 1}
+
+
+def test_a_result_larger_than_the_cache_is_not_kept(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=50)
+    put_bytes(cache, tmp_path, 'a', 100)
+    assert cache.stats()['entries'] == 0
+    assert cache.stats()['bytes'] == 0
+
+
+def test_replacing_a_file_counts_its_new_size(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=1000)
+    put_bytes(cache, tmp_path, 'a', 100)
+    put_bytes(cache, tmp_path, 'a', 30)
+    assert cache.stats()['bytes'] == 30
+
+
+def test_the_entries_survive_a_restart_oldest_first(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=1000)
+    for key in ('a', 'b'):
+        put_bytes(cache, tmp_path, key, 100)
+    os.utime(tmp_path / 'cache' / 'a', (1, 1))
+    (tmp_path / 'cache' / '.tmp-partial').write_bytes(b'partial')
+
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=150)
+    assert cache.open('a', 'result.bin') is None
+    assert cache.open('b', 'result.bin') is not None
+    assert not os.path.exists(tmp_path / 'cache' / '.tmp-partial')
+
+
+def test_the_key_depends_on_everything_the_result_depends_on():
+    key = result_cache_key('content', ['model.h5', 1, 2], {'stride': 5})
+    assert key == result_cache_key('content', ['model.h5', 1, 2], {'stride': 5})
+    assert key != result_cache_key('other', ['model.h5', 1, 2], {'stride': 5})
+    assert key != result_cache_key('content', ['model.h5', 1, 3], {'stride': 5})
+    assert key != result_cache_key('content', ['model.h5', 1, 2], {'stride': 1})
@@ -0,0 +1,80 @@
+import time
+import threading
+from action_recognition.stream import StreamManager
+
+
+class FakeRecognizer:
+    # Stands in for StreamRecognizer: start() blocks until the test lets the source open.
+
+    def __init__(self, source, source_opened):
+        self.source = source
+        self.source_opened = source_opened
+        self.listeners = []
+        self.running = False
+        self.stopped = False
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.listeners.remove(listener)
+
+    def start(self):
+        self.source_opened.wait()
+        self.running = True
+        return self
+
+    def stop(self):
+        self.running = False
+        self.stopped = True
+
+    def is_running(self):
+        return self.running
+
+    def status(self):
+        return {'source': self.source, 'running': self.running}
+
+
+def make_manager(sources):
+    source_opened = {name: threading.Event() for name in sources}
+    created = []
+
+    def create_recognizer(source):
+        name = next(name for name, stream_source in sources.items() if stream_source == source)
+        created.append(FakeRecognizer(source, source_opened[name]))
+        return created[-1]
+
+    return StreamManager(sources, create_recognizer), source_opened, created
+
+
+def test_a_slow_source_does_not_block_the_other_streams():
+    manager, source_opened, _ = make_manager({'door': 'rtsp://door', 'webcam': '0'})
+    subscriber = threading.Thread(target=manager.subscribe, args=('door',))
+    subscriber.start()
+
+    source_opened['webcam'].set()
+    manager.subscribe('webcam')
+    assert manager.status()['webcam']['subscribers'] == 1
+    assert manager.status()['door']['subscribers'] == 0
+
+    source_opened['door'].set()
+    subscriber.join()
+    assert manager.status()['door']['subscribers'] == 1
+
+
+def test_racing_subscribers_share_one_recognizer():
+    manager, source_opened, created = make_manager({'door': 'rtsp://door'})
+    subscribers = [threading.Thread(target=manager.subscribe, args=('door',)) for _ in range(2)]
+    for subscriber in subscribers:
+        subscriber.start()
+    while len(created) < 2:
+        time.sleep(0.01)
+    source_opened['door'].set()
+    for subscriber in subscribers:
+        subscriber.join()
+
+    assert manager.status()['door']['subscribers'] == 2
+    running = [recognizer for recognizer in created if recognizer.running]
+    assert len(running) == 1
+    assert len(running[0].listeners) == 2
+    assert [recognizer.stopped for recognizer in created if recognizer is not running[0]] == [True]
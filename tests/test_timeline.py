@@ -0,0 +1,30 @@
+from action_recognition.timeline import merge_segments
+
+
+def make_window(label, start_frame, end_frame, fps=10):
+    return {'label': label, 'confidence': 0.9, 'start_frame': start_frame, 'end_frame': end_frame,
+            'start_time': start_frame / fps, 'end_time': end_frame / fps}
+
+
+def test_consecutive_windows_of_a_class_are_merged():
+    windows = [make_window('run', 0, 19), make_window('run', 20, 39), make_window('walk', 40, 59), make_window('run', 60, 79)]
+    assert merge_segments(windows) == [
+        {'label': 'run', 'start_frame': 0, 'end_frame': 39, 'start_time': 0.0, 'end_time': 3.9},
+        {'label': 'walk', 'start_frame': 40, 'end_frame': 59, 'start_time': 4.0, 'end_time': 5.9},
+        {'label': 'run', 'start_frame': 60, 'end_frame': 79, 'start_time': 6.0, 'end_time': 7.9},
+    ]
+
+
+def test_overlapping_windows_extend_the_segment_to_the_last_one():
+    windows = [make_window('run', 0, 19), make_window('run', 5, 24), make_window('run', 10, 29)]
+    assert merge_segments(windows) == [{'label': 'run', 'start_frame': 0, 'end_frame': 29, 'start_time': 0.0, 'end_time': 2.9}]
+
+
+def test_the_windows_are_left_unchanged():
+    windows = [make_window('run', 0, 19), make_window('run', 20, 39)]
+    merge_segments(windows)
+    assert windows[0]['end_frame'] == 19
+
+
+def test_no_windows_make_no_segments():
+    assert merge_segments([]) == []
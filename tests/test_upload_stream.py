@@ -0,0 +1,58 @@
+import io
+from action_recognition.upload_stream import sniff_container
+
+
+def box(box_type, payload=b''):
+    return (8 + len(payload)).to_bytes(4, 'big') + box_type + payload
+
+
+def sniff(data, **kwargs):
+    stream = io.BytesIO(data)
+    header, streamable = sniff_container(stream, **kwargs)
+    # What was read must be given back, and nothing past it consumed.
+    assert data.startswith(header)
+    assert stream.tell() == len(header)
+    return header, streamable
+
+
+def test_faststart_mp4_is_streamable():
+    data = box(b'ftyp', b'isom\x00\x00\x02\x00') + box(b'free') + box(b'moov', b'\x00' * 32) + box(b'mdat', b'\x00' * 64)
+    header, streamable = sniff(data)
+    assert streamable
+
+
+def test_mp4_with_the_index_at_the_end_is_not():
+    data = box(b'ftyp', b'isom\x00\x00\x02\x00') + box(b'mdat', b'\x00' * 64) + box(b'moov', b'\x00' * 32)
+    assert not sniff(data)[1]
+
+
+def test_mp4_with_a_64_bit_box_size():
+    large_box = (1).to_bytes(4, 'big') + b'free' + (24).to_bytes(8, 'big') + b'\x00' * 8
+    data = box(b'ftyp', b'isom\x00\x00\x02\x00') + large_box + box(b'moov')
+    assert sniff(data)[1]
+
+
+def test_mp4_without_moov_in_the_sniffed_bytes_is_not():
+    data = box(b'ftyp', b'isom\x00\x00\x02\x00') + box(b'free', b'\x00' * 200) + box(b'moov')
+    assert not sniff(data, sniff_limit=100)[1]
+
+
+def test_truncated_mp4_is_not():
+    assert not sniff(box(b'ftyp', b'isom\x00\x00\x02\x00')[:14])[1]
+
+
+def test_matroska_is_streamable():
+    assert sniff(b'\x1a\x45\xdf\xa3' + b'\x00' * 100)[1]
+
+
+def test_mpeg_ts_is_streamable():
+    packet = b'\x47' + b'\x00' * 187
+    assert sniff(packet * 3)[1]
+
+
+def test_avi_is_not():
+    assert not sniff(b'RIFF\x00\x10\x00\x00AVI LIST' + b'\x00' * 300)[1]
+
+
+def test_empty_upload_is_not():
+    assert sniff(b'') == (b'', False)
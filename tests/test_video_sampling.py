@@ -0,0 +1,25 @@
+from action_recognition.video_sampling import sample_frame_indexes
+
+
+def test_frames_are_spread_evenly_over_the_video():
+    assert sample_frame_indexes(100, 20) == list(range(0, 100, 5))
+
+
+def test_the_step_is_rounded_down():
+    frame_indexes = sample_frame_indexes(59, 20)
+    assert frame_indexes == list(range(0, 40, 2))
+    assert frame_indexes[-1] < 59
+
+
+def test_a_short_video_is_read_frame_by_frame():
+    # The indexes past the end are left to the reader, which returns fewer frames than asked.
+    assert sample_frame_indexes(10, 20) == list(range(20))
+    assert sample_frame_indexes(0, 3) == [0, 1, 2]
+
+
+def test_one_index_per_frame_to_sample():
+    for video_frames_count in (20, 21, 39, 40, 1000):
+        frame_indexes = sample_frame_indexes(video_frames_count, 20)
+        assert len(frame_indexes) == 20
+        assert frame_indexes == sorted(set(frame_indexes))
+        assert frame_indexes[-1] < video_frames_count